@@ -24,5 +24,10 @@ class OTP(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'code'], name='otp_unused_idx', condition=models.Q(is_used=False)),
+        ]
+    
     def __str__(self):
         return f"OTP for {self.user.username}"
\ No newline at end of file
@@ -0,0 +1,16 @@
+from jobs.queue import task
+from jobs.transports import send_once
+from .models import OTP
+
+@task('accounts.send_otp')
+def send_otp(payload, key):
+    otp = OTP.objects.select_related('user').filter(id=payload['otp_id'], is_used=False).first()
+    if otp is None:
+        return
+    body = f'Your verification code is {otp.code}'
+    if otp.user.phone:
+        send_once('sms', str(otp.user.phone), 'Verification code', body, f'{key}:sms')
+    if otp.user.email:
+        send_once('email', otp.user.email, 'Verification code', body, f'{key}:email')
+    if not otp.user.phone and not otp.user.email:
+        send_once('console', otp.user.username, 'Verification code', body, f'{key}:console')
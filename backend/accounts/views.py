@@ -4,6 +4,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from jobs.queue import enqueue
 from .models import User, OTP
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 import random
@@ -17,10 +18,10 @@ def register(request):
         
         # Generate OTP
         otp_code = str(random.randint(100000, 999999))
-        OTP.objects.create(user=user, code=otp_code)
+        otp = OTP.objects.create(user=user, code=otp_code)
         
-        # Send OTP via email/SMS (mock implementation)
-        print(f"OTP for {user.username}: {otp_code}")
+        # Delivered by the job worker so a slow SMS/email provider stays off the request path
+        enqueue('accounts.send_otp', {'otp_id': otp.id}, key=f'otp-{otp.id}')
         
         return Response({
             'message': 'User registered successfully. OTP sent to your email/phone.',
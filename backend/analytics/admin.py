@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Rollup
+
+@admin.register(Rollup)
+class RollupAdmin(admin.ModelAdmin):
+    list_display = ['metric', 'day', 'dimension', 'count', 'total']
+    list_filter = ['metric']
@@ -0,0 +1,167 @@
+import datetime
+import json
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from payments.models import Payment
+from shipments.models import Shipment, ShipmentTracking
+from support.models import Feedback
+
+# Shipments change after they are written, so they are re-exported whenever
+# updated_at moves; the other tables are append-only and tracked by id
+TABLES = {
+    'shipments': (Shipment, ('updated_at', 'id')),
+    'tracking': (ShipmentTracking, ('id',)),
+    'payments': (Payment, ('id',)),
+    'feedback': (Feedback, ('id',)),
+}
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+def arrow_type(field, dictionary=None):
+    if dictionary is not None:
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    if isinstance(field, models.ForeignKey):
+        return arrow_type(field.target_field)
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pyarrow.int64()
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+def choice_dictionaries(queryset, fields):
+    # A file must use one dictionary throughout, so collect it before streaming:
+    # the declared choices plus any off-list values actually stored
+    dictionaries = {}
+    for field in fields:
+        if field.choices and isinstance(field, models.CharField):
+            values = [code for code, _ in field.flatchoices]
+            stored = queryset.order_by().values_list(field.attname, flat=True).distinct()
+            values += sorted(set(stored) - set(values) - {None})
+            dictionaries[field.attname] = values
+    return dictionaries
+
+def table_schema(model, dictionaries):
+    schema = []
+    for field in model._meta.concrete_fields:
+        metadata = None
+        if field.choices:
+            metadata = {'choices': json.dumps({str(code): str(label) for code, label in field.flatchoices})}
+        schema.append(pyarrow.field(
+            field.attname, arrow_type(field, dictionaries.get(field.attname)), nullable=field.null, metadata=metadata
+        ))
+    return pyarrow.schema(schema)
+
+def column_array(values, arrow_field, dictionary):
+    if dictionary is not None:
+        index = {value: position for position, value in enumerate(dictionary)}
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array([None if value is None else index[value] for value in values], pyarrow.int32()),
+            pyarrow.array(dictionary, pyarrow.string()),
+        )
+    if pyarrow.types.is_string(arrow_field.type):
+        values = [None if value is None else str(value) for value in values]
+    elif pyarrow.types.is_decimal(arrow_field.type):
+        values = [value if value is None or isinstance(value, Decimal) else Decimal(str(value)) for value in values]
+    return pyarrow.array(values, arrow_field.type)
+
+def record_batch(columns, schema, dictionaries):
+    return pyarrow.RecordBatch.from_arrays(
+        [
+            column_array(values, arrow_field, dictionaries.get(arrow_field.name))
+            for values, arrow_field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+def open_writer(path, schema, file_format):
+    if file_format == 'parquet':
+        return pyarrow.parquet.ParquetWriter(path, schema, compression='zstd')
+    return pyarrow.ipc.new_file(path, schema)
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def after_watermark(queryset, fields, watermark):
+    # Keyset filter: rows strictly after the last exported (field, ..., id) tuple
+    if not watermark:
+        return queryset
+    condition = Q()
+    for position, name in enumerate(fields):
+        step = Q(**{f'{name}__gt': watermark[name]})
+        for previous in fields[:position]:
+            step &= Q(**{previous: watermark[previous]})
+        condition |= step
+    return queryset.filter(condition)
+
+def encode_watermark(values):
+    return {name: value.isoformat() if isinstance(value, datetime.datetime) else value for name, value in values.items()}
+
+def decode_watermark(watermark):
+    return {
+        name: datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+        for name, value in (watermark or {}).items()
+    }
+
+def export_table(name, path, file_format, watermark=None, batch_rows=None):
+    # Streams the table into one file, holding at most batch_rows rows in Python
+    # at a time; returns (rows written, new watermark or None if nothing changed)
+    model, watermark_fields = TABLES[name]
+    batch_rows = batch_rows or settings.COLUMNAR_EXPORT_BATCH_ROWS
+    fields = model._meta.concrete_fields
+    queryset = after_watermark(model.objects.all(), watermark_fields, decode_watermark(watermark))
+    dictionaries = choice_dictionaries(queryset, fields)
+    schema = table_schema(model, dictionaries)
+    names = [field.attname for field in fields]
+    positions = [names.index(name) for name in watermark_fields]
+    
+    rows = queryset.order_by(*watermark_fields).values_list(*names).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    total = 0
+    last = None
+    writer = None
+    partial = path + '.partial'
+    try:
+        for batch in batches(rows, batch_rows):
+            writer = writer or open_writer(partial, schema, file_format)
+            writer.write_batch(record_batch(list(zip(*batch)), schema, dictionaries))
+            total += len(batch)
+            last = batch[-1]
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(partial, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    
+    if last is None:
+        return 0, None
+    return total, encode_watermark({name: last[position] for name, position in zip(watermark_fields, positions)})
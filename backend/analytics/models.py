@@ -0,0 +1,16 @@
+from django.db import models
+
+class Rollup(models.Model):
+    # One counter per metric, day and dimension (a status, "method:status" for
+    # payments, a courier id). total is the metric's sum, e.g. revenue or seconds
+    metric = models.CharField(max_length=50)
+    day = models.DateField()
+    dimension = models.CharField(max_length=100, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['metric', 'day', 'dimension']
+    
+    def __str__(self):
+        return f"{self.metric} {self.day} {self.dimension}: {self.count}"
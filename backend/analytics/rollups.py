@@ -0,0 +1,89 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from shipments.models import Shipment
+from .models import Rollup
+
+STATUS_EVENTS = 'shipments.status'
+TRANSIT = 'shipments.transit_seconds'
+COURIER_DELIVERED = 'couriers.delivered'
+PAYMENTS = 'payments.amount'
+FEEDBACK = 'feedback.rating'
+
+def day_of(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+class Increments(defaultdict):
+    def __init__(self):
+        super().__init__(lambda: [0, Decimal(0)])
+    
+    def add(self, metric, day, dimension='', count=1, total=0):
+        entry = self[metric, day, dimension]
+        entry[0] += count
+        entry[1] += Decimal(total)
+
+def apply(increments):
+    # Increment-or-insert per key; callers aggregate first, so a batch of thousands
+    # of writes touches one row per (metric, day, dimension)
+    with transaction.atomic():
+        for (metric, day, dimension), (count, total) in increments.items():
+            key = {'metric': metric, 'day': day, 'dimension': dimension}
+            change = {'count': F('count') + count, 'total': F('total') + round(total, 2)}
+            if Rollup.objects.filter(**key).update(**change):
+                continue
+            try:
+                with transaction.atomic():
+                    Rollup.objects.create(count=count, total=round(total, 2), **key)
+            except IntegrityError:
+                Rollup.objects.filter(**key).update(**change)
+
+def delivered_details(shipment_ids):
+    # Booked time (first tracking event) and courier of each delivered shipment
+    return {
+        row[0]: row[1:]
+        for row in Shipment.objects.filter(id__in=shipment_ids).annotate(
+            booked_at=Min('tracking_history__timestamp')
+        ).values_list('id', 'booked_at', 'assigned_courier_id')
+    }
+
+def add_delivery(increments, delivered_at, booked_at, courier_id):
+    day = day_of(delivered_at)
+    if booked_at is not None:
+        increments.add(TRANSIT, day, total=max((delivered_at - booked_at).total_seconds(), 0))
+    if courier_id is not None:
+        increments.add(COURIER_DELIVERED, day, str(courier_id))
+
+def record_tracking_events(events):
+    # Takes events that went through shipments.events.project. Only status
+    # changes count, so repeated or backdated scans leave the rollups alone
+    increments = Increments()
+    delivered = []
+    for event in events:
+        status = event.transition
+        if status is None:
+            continue
+        increments.add(STATUS_EVENTS, day_of(event.timestamp), status)
+        if status == 'delivered':
+            delivered.append(event)
+    if delivered:
+        details = delivered_details({event.shipment_id for event in delivered})
+        for event in delivered:
+            booked_at, courier_id = details.get(event.shipment_id, (None, None))
+            add_delivery(increments, event.timestamp, booked_at, courier_id)
+    apply(increments)
+
+def record_payment(payment):
+    increments = Increments()
+    increments.add(
+        PAYMENTS, day_of(payment.created_at), f'{payment.payment_method}:{payment.payment_status}', total=payment.amount
+    )
+    apply(increments)
+
+def record_feedback(feedback):
+    increments = Increments()
+    increments.add(FEEDBACK, day_of(feedback.created_at), total=feedback.rating)
+    apply(increments)
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from django.utils import timezone
+from accounts.models import User
+from .models import Rollup
+from .rollups import COURIER_DELIVERED, FEEDBACK, PAYMENTS, STATUS_EVENTS, TRANSIT
+
+def average(total, count, places=2):
+    return round(float(total) / count, places) if count else None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def report(request):
+    if request.user.role != 'admin':
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        end = date.fromisoformat(request.query_params.get('to', timezone.localdate().isoformat()))
+        start = date.fromisoformat(
+            request.query_params.get('from', (end - timedelta(days=settings.ANALYTICS_DEFAULT_DAYS - 1)).isoformat())
+        )
+    except ValueError:
+        return Response({'error': 'from and to must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rows = Rollup.objects.filter(day__range=(start, end)).order_by('day', 'metric', 'dimension').values_list(
+        'metric', 'day', 'dimension', 'count', 'total'
+    )
+    status_by_day = []
+    revenue = {}
+    transit_by_day = []
+    couriers = {}
+    feedback = [0, 0]
+    transit = [0, 0]
+    for metric, day, dimension, count, total in rows:
+        if metric == STATUS_EVENTS:
+            status_by_day.append({'day': day, 'status': dimension, 'count': count})
+        elif metric == PAYMENTS:
+            method, payment_status = dimension.split(':', 1)
+            entry = revenue.setdefault(dimension, {
+                'payment_method': method, 'payment_status': payment_status, 'count': 0, 'amount': 0,
+            })
+            entry['count'] += count
+            entry['amount'] += total
+        elif metric == TRANSIT:
+            transit_by_day.append({'day': day, 'delivered': count, 'average_hours': average(total / 3600, count)})
+            transit[0] += count
+            transit[1] += total
+        elif metric == COURIER_DELIVERED:
+            couriers[int(dimension)] = couriers.get(int(dimension), 0) + count
+        elif metric == FEEDBACK:
+            feedback[0] += count
+            feedback[1] += total
+    
+    names = dict(User.objects.filter(id__in=list(couriers)).values_list('id', 'username'))
+    return Response({
+        'from': start,
+        'to': end,
+        'shipments_by_status': status_by_day,
+        'revenue_by_method': sorted(revenue.values(), key=lambda entry: (entry['payment_method'], entry['payment_status'])),
+        'transit_time': {
+            'delivered': transit[0],
+            'average_hours': average(transit[1] / 3600, transit[0]),
+            'by_day': transit_by_day,
+        },
+        'courier_throughput': sorted(
+            ({'courier_id': courier_id, 'username': names.get(courier_id), 'delivered': delivered}
+             for courier_id, delivered in couriers.items()),
+            key=lambda entry: -entry['delivered'],
+        ),
+        'feedback': {'count': feedback[0], 'average_rating': average(feedback[1], feedback[0])},
+    })
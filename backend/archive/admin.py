@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import ArchivedShipment
+
+@admin.register(ArchivedShipment)
+class ArchivedShipmentAdmin(admin.ModelAdmin):
+    list_display = ['tracking_id', 'shipment_id', 'partition', 'archived_at']
+    list_filter = ['partition']
+    search_fields = ['tracking_id']
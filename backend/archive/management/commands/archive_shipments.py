@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from archive.partitions import archive_expired
+from archive.tasks import schedule_archive
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled shipments past ARCHIVE_AFTER_DAYS into the monthly archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--schedule', action='store_true', help='Start the recurring archive job instead of archiving now')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_archive()
+            self.stdout.write(f'Archive job {job.id} runs at {job.run_at:%Y-%m-%d %H:%M:%S} and then every {settings.ARCHIVE_INTERVAL}s')
+            return
+        start = time.perf_counter()
+        archived, _ = archive_expired(options['days'], options['batch_size'])
+        self.stdout.write(f'{archived} shipments archived to {settings.ARCHIVE_DIR} in {time.perf_counter() - start:.2f}s')
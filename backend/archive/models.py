@@ -0,0 +1,12 @@
+from django.db import models
+
+class ArchivedShipment(models.Model):
+    # All an archived shipment leaves behind in the hot tables: which monthly
+    # file (archive.partitions) now holds it and its dependent rows
+    shipment_id = models.BigIntegerField(unique=True)
+    tracking_id = models.CharField(max_length=20, unique=True)
+    partition = models.CharField(max_length=7)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.tracking_id} ({self.partition})"
@@ -0,0 +1,180 @@
+import datetime
+import decimal
+import os
+import sqlite3
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from notifications.models import Notification
+from payments.models import Payment
+from shipments.fast_serializers import TRACKING_COLUMNS, tracking_entry
+from shipments.models import Shipment, ShipmentTracking
+from support.models import Feedback
+from .models import ArchivedShipment
+
+# Each monthly file (ARCHIVE_DIR/YYYY-MM.sqlite3, by shipment creation month)
+# holds these tables with the hot tables' columns, keyed on the shipment id
+TABLES = {
+    'shipments': (Shipment, 'id'),
+    'tracking': (ShipmentTracking, 'shipment_id'),
+    'payments': (Payment, 'shipment_id'),
+    'feedback': (Feedback, 'shipment_id'),
+    'notifications': (Notification, 'shipment_id'),
+}
+
+FINAL_STATUSES = ['delivered', 'cancelled']
+
+def column_type(field):
+    if isinstance(field, models.ForeignKey):
+        return column_type(field.target_field)
+    if isinstance(field, (models.IntegerField, models.BooleanField)):
+        return 'INTEGER'
+    if isinstance(field, models.FloatField):
+        return 'REAL'
+    # Decimals and datetimes are stored as text so nothing is lost on the way back
+    return 'TEXT'
+
+def encode(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+def partition_path(partition):
+    return os.path.join(settings.ARCHIVE_DIR, f'{partition}.sqlite3')
+
+def open_partition(partition, create=False):
+    # Returns None for a month that has nothing archived yet unless create is set.
+    # Columns added to the hot tables since the file was created are added here too
+    path = partition_path(partition)
+    if not create and not os.path.exists(path):
+        return None
+    os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+    connection = sqlite3.connect(path)
+    if create:
+        for name, (model, key) in TABLES.items():
+            fields = model._meta.concrete_fields
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {name} '
+                f'({", ".join(f"{field.column} {column_type(field)}" for field in fields)}, '
+                f'PRIMARY KEY ({model._meta.pk.column}))'
+            )
+            existing = {row[1] for row in connection.execute(f'PRAGMA table_info({name})')}
+            for field in fields:
+                if field.column not in existing:
+                    connection.execute(f'ALTER TABLE {name} ADD COLUMN {field.column} {column_type(field)}')
+            if key != model._meta.pk.column:
+                connection.execute(f'CREATE INDEX IF NOT EXISTS {name}_{key}_idx ON {name} ({key})')
+    return connection
+
+def write_rows(connection, name, rows):
+    # INSERT OR REPLACE: a batch copied by a run that died before deleting it is
+    # simply copied again
+    model, _ = TABLES[name]
+    fields = model._meta.concrete_fields
+    connection.executemany(
+        f'INSERT OR REPLACE INTO {name} ({", ".join(field.column for field in fields)}) '
+        f'VALUES ({", ".join("?" for _ in fields)})',
+        [[encode(row[field.attname]) for field in fields] for row in rows],
+    )
+
+def read_rows(connection, name, shipment_ids):
+    model, key = TABLES[name]
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    cursor = connection.execute(
+        f'SELECT * FROM {name} WHERE {key} IN ({", ".join("?" for _ in shipment_ids)})', list(shipment_ids)
+    )
+    columns = [column[0] for column in cursor.description]
+    return [
+        {fields[column].attname: fields[column].to_python(value) for column, value in zip(columns, row) if column in fields}
+        for row in cursor
+    ]
+
+def expired(cutoff):
+    # Delivered/cancelled with nothing logged since the cutoff; shipments closed
+    # without any event fall back to updated_at
+    return Shipment.objects.annotate(closed_at=Coalesce('last_event_at', 'updated_at')).filter(
+        status__in=FINAL_STATUSES, closed_at__lt=cutoff
+    )
+
+def archive_batch(cutoff, batch_size):
+    # Moves up to batch_size expired shipments with their tracking, payment,
+    # feedback and notification rows. The hot rows are locked only for this
+    # batch: re-checked, copied into the monthly files (committed first, so a
+    # crash leaves a copy rather than a gap) and deleted. Returns how many moved
+    with transaction.atomic():
+        shipments = list(
+            expired(cutoff).select_for_update().order_by('id')
+            .values(*[field.attname for field in Shipment._meta.concrete_fields])[:batch_size]
+        )
+        if not shipments:
+            return 0
+        ids = [shipment['id'] for shipment in shipments]
+        rows = {'shipments': shipments}
+        for name, (model, key) in TABLES.items():
+            if name != 'shipments':
+                rows[name] = list(
+                    model.objects.filter(**{f'{key}__in': ids}).order_by()
+                    .values(*[field.attname for field in model._meta.concrete_fields])
+                )
+
+        partitions = {shipment['id']: shipment['created_at'].strftime('%Y-%m') for shipment in shipments}
+        for partition in sorted(set(partitions.values())):
+            connection = open_partition(partition, create=True)
+            try:
+                with connection:
+                    for name, (_, key) in TABLES.items():
+                        write_rows(connection, name, [row for row in rows[name] if partitions[row[key]] == partition])
+            finally:
+                connection.close()
+
+        ArchivedShipment.objects.bulk_create([
+            ArchivedShipment(shipment_id=shipment['id'], tracking_id=shipment['tracking_id'], partition=partitions[shipment['id']])
+            for shipment in shipments
+        ], ignore_conflicts=True)
+        Shipment.objects.filter(id__in=ids).delete()
+    return len(shipments)
+
+def archive_expired(days=None, batch_size=None, max_seconds=None):
+    # Archives batch after batch until nothing is left or max_seconds has passed;
+    # returns (shipments archived, whether more may be waiting)
+    cutoff = timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS if days is None else days)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    start = time.monotonic()
+    archived = 0
+    while True:
+        count = archive_batch(cutoff, batch_size)
+        archived += count
+        if count < batch_size:
+            return archived, False
+        if max_seconds is not None and time.monotonic() - start >= max_seconds:
+            return archived, True
+
+def archived_shipment(tracking_id):
+    # An archived shipment as (row shaped like shipment_values, {id: serialized
+    # tracking history}), or None if it was never archived
+    entry = ArchivedShipment.objects.filter(tracking_id=tracking_id).first()
+    connection = entry and open_partition(entry.partition)
+    if not connection:
+        return None
+    try:
+        shipments = read_rows(connection, 'shipments', [entry.shipment_id])
+        events = read_rows(connection, 'tracking', [entry.shipment_id])
+    finally:
+        connection.close()
+    if not shipments:
+        return None
+
+    row = shipments[0]
+    names = get_user_model().objects.filter(id=row['sender_id']).values_list('first_name', 'last_name').first()
+    row['sender__first_name'], row['sender__last_name'] = names or ('', '')
+    events.sort(key=lambda event: (event['timestamp'], event['id']), reverse=True)
+    return row, {row['id']: [tracking_entry(*(event[column] for column in TRACKING_COLUMNS[1:])) for event in events]}
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+
+from jobs.queue import enqueue, task
+from .partitions import archive_expired
+
+def schedule_archive():
+    # One run per ARCHIVE_INTERVAL, however often this is called
+    interval = settings.ARCHIVE_INTERVAL
+    now = time.time()
+    bucket = int(now // interval) + 1
+    return enqueue('archive.run', {'bucket': bucket}, key=f'archive-run-{bucket}', delay=bucket * interval - now)
+
+@task('archive.run')
+def run(payload, key):
+    # Each job stops after ARCHIVE_JOB_SECONDS so it never looks stale to the
+    # queue; a backlog carries on in a follow-up job straight away
+    archived, remaining = archive_expired(max_seconds=settings.ARCHIVE_JOB_SECONDS)
+    if remaining:
+        part = payload.get('part', 0) + 1
+        enqueue('archive.run', {**payload, 'part': part}, key=f"archive-run-{payload.get('bucket')}-{part}")
+    else:
+        schedule_archive()
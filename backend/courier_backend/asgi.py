@@ -0,0 +1,21 @@
+import os
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'courier_backend.settings')
+django.setup(set_prefix=False)
+
+from tracking.asgi import TrackingStreamRouter
+
+class CourierASGIHandler(ASGIHandler):
+    # Resolve against the URLconf that swaps in the async read views
+    urlconf = 'courier_backend.asgi_urls'
+    
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+django_application = CourierASGIHandler()
+application = TrackingStreamRouter(django_application)
@@ -0,0 +1,16 @@
+from django.urls import path
+from payments import async_views as payment_views
+from shipments import async_views as shipment_views
+from tracking import async_views as tracking_views
+from tracking import views as sync_tracking_views
+from .urls import urlpatterns as wsgi_urlpatterns
+
+# Async read paths take precedence under ASGI; everything else falls through to the sync views
+urlpatterns = [
+    path('api/shipments/list/', shipment_views.list_shipments, name='list_shipments'),
+    path('api/shipments/<int:shipment_id>/', shipment_views.shipment_detail, name='shipment_detail'),
+    # Fixed tracking paths go before the <tracking_id> catch-all, as in tracking/urls.py
+    path('api/tracking/cache-stats/', sync_tracking_views.tracking_cache_stats, name='tracking_cache_stats'),
+    path('api/tracking/<str:tracking_id>/', tracking_views.track_shipment, name='track_shipment'),
+    path('api/payments/<int:shipment_id>/status/', payment_views.payment_status, name='payment_status'),
+] + wsgi_urlpatterns
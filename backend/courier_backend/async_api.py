@@ -0,0 +1,39 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+_renderer = JSONRenderer()
+
+def json_response(data, status=200):
+    # Same encoder as DRF's Response so both deployments emit identical bodies
+    return HttpResponse(_renderer.render(data), content_type='application/json', status=status)
+
+def require_get(view):
+    # django.views.decorators.http.require_GET only wraps sync views before Django 5.0
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+def authenticated(view):
+    # Async stand-in for @permission_classes([IsAuthenticated]) on plain Django views
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as exc:
+            return json_response(exc.detail, status=exc.status_code)
+        if result is None:
+            return json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = result[0]
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            return json_response(exc.detail, status=exc.status_code)
+    return wrapper
@@ -0,0 +1,21 @@
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(data):
+    # Byte-for-byte what DRF's JSONRenderer emits for payloads of plain JSON types
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+def json_response(content, status=200):
+    if not isinstance(content, bytes):
+        content = dumps(content)
+    return HttpResponse(content, content_type='application/json', status=status)
@@ -0,0 +1,74 @@
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+KEYSET_ORDERING = ('-created_at', '-id')
+
+def encode_cursor(obj):
+    if isinstance(obj, dict):
+        raw = json.dumps([obj['created_at'].isoformat(), obj['id']])
+    else:
+        raw = json.dumps([obj.created_at.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, int(pk)
+    except (TypeError, ValueError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size', settings.LIST_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError({'page_size': 'Must be an integer'})
+    return max(1, min(page_size, settings.LIST_MAX_PAGE_SIZE))
+
+def seek_page(queryset, cursor, page_size):
+    # Seek past the (created_at, id) cursor instead of OFFSET so deep pages cost the same
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+    return items[:page_size], next_cursor
+
+def paginate_keyset(params, queryset):
+    return seek_page(queryset, params.get('cursor'), get_page_size(params))
+
+def stream_ndjson(queryset, serializer_class, filename, asynchronous=False):
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    renderer = JSONRenderer()
+
+    def rows():
+        for obj in queryset.order_by(*KEYSET_ORDERING).iterator(chunk_size=chunk_size):
+            yield renderer.render(serializer_class(obj).data) + b'\n'
+
+    async def arows():
+        # ASGI buffers sync iterators whole, so walk keyset chunks one thread hop at a time
+        cursor = None
+        while True:
+            page, cursor = await sync_to_async(seek_page)(queryset, cursor, chunk_size)
+            yield b''.join(renderer.render(serializer_class(obj).data) + b'\n' for obj in page)
+            if cursor is None:
+                break
+
+    content = arows() if asynchronous else rows()
+    response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,95 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+# The replica alias a @replica_reads view reads from, None everywhere else
+replica_alias = ContextVar('replica_alias', default=None)
+
+# {'wrote': bool} for the request in progress; routers.ReadWriteRouter sets it
+# on every write so PrimaryPinMiddleware can pin the user afterwards
+request_writes = ContextVar('request_writes', default=None)
+
+def _pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+def _choose(pinned):
+    if pinned or not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+def _known_user(request):
+    # The user if authentication already happened; an unevaluated session user
+    # is left alone, as loading it would query the database from async code
+    user = request.__dict__.get('user')
+    return None if user is None or isinstance(user, SimpleLazyObject) else user
+
+def replica_reads(view):
+    # The view's reads go to one replica, picked per request, unless its user
+    # wrote in the last REPLICA_STICKY_SECONDS. Writes and transactions still
+    # go to the primary. Goes under @api_view / @authenticated so the user is known
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            user = _known_user(request)
+            pinned = user is not None and user.is_authenticated and await cache.aget(_pin_key(user.pk))
+            token = replica_alias.set(_choose(pinned))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                replica_alias.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pinned = request.user.is_authenticated and cache.get(_pin_key(request.user.pk))
+        token = replica_alias.set(_choose(pinned))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            replica_alias.reset(token)
+    return wrapper
+
+class PrimaryPinMiddleware:
+    # After a request that wrote, the user's @replica_reads views read from the
+    # primary for REPLICA_STICKY_SECONDS, so they see their own writes whatever
+    # the replication lag
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        writes = {'wrote': False}
+        token = request_writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_writes.reset(token)
+        if writes['wrote'] and settings.DATABASE_REPLICAS:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                cache.set(_pin_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        writes = {'wrote': False}
+        token = request_writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_writes.reset(token)
+        if writes['wrote'] and settings.DATABASE_REPLICAS:
+            user = getattr(request, 'user', None)
+            if user is not None and await sync_to_async(lambda: user.is_authenticated)():
+                await cache.aset(_pin_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
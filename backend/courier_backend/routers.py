@@ -0,0 +1,30 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .replicas import replica_alias, request_writes
+
+READ_ALIAS = 'reader'
+
+class ReadWriteRouter:
+    # Writes go to "default". Reads go to the replica a @replica_reads view
+    # picked, else to "reader" (when configured), except inside a transaction
+    # on "default", where reads stay put so the transaction sees its own writes
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        alias = replica_alias.get()
+        if alias is not None:
+            return alias
+        return READ_ALIAS if READ_ALIAS in connections.settings else DEFAULT_DB_ALIAS
+    
+    def db_for_write(self, model, **hints):
+        writes = request_writes.get()
+        if writes is not None:
+            writes['wrote'] = True
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias is a view of the same database
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
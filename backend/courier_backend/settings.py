@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from courier_backend.sqlite import read_only_database, tuned_databases
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-your-secret-key-here-change-in-production'
@@ -24,6 +26,12 @@ INSTALLED_APPS = [
     'tracking',
     'payments',
     'support',
+    'pricing',
+    'jobs',
+    'notifications',
+    'webhooks',
+    'analytics',
+    'archive',
 ]
 
 MIDDLEWARE = [
@@ -33,6 +41,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'courier_backend.replicas.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,14 +65,72 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'courier_backend.wsgi.application'
+ASGI_APPLICATION = 'courier_backend.asgi.application'
+
+# SQLite in WAL mode with these pragmas on every connection, connections kept for
+# SQLITE_CONN_MAX_AGE seconds, writes on "default" and reads on "reader"
+# (courier_backend.sqlite, courier_backend.routers). SQLITE_TUNING=0 falls back
+# to Django's stock single-connection setup. cache_size is in KiB when negative
+# (64 MB of page cache per connection), mmap_size in bytes
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+SQLITE_CONN_MAX_AGE = 600
+
+if os.environ.get('SQLITE_TUNING', '1') == '0':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = tuned_databases(BASE_DIR / 'db.sqlite3', SQLITE_PRAGMAS, SQLITE_CONN_MAX_AGE)
+
+# Read replicas for the @replica_reads views (shipment list/detail, payment
+# status, ticket list): each path in SQLITE_REPLICAS (comma separated)
+# becomes a "replica<N>" alias, kept current locally by python manage.py
+# replicate_sqlite. A user who wrote reads from the primary for the next
+# REPLICA_STICKY_SECONDS, which should cover the replication lag
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = read_only_database(path, SQLITE_PRAGMAS, SQLITE_CONN_MAX_AGE)
+    DATABASE_REPLICAS.append(f'replica{number}')
+REPLICA_STICKY_SECONDS = 5
 
-DATABASES = {
+DATABASE_ROUTERS = ['courier_backend.routers.ReadWriteRouter']
+
+# Local memory by default; point REDIS_URL at a Redis-compatible server in production
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Seconds a serialized public tracking payload stays cached
+TRACKING_CACHE_TIMEOUT = 300
+
+# Live tracking streams: pub/sub broker, per-subscriber backlog, keep-alive interval
+# and the lifetime after which clients reconnect with Last-Event-ID
+TRACKING_BROKER = 'tracking.broker.InProcessBroker'
+TRACKING_STREAM_QUEUE_SIZE = 100
+TRACKING_STREAM_HEARTBEAT = 15
+TRACKING_STREAM_MAX_SECONDS = 300
+
+# Most events returned by one /api/tracking/<id>/events/?since=<seq> call
+TRACKING_EVENTS_PAGE_SIZE = 500
+
 AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
@@ -81,6 +148,109 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Number of most recent tracking events embedded per shipment in list responses
+SHIPMENT_LIST_HISTORY_LIMIT = 5
+
+# Keyset pagination for list endpoints and chunk size for NDJSON exports
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+
+# Largest batch accepted by the bulk shipment booking endpoint
+BULK_CREATE_MAX_ITEMS = 1000
+
+# Rows validated and written per transaction by python manage.py import_shipments
+IMPORT_BATCH_SIZE = 2000
+
+# Largest batch accepted by the hub scan ingestion endpoint
+SCAN_BATCH_MAX_ITEMS = 5000
+
+# Courier auto-assignment: active parcels a courier may hold, and how many km of
+# extra distance one more active parcel is worth when balancing load
+AUTO_ASSIGN_MAX_ACTIVE = 50
+AUTO_ASSIGN_LOAD_PENALTY_KM = 5.0
+
+# Delivery route planning: solver callable(distance_matrix, start_index) -> visiting
+# order, and the seconds 2-opt may spend improving one route
+ROUTE_SOLVER = 'shipments.routing.nearest_neighbour_two_opt'
+ROUTE_SOLVER_TIME_LIMIT = 2.0
+
+# Delivery address geocoding: geocoder class with geocode(normalized_address) ->
+# (lat, lon) or None, its gazetteer file, and the in-process LRU size in front of
+# the GeocodedAddress table
+GEOCODER = 'shipments.geocoding.GazetteerGeocoder'
+GEOCODER_GAZETTEER = BASE_DIR / 'shipments' / 'data' / 'gazetteer.csv'
+GEOCODE_MEMORY_CACHE_SIZE = 10000
+
+# Most geohash cell prefixes a nearby-shipments query expands to
+GEOHASH_MAX_CELLS = 16
+
+# Pricing: rate used when no rate card matches a lane, cm³ per volumetric kg,
+# longest side accepted in dimensions, seconds between checks for edited rate
+# cards, and the batch quote size limit
+PRICING_DEFAULT_RATE = {'per_kg': '10.00'}
+PRICING_VOLUMETRIC_DIVISOR = 5000
+PRICING_MAX_DIMENSION_CM = 1000
+PRICING_RELOAD_INTERVAL = 5
+PRICING_QUOTE_MAX_ITEMS = 5000
+
+# Background jobs (python manage.py run_jobs): worker threads, jobs claimed per
+# query, seconds between polls of an empty queue, retry policy with exponential backoff, seconds before a
+# running job whose worker vanished is requeued, and JOBS_EAGER to run jobs inline
+JOBS_WORKER_CONCURRENCY = 8
+JOBS_CLAIM_BATCH = 50
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 2
+JOBS_RETRY_BACKOFF_MAX = 300
+JOBS_LOCK_TIMEOUT = 600
+JOBS_EAGER = False
+
+# Outbound SMS/email transport used by jobs; the fake one can simulate provider
+# latency (seconds) and a failure rate to exercise retries
+MESSAGE_TRANSPORT = 'jobs.transports.FakeTransport'
+FAKE_TRANSPORT_LATENCY = 0
+FAKE_TRANSPORT_FAILURE_RATE = 0
+
+# Status change notifications: seconds of events coalesced into one dispatch,
+# channels fanned out to, and how many messages of a batch are sent at once
+NOTIFICATION_WINDOW = 30
+NOTIFICATION_CHANNELS = ['email', 'sms', 'webhook']
+NOTIFICATION_SEND_CONCURRENCY = 16
+
+# Partner webhooks (python manage.py run_webhooks): events per signed POST, POSTs
+# per subscriber before yielding to others, attempts before an event is
+# dead-lettered, per-subscriber backoff, HTTP timeout, idle keep-alive connections
+# kept per host, and subscribers served at once. Subscription URLs must resolve
+# to public addresses unless WEBHOOK_ALLOW_PRIVATE_URLS is set (local testing only)
+WEBHOOK_BATCH_SIZE = 100
+WEBHOOK_MAX_BATCHES_PER_ROUND = 10
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_RETRY_BACKOFF = 5
+WEBHOOK_RETRY_BACKOFF_MAX = 3600
+WEBHOOK_TIMEOUT = 5
+WEBHOOK_POOL_MAX_IDLE = 4
+WEBHOOK_WORKER_CONCURRENCY = 16
+WEBHOOK_ALLOW_PRIVATE_URLS = False
+
+# Days covered by the analytics report when no from date is given
+ANALYTICS_DEFAULT_DAYS = 30
+
+# Columnar exports (python manage.py export_columnar): output directory and rows
+# per Parquet row group / Arrow record batch, which bounds the exporter's memory
+COLUMNAR_EXPORT_DIR = BASE_DIR / 'exports'
+COLUMNAR_EXPORT_BATCH_ROWS = 50000
+
+# Archival (python manage.py archive_shipments): delivered/cancelled shipments with
+# no event for ARCHIVE_AFTER_DAYS move to monthly SQLite files in ARCHIVE_DIR,
+# ARCHIVE_BATCH_SIZE per transaction; the background job runs every
+# ARCHIVE_INTERVAL seconds for at most ARCHIVE_JOB_SECONDS at a time
+ARCHIVE_DIR = BASE_DIR / 'archives'
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL = 3600
+ARCHIVE_JOB_SECONDS = 60
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
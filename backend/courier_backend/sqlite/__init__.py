@@ -0,0 +1,24 @@
+def read_only_database(name, pragmas, conn_max_age):
+    return {
+        'ENGINE': 'courier_backend.sqlite',
+        'NAME': name,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pragmas': {**pragmas, 'query_only': 'ON'}},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+def tuned_databases(name, pragmas, conn_max_age):
+    # "default" takes every write, starting transactions with BEGIN IMMEDIATE;
+    # "reader" is a read-only second set of connections to the same file that
+    # routers.ReadWriteRouter sends reads to. WAL lets the two run side by side
+    return {
+        'default': {
+            'ENGINE': 'courier_backend.sqlite',
+            'NAME': name,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'pragmas': pragmas},
+        },
+        'reader': read_only_database(name, pragmas, conn_max_age),
+    }
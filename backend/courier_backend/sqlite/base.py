@@ -0,0 +1,24 @@
+from django.db.backends.sqlite3 import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Django's SQLite backend plus two OPTIONS it only gains in 5.1: "pragmas",
+    # run on every new connection, and "transaction_mode" for atomic blocks.
+    # IMMEDIATE takes the write lock up front, so a writer queues for
+    # busy_timeout instead of failing with "database is locked" when another
+    # connection wrote between its first read and its first write
+    
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+    
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -10,6 +10,10 @@ urlpatterns = [
     path('api/tracking/', include('tracking.urls')),
     path('api/payments/', include('payments.urls')),
     path('api/support/', include('support.urls')),
+    path('api/pricing/', include('pricing.urls')),
+    path('api/notifications/', include('notifications.urls')),
+    path('api/webhooks/', include('webhooks.urls')),
+    path('api/analytics/', include('analytics.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,42 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.models import Job
+from jobs.queue import Worker, enqueue
+
+class Command(BaseCommand):
+    help = 'Time enqueueing side-effect jobs against running them inline, then drain them with the worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.05, help='Simulated provider latency per job, seconds')
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        count, latency = options['jobs'], options['latency']
+        payload = {'seconds': latency}
+
+        enqueue_times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            enqueue('jobs.sleep', payload)
+            enqueue_times.append((time.perf_counter() - start) * 1000)
+        percentiles = statistics.quantiles(enqueue_times, n=100)
+        self.stdout.write(
+            f'request path with queue: p50={percentiles[49]:.2f}ms p99={percentiles[98]:.2f}ms per job '
+            f'(inline it would be {latency * 1000:.0f}ms)'
+        )
+
+        worker = Worker(concurrency=options['concurrency'], poll_interval=0.05)
+        start = time.perf_counter()
+        worker.run(once=True)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'worker pool ({worker.concurrency} threads): {worker.succeeded} jobs in {elapsed:.2f}s '
+            f'({worker.succeeded / elapsed:.0f} jobs/s, serial would take {count * latency:.1f}s)'
+        )
+        with transaction.atomic():
+            Job.objects.filter(name='jobs.sleep').delete()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import Worker
+
+class Command(BaseCommand):
+    help = 'Run background jobs with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Worker threads (default JOBS_WORKER_CONCURRENCY)')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'])
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'{worker.succeeded} jobs succeeded, {worker.failed} failed')
@@ -0,0 +1,134 @@
+import random
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+def task(name):
+    # Handlers take (payload, key) and must be safe to run more than once
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    if name not in TASKS:
+        raise ValueError(f'Unknown task {name}')
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'run_at': timezone.now() + timedelta(seconds=delay),
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    }
+    if key is None:
+        job = Job.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                job, created = Job.objects.get_or_create(key=key, defaults=fields)
+        except IntegrityError:
+            # Lost a race with another request enqueueing the same key
+            return Job.objects.get(key=key)
+        if not created:
+            return job
+    
+    if settings.JOBS_EAGER:
+        Job.objects.filter(id=job.id).update(status='running', attempts=F('attempts') + 1, locked_at=timezone.now())
+        job.refresh_from_db()
+        execute_job(job)
+    return job
+
+def retry_delay(attempts):
+    delay = min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(1.0, 1.1)
+
+def claim_jobs(limit):
+    # Stamp a batch with a fresh token; a conditional UPDATE makes sure two workers
+    # never take the same row, whatever the database's locking model
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(status='queued', run_at__lte=now)
+        .order_by('run_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    Job.objects.filter(id__in=ids, status='queued').update(
+        status='running', locked_by=token, locked_at=now, attempts=F('attempts') + 1
+    )
+    return list(Job.objects.filter(id__in=ids, locked_by=token))
+
+def requeue_stale():
+    # Jobs whose worker died mid-run go back on the queue, unless they have used
+    # up their attempts: a job that keeps killing its worker must not loop forever
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='dead', locked_by='', last_error='Worker stopped while running the job', finished_at=now
+    )
+    return stale.update(status='queued', locked_by='')
+
+def execute_job(job):
+    # Worker threads keep their database connection between jobs; reconnecting
+    # per job would cost more than most jobs do
+    try:
+        TASKS[job.name](job.payload, job.key or f'job-{job.id}')
+    except Exception as exc:
+        error = traceback.format_exc(limit=5)
+        if isinstance(exc, DatabaseError):
+            connection.close()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(id=job.id).update(status='dead', last_error=error, finished_at=timezone.now())
+        else:
+            Job.objects.filter(id=job.id).update(
+                status='queued', locked_by='', last_error=error,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+    else:
+        Job.objects.filter(id=job.id).update(status='succeeded', last_error='', finished_at=timezone.now())
+        return True
+
+class Worker:
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or settings.JOBS_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.succeeded = self.failed = 0
+    
+    def run(self, once=False):
+        # Keeps up to `concurrency` jobs in flight and starts the next as soon as a
+        # slot frees up, so one slow job never holds back the rest of a batch. Jobs
+        # are claimed JOBS_CLAIM_BATCH at a time to keep claim queries off the
+        # per-job cost. With once=True it returns when nothing is due and nothing is running
+        requeue_stale()
+        claimed = deque()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                if not claimed and len(in_flight) < self.concurrency:
+                    claimed.extend(claim_jobs(max(self.concurrency, settings.JOBS_CLAIM_BATCH)))
+                while claimed and len(in_flight) < self.concurrency:
+                    in_flight.add(pool.submit(execute_job, claimed.popleft()))
+                if not in_flight:
+                    if once:
+                        return
+                    time.sleep(self.poll_interval)
+                    requeue_stale()
+                    continue
+                done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result():
+                        self.succeeded += 1
+                    else:
+                        self.failed += 1
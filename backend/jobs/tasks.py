@@ -0,0 +1,8 @@
+import time
+
+from .queue import task
+
+@task('jobs.sleep')
+def sleep(payload, key):
+    # Stand-in side effect for bench_jobs
+    time.sleep(payload.get('seconds', 0))
@@ -0,0 +1,142 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import OTP, User
+from .models import Job, SentMessage
+from .queue import claim_jobs, enqueue, execute_job, requeue_stale, retry_delay, task
+from .transports import FakeTransport
+
+calls = []
+
+@task('tests.record')
+def record(payload, key):
+    calls.append(key)
+
+@task('tests.fail')
+def fail(payload, key):
+    raise RuntimeError('provider down')
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_BACKOFF=2, JOBS_RETRY_BACKOFF_MAX=300)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+    
+    def run_due(self):
+        return [execute_job(job) for job in claim_jobs(10)]
+    
+    def test_successful_job(self):
+        job = enqueue('tests.record', key='record-1')
+        self.assertEqual(self.run_due(), [True])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('succeeded', 1))
+        self.assertEqual(calls, ['record-1'])
+    
+    def test_failing_job_backs_off_then_dies(self):
+        job = enqueue('tests.fail', max_attempts=2)
+        before = timezone.now()
+        self.assertEqual(self.run_due(), [False])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('queued', 1, ''))
+        self.assertIn('provider down', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=2))
+        # Not due yet, so nobody claims it
+        self.assertEqual(claim_jobs(10), [])
+        
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(self.run_due(), [False])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 2))
+        self.assertIsNotNone(job.finished_at)
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(claim_jobs(10), [])
+    
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        for attempts, low in [(1, 2), (2, 4), (3, 8), (20, 300)]:
+            with self.subTest(attempts=attempts):
+                delay = retry_delay(attempts)
+                self.assertGreaterEqual(delay, low)
+                self.assertLessEqual(delay, low * 1.1)
+    
+    def test_a_claimed_job_is_not_claimed_again(self):
+        enqueue('tests.record')
+        self.assertEqual(len(claim_jobs(10)), 1)
+        self.assertEqual(claim_jobs(10), [])
+    
+    @override_settings(JOBS_LOCK_TIMEOUT=60)
+    def test_stale_running_jobs_are_requeued_or_dead(self):
+        old = timezone.now() - timedelta(seconds=120)
+        retryable = Job.objects.create(name='tests.record', status='running', attempts=1, max_attempts=3,
+                                       locked_by='gone', locked_at=old)
+        exhausted = Job.objects.create(name='tests.record', status='running', attempts=3, max_attempts=3,
+                                       locked_by='gone', locked_at=old)
+        fresh = Job.objects.create(name='tests.record', status='running', attempts=1, max_attempts=3,
+                                   locked_by='alive', locked_at=timezone.now())
+        
+        self.assertEqual(requeue_stale(), 1)
+        retryable.refresh_from_db()
+        exhausted.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((retryable.status, retryable.locked_by), ('queued', ''))
+        self.assertEqual(exhausted.status, 'dead')
+        self.assertIn('Worker stopped', exhausted.last_error)
+        self.assertEqual((fresh.status, fresh.locked_by), ('running', 'alive'))
+    
+    def test_duplicate_key_is_enqueued_once(self):
+        first = enqueue('tests.record', {'n': 1}, key='same')
+        second = enqueue('tests.record', {'n': 2}, key='same')
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Job.objects.filter(key='same').count(), 1)
+        self.run_due()
+        self.assertEqual(calls, ['same'])
+    
+    @override_settings(JOBS_EAGER=True)
+    def test_duplicate_key_runs_once_when_eager(self):
+        enqueue('tests.record', key='eager')
+        enqueue('tests.record', key='eager')
+        self.assertEqual(calls, ['eager'])
+    
+    def test_unknown_task_is_refused(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+class SendOnceTests(TestCase):
+    # A retried job must not send twice, even to a fresh transport that has
+    # forgotten the keys it saw (a restarted worker)
+    def setUp(self):
+        self.user = User.objects.create_user('customer', password='x', email='c@example.com', phone='+14155550100')
+        self.otp = OTP.objects.create(user=self.user, code='123456')
+    
+    def test_retry_after_restart_skips_messages_already_sent(self):
+        first = FakeTransport(latency=0, failure_rate=0, echo=False)
+        with mock.patch('jobs.transports.get_transport', return_value=first):
+            execute_job(enqueue('accounts.send_otp', {'otp_id': self.otp.id}, key='otp-key'))
+        self.assertEqual(sorted(message['channel'] for message in first.sent), ['email', 'sms'])
+        self.assertEqual(SentMessage.objects.count(), 2)
+        
+        restarted = FakeTransport(latency=0, failure_rate=0, echo=False)
+        with mock.patch('jobs.transports.get_transport', return_value=restarted):
+            execute_job(Job.objects.get(key='otp-key'))
+        self.assertEqual(list(restarted.sent), [])
+    
+    def test_partial_failure_resends_only_the_missing_message(self):
+        flaky = FakeTransport(latency=0, failure_rate=0, echo=False)
+        original = flaky.send
+        
+        def fail_email(channel, *args):
+            if channel == 'email':
+                raise RuntimeError('email provider down')
+            return original(channel, *args)
+        
+        with mock.patch('jobs.transports.get_transport', return_value=flaky), \
+                mock.patch.object(flaky, 'send', side_effect=fail_email):
+            job = enqueue('accounts.send_otp', {'otp_id': self.otp.id}, key='otp-partial')
+            self.assertFalse(execute_job(job))
+        self.assertEqual(list(SentMessage.objects.values_list('key', flat=True)), ['otp-partial:sms'])
+        
+        restarted = FakeTransport(latency=0, failure_rate=0, echo=False)
+        with mock.patch('jobs.transports.get_transport', return_value=restarted):
+            execute_job(Job.objects.get(key='otp-partial'))
+        self.assertEqual([message['channel'] for message in restarted.sent], ['email'])
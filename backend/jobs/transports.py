@@ -0,0 +1,58 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import SentMessage
+
+class TransportError(Exception):
+    pass
+
+class FakeTransport:
+    # Local stand-in for SMS/email providers: prints the message, keeps the last
+    # few in memory and can simulate provider latency and failures. Like real
+    # providers it accepts an idempotency key and drops repeats of one
+    def __init__(self, latency=None, failure_rate=None, history=1000, echo=True):
+        self.echo = echo
+        self.latency = settings.FAKE_TRANSPORT_LATENCY if latency is None else latency
+        self.failure_rate = settings.FAKE_TRANSPORT_FAILURE_RATE if failure_rate is None else failure_rate
+        self.sent = deque(maxlen=history)
+        self._keys = OrderedDict()
+        self._key_limit = history * 10
+        self._lock = threading.Lock()
+    
+    def send(self, channel, recipient, subject, body, key):
+        with self._lock:
+            if key in self._keys:
+                return False
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise TransportError(f'Simulated {channel} failure for {recipient}')
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys[key] = True
+            if len(self._keys) > self._key_limit:
+                self._keys.popitem(last=False)
+            self.sent.append({'channel': channel, 'recipient': recipient, 'subject': subject, 'body': body, 'key': key})
+        if self.echo:
+            print(f"[{channel}] to {recipient}: {subject} - {body}")
+        return True
+
+@lru_cache(maxsize=None)
+def get_transport():
+    return import_string(settings.MESSAGE_TRANSPORT)()
+
+def send_once(channel, recipient, subject, body, key):
+    # Sends unless a message with this key already went out. The transport still
+    # gets the key, which covers a crash between its send and the record here
+    if SentMessage.objects.filter(key=key).exists():
+        return False
+    sent = get_transport().send(channel, recipient, subject, body, key)
+    SentMessage.objects.get_or_create(key=key, defaults={'channel': channel})
+    return sent
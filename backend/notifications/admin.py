@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Notification, NotificationBatch
+
+@admin.register(NotificationBatch)
+class NotificationBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'first_event_id', 'last_event_id', 'event_count', 'sent_count', 'failed_count', 'duration_ms', 'created_at']
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['shipment', 'channel', 'recipient', 'status', 'event_count', 'created_at']
+    list_filter = ['channel', 'status']
@@ -0,0 +1,13 @@
+# Each channel maps a shipment (with sender loaded) to its recipients. The webhook
+# channel is not here: it queues onto the sender's webhook subscriptions instead
+
+def email_recipients(shipment):
+    return [shipment.sender.email] if shipment.sender.email else []
+
+def sms_recipients(shipment):
+    return [shipment.receiver_phone] if shipment.receiver_phone else []
+
+CHANNELS = {
+    'email': email_recipients,
+    'sms': sms_recipients,
+}
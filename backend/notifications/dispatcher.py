@@ -0,0 +1,182 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from jobs.transports import get_transport
+from shipments.models import Shipment, ShipmentTracking
+from webhooks.delivery import queue_events
+from .channels import CHANNELS
+from .models import Notification, NotificationBatch
+
+def publish_status_change(first_event_id):
+    # The request path only makes sure one dispatch job exists for the current
+    # window; that job runs when the window closes and picks up every event
+    # written in it, so a burst of scans turns into one message per shipment
+    window = settings.NOTIFICATION_WINDOW
+    now = time.time()
+    bucket = int(now // window)
+    enqueue(
+        'notifications.dispatch', {'first_event_id': first_event_id},
+        key=f'notifications-dispatch-{bucket}', delay=(bucket + 1) * window - now,
+    )
+
+def claim_batch(first_event_id=1):
+    # Claims every tracking event past the cursor; returns None when there is
+    # nothing new or another dispatcher got there first. Before the first batch
+    # the cursor starts at the event that triggered dispatch, not at history.
+    # A cursor is only safe because event ids become visible in id order: SQLite
+    # runs one write transaction at a time. With concurrent writers (Postgres) a
+    # lower id can commit after a higher one was claimed and would be skipped, so
+    # moving there means claiming by an unprocessed flag on the event instead
+    cursor = NotificationBatch.objects.aggregate(last=Max('last_event_id'))['last']
+    if cursor is None:
+        cursor = first_event_id - 1
+    latest = ShipmentTracking.objects.filter(id__gt=cursor).aggregate(last=Max('id'))['last']
+    if latest is None:
+        return None
+    try:
+        with transaction.atomic():
+            return NotificationBatch.objects.create(first_event_id=cursor + 1, last_event_id=latest)
+    except IntegrityError:
+        return None
+
+def skip_events(first_event_id, last_event_id):
+    # Moves the cursor past a range of events nobody should be notified about,
+    # e.g. imported history; call in the transaction that wrote them. Events
+    # still waiting before the range are claimed as a batch of their own first
+    cursor = NotificationBatch.objects.aggregate(last=Max('last_event_id'))['last']
+    if cursor is None:
+        # Nothing dispatched yet: waiting events start where the earliest dispatch job does
+        waiting = Job.objects.filter(name='notifications.dispatch', status__in=['queued', 'running'])
+        cursor = min((payload['first_event_id'] for payload in waiting.values_list('payload', flat=True)),
+                     default=first_event_id) - 1
+    if cursor + 1 < first_event_id:
+        batch = NotificationBatch.objects.create(first_event_id=cursor + 1, last_event_id=first_event_id - 1)
+        enqueue('notifications.deliver', {'batch_id': batch.id}, key=f'notification-batch-{batch.id}')
+    return NotificationBatch.objects.create(
+        first_event_id=max(first_event_id, cursor + 1), last_event_id=last_event_id, delivered_at=timezone.now()
+    )
+
+def dispatch_pending(first_event_id=1):
+    batch = claim_batch(first_event_id)
+    if batch is not None:
+        enqueue('notifications.deliver', {'batch_id': batch.id}, key=f'notification-batch-{batch.id}')
+    return batch
+
+def coalesce(events):
+    # Latest event per shipment, plus how many it stands for
+    latest, counts = {}, defaultdict(int)
+    for event in events:
+        counts[event['shipment_id']] += 1
+        current = latest.get(event['shipment_id'])
+        if current is None or (event['timestamp'], event['id']) > (current['timestamp'], current['id']):
+            latest[event['shipment_id']] = event
+    return latest, counts
+
+def message_body(shipment, event, count):
+    body = f"{shipment.tracking_id} is now {event['status']}"
+    if event['location']:
+        body += f" at {event['location']}"
+    if count > 1:
+        body += f' ({count} updates)'
+    return body
+
+def webhook_event(shipment, event, count):
+    return {
+        'type': 'shipment.status_changed',
+        'tracking_id': shipment.tracking_id,
+        'status': event['status'],
+        'location': event['location'],
+        'timestamp': event['timestamp'].isoformat(),
+        'updates': count,
+    }
+
+def deliver_batch(batch, transport=None):
+    transport = transport or get_transport()
+    start = time.perf_counter()
+    # A shipment's first event is its booking (seq 1), which the customer just did
+    # themselves; batches still cover those ids but nobody is notified about them
+    events = list(
+        ShipmentTracking.objects.filter(id__gte=batch.first_event_id, id__lte=batch.last_event_id)
+        .exclude(seq=1).values('id', 'shipment_id', 'status', 'location', 'timestamp')
+    )
+    latest, counts = coalesce(events)
+    shipments = Shipment.objects.select_related('sender').in_bulk(list(latest))
+    
+    # A retried batch skips whatever it already delivered
+    delivered = set(
+        Notification.objects.filter(batch=batch, status='sent').values_list('shipment_id', 'channel', 'recipient')
+    )
+    messages = []
+    webhook_events = []
+    for shipment_id, event in latest.items():
+        shipment = shipments.get(shipment_id)
+        if shipment is None:
+            continue
+        if 'webhook' in settings.NOTIFICATION_CHANNELS:
+            webhook_events.append((
+                shipment.sender_id, f'notification-{batch.id}-{shipment_id}',
+                webhook_event(shipment, event, counts[shipment_id]),
+            ))
+        for channel in settings.NOTIFICATION_CHANNELS:
+            for recipient in CHANNELS[channel](shipment) if channel in CHANNELS else []:
+                if (shipment_id, channel, recipient) in delivered:
+                    continue
+                messages.append((shipment, channel, recipient, message_body(shipment, event, counts[shipment_id])))
+    
+    # Webhooks go onto each subscriber's own delivery queue; keys make a retried batch a no-op here
+    queue_events(webhook_events)
+    
+    def send(message):
+        shipment, channel, recipient, body = message
+        key = f'notification-{batch.id}-{shipment.id}-{channel}-{recipient}'
+        try:
+            transport.send(channel, recipient, f'Shipment {shipment.tracking_id} update', body, key)
+        except Exception as exc:
+            return str(exc) or exc.__class__.__name__
+        return ''
+    
+    # Channels are sent concurrently so one slow provider only slows its own messages
+    with ThreadPoolExecutor(max_workers=settings.NOTIFICATION_SEND_CONCURRENCY) as pool:
+        errors = list(pool.map(send, messages))
+    
+    Notification.objects.bulk_create([
+        Notification(
+            batch=batch, shipment=shipment, channel=channel, recipient=recipient, body=body,
+            event_count=counts[shipment.id], status='failed' if error else 'sent', error=error,
+        )
+        for (shipment, channel, recipient, body), error in zip(messages, errors)
+    ])
+    failed = sum(1 for error in errors if error)
+    NotificationBatch.objects.filter(id=batch.id).update(
+        event_count=len(events),
+        shipment_count=len(latest),
+        sent_count=len(delivered) + len(messages) - failed,
+        failed_count=failed,
+        duration_ms=(time.perf_counter() - start) * 1000,
+        delivered_at=None if failed else timezone.now(),
+    )
+    return failed
+
+def notification_stats(limit=100):
+    batches = list(NotificationBatch.objects.exclude(duration_ms=None).order_by('-id')[:limit])
+    events = sum(batch.event_count for batch in batches)
+    sent = sum(batch.sent_count for batch in batches)
+    seconds = sum(batch.duration_ms for batch in batches) / 1000
+    return {
+        'batches': len(batches),
+        'events': events,
+        'shipments': sum(batch.shipment_count for batch in batches),
+        'sent': sent,
+        'failed': sum(batch.failed_count for batch in batches),
+        'events_per_message': round(events / sent, 2) if sent else None,
+        'messages_per_second': round(sent / seconds, 1) if seconds else None,
+        'pending_batches': NotificationBatch.objects.filter(duration_ms=None).count(),
+    }
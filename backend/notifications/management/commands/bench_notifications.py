@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from jobs.transports import FakeTransport
+from notifications.dispatcher import claim_batch, deliver_batch
+from shipments.models import Shipment, ShipmentTracking
+
+class Command(BaseCommand):
+    help = 'Time status updates against a slow notification provider, then the coalesced fan-out of those events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='admin')
+        parser.add_argument('--shipments', type=int, default=100)
+        parser.add_argument('--updates', type=int, default=5, help='Status updates per shipment')
+        parser.add_argument('--latency', type=float, default=0.2, help='Simulated provider latency per message, seconds')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+        shipment_ids = list(Shipment.objects.order_by('-id').values_list('id', flat=True)[:options['shipments']])
+        if not shipment_ids:
+            raise CommandError('No shipments to update')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        statuses = ['picked_up', 'in_transit', 'out_for_delivery']
+
+        # Roll back so the benchmark leaves no events, jobs or notifications behind
+        with transaction.atomic():
+            latencies = []
+            for round_number in range(options['updates']):
+                for shipment_id in shipment_ids:
+                    start = time.perf_counter()
+                    response = client.put(
+                        f'/api/shipments/{shipment_id}/update-status/',
+                        {'status': statuses[round_number % len(statuses)], 'location': f'Hub {round_number}'},
+                        format='json',
+                    )
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f'Status update failed: {response.status_code} {response.data}')
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'status updates: {len(latencies)} with a {options["latency"] * 1000:.0f}ms provider, '
+                f'p50={percentiles[49]:.2f}ms p99={percentiles[98]:.2f}ms'
+            )
+
+            first_event = ShipmentTracking.objects.order_by('-id').values_list('id', flat=True)[len(latencies) - 1]
+            batch = claim_batch(first_event)
+            transport = FakeTransport(latency=options['latency'], echo=False)
+            start = time.perf_counter()
+            failed = deliver_batch(batch, transport)
+            elapsed = time.perf_counter() - start
+            batch.refresh_from_db()
+            self.stdout.write(
+                f'dispatch: {batch.event_count} events -> {batch.shipment_count} shipments -> '
+                f'{batch.sent_count} messages ({failed} failed) in {elapsed:.2f}s '
+                f'({batch.sent_count / elapsed:.0f} messages/s, serial would take {batch.sent_count * options["latency"]:.1f}s)'
+            )
+            transaction.set_rollback(True)
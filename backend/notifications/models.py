@@ -0,0 +1,43 @@
+from django.db import models
+from shipments.models import Shipment
+
+class NotificationBatch(models.Model):
+    # A claimed range of tracking event ids; the newest batch's last_event_id is
+    # the dispatch cursor, and the unique first_event_id stops two dispatchers
+    # from claiming the same range
+    first_event_id = models.BigIntegerField(unique=True)
+    last_event_id = models.BigIntegerField()
+    event_count = models.PositiveIntegerField(default=0)
+    shipment_count = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    duration_ms = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Events {self.first_event_id}-{self.last_event_id}"
+
+class Notification(models.Model):
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    batch = models.ForeignKey(NotificationBatch, on_delete=models.CASCADE, related_name='notifications')
+    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)
+    body = models.TextField()
+    event_count = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} for {self.shipment.tracking_id}"
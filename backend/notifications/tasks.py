@@ -0,0 +1,14 @@
+from jobs.queue import task
+from .dispatcher import deliver_batch, dispatch_pending
+from .models import NotificationBatch
+
+@task('notifications.dispatch')
+def dispatch(payload, key):
+    dispatch_pending(payload.get('first_event_id', 1))
+
+@task('notifications.deliver')
+def deliver(payload, key):
+    batch = NotificationBatch.objects.filter(id=payload['batch_id']).first()
+    if batch is not None and deliver_batch(batch):
+        # Raising hands the batch back to the job queue's retry/backoff
+        raise RuntimeError(f'Some notifications in batch {batch.id} failed')
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from jobs.models import Job
+from jobs.transports import FakeTransport
+from shipments.events import append_events
+from shipments.models import ShipmentTracking
+from shipments.tests import create_shipments
+from .dispatcher import claim_batch, coalesce, deliver_batch, skip_events
+from .models import Notification, NotificationBatch
+
+def scan(shipment, status, **fields):
+    return ShipmentTracking(shipment=shipment, status=status, location=f'{status} hub', **fields)
+
+class CoalesceTests(SimpleTestCase):
+    def test_latest_event_wins_by_time_then_id(self):
+        now = timezone.now()
+        events = [
+            {'id': 1, 'shipment_id': 7, 'timestamp': now, 'status': 'picked_up'},
+            {'id': 2, 'shipment_id': 7, 'timestamp': now + timedelta(minutes=5), 'status': 'in_transit'},
+            # Backdated scan arriving later in the log
+            {'id': 3, 'shipment_id': 7, 'timestamp': now + timedelta(minutes=1), 'status': 'picked_up'},
+            {'id': 4, 'shipment_id': 8, 'timestamp': now, 'status': 'picked_up'},
+            {'id': 5, 'shipment_id': 8, 'timestamp': now, 'status': 'in_transit'},
+        ]
+        latest, counts = coalesce(events)
+        self.assertEqual({shipment_id: event['id'] for shipment_id, event in latest.items()}, {7: 2, 8: 5})
+        self.assertEqual(counts, {7: 3, 8: 2})
+
+@override_settings(NOTIFICATION_CHANNELS=['email', 'sms'], JOBS_EAGER=False)
+class DispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer', email='c@example.com')
+        cls.first, cls.second = create_shipments(cls.customer, 2, events=1)
+    
+    def setUp(self):
+        self.transport = FakeTransport(latency=0, failure_rate=0, echo=False)
+    
+    def append(self, *events):
+        append_events(list(events))
+        return [event.id for event in events]
+    
+    def test_burst_of_scans_is_one_message_per_shipment_and_channel(self):
+        ids = self.append(
+            scan(self.first, 'picked_up'), scan(self.first, 'in_transit'), scan(self.second, 'picked_up'),
+            scan(self.first, 'out_for_delivery'),
+        )
+        batch = claim_batch(ids[0])
+        self.assertEqual(deliver_batch(batch, self.transport), 0)
+        
+        self.assertEqual(len(self.transport.sent), 4)
+        bodies = {(message['channel'], message['body']) for message in self.transport.sent}
+        self.assertIn(('email', f'{self.first.tracking_id} is now out_for_delivery at out_for_delivery hub (3 updates)'),
+                      bodies)
+        self.assertIn(('sms', f'{self.second.tracking_id} is now picked_up at picked_up hub'), bodies)
+        batch.refresh_from_db()
+        self.assertEqual((batch.event_count, batch.shipment_count, batch.sent_count, batch.failed_count), (4, 2, 4, 0))
+        self.assertIsNotNone(batch.delivered_at)
+    
+    def test_booking_events_are_not_notified(self):
+        booked = ShipmentTracking.objects.get(shipment=self.first, seq=1)
+        batch = claim_batch(booked.id)
+        self.assertEqual(deliver_batch(batch, self.transport), 0)
+        self.assertEqual(list(self.transport.sent), [])
+        self.assertEqual(Notification.objects.count(), 0)
+    
+    def test_retry_sends_only_what_failed(self):
+        batch = claim_batch(self.append(scan(self.first, 'picked_up'))[0])
+        original = self.transport.send
+        
+        def fail_sms(channel, *args):
+            if channel == 'sms':
+                raise RuntimeError('sms provider down')
+            return original(channel, *args)
+        
+        self.transport.send = fail_sms
+        self.assertEqual(deliver_batch(batch, self.transport), 1)
+        batch.refresh_from_db()
+        self.assertIsNone(batch.delivered_at)
+        
+        retry = FakeTransport(latency=0, failure_rate=0, echo=False)
+        self.assertEqual(deliver_batch(batch, retry), 0)
+        self.assertEqual([message['channel'] for message in retry.sent], ['sms'])
+    
+    def test_cursor_starts_at_the_triggering_event(self):
+        ids = self.append(scan(self.first, 'picked_up'), scan(self.second, 'picked_up'))
+        batch = claim_batch(ids[1])
+        self.assertEqual((batch.first_event_id, batch.last_event_id), (ids[1], ids[1]))
+    
+    def test_cursor_moves_past_each_claimed_batch(self):
+        first_ids = self.append(scan(self.first, 'picked_up'), scan(self.second, 'picked_up'))
+        first = claim_batch(first_ids[0])
+        self.assertEqual((first.first_event_id, first.last_event_id), (first_ids[0], first_ids[1]))
+        # Nothing new, and a later dispatch job does not rewind to its own trigger
+        self.assertIsNone(claim_batch(first_ids[0]))
+        
+        later_ids = self.append(scan(self.first, 'in_transit'))
+        second = claim_batch(first_ids[0])
+        self.assertEqual((second.first_event_id, second.last_event_id), (first_ids[1] + 1, later_ids[0]))
+    
+    def test_skipped_events_are_never_claimed(self):
+        waiting = self.append(scan(self.first, 'picked_up'))
+        Job.objects.create(name='notifications.dispatch', payload={'first_event_id': waiting[0]})
+        imported = self.append(scan(self.second, 'picked_up'), scan(self.second, 'in_transit'))
+        skipped = skip_events(imported[0], imported[-1])
+        
+        # Events already waiting get their own batch queued for delivery
+        pending = NotificationBatch.objects.get(first_event_id=waiting[0])
+        self.assertEqual(pending.last_event_id, imported[0] - 1)
+        self.assertTrue(Job.objects.filter(key=f'notification-batch-{pending.id}').exists())
+        self.assertEqual((skipped.first_event_id, skipped.last_event_id), (imported[0], imported[-1]))
+        self.assertIsNone(claim_batch(waiting[0]))
+        
+        later = self.append(scan(self.first, 'in_transit'))
+        self.assertEqual(claim_batch(waiting[0]).first_event_id, imported[-1] + 1)
+        self.assertEqual(later[0], imported[-1] + 1)
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('stats/', views.dispatch_stats, name='notification_dispatch_stats'),
+]
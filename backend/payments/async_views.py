@@ -0,0 +1,21 @@
+from courier_backend.async_api import authenticated, json_response, require_get
+from courier_backend.replicas import replica_reads
+from shipments.models import Shipment
+from .models import Payment
+
+@require_get
+@authenticated
+@replica_reads
+async def payment_status(request, shipment_id):
+    if not await Shipment.objects.filter(id=shipment_id).aexists():
+        return json_response({'detail': 'Not found.'}, status=404)
+    
+    payment = await Payment.objects.filter(shipment_id=shipment_id).afirst()
+    if payment is None:
+        return json_response({'error': 'Payment not found'}, status=404)
+    return json_response({
+        'payment_status': payment.payment_status,
+        'amount': payment.amount,
+        'payment_method': payment.payment_method,
+        'transaction_id': payment.transaction_id
+    })
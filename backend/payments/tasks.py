@@ -0,0 +1,16 @@
+from jobs.queue import task
+from jobs.transports import send_once
+from .models import Payment
+
+@task('payments.send_confirmation')
+def send_confirmation(payload, key):
+    payment = Payment.objects.select_related('shipment__sender').filter(id=payload['payment_id']).first()
+    if payment is None:
+        return
+    sender = payment.shipment.sender
+    if payment.payment_status == 'completed':
+        body = f'Payment of {payment.amount} received for {payment.shipment.tracking_id} ({payment.transaction_id})'
+    else:
+        body = f'Cash on delivery of {payment.amount} registered for {payment.shipment.tracking_id}'
+    if sender.email:
+        send_once('email', sender.email, 'Payment confirmation', body, key)
@@ -3,7 +3,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from courier_backend.replicas import replica_reads
 from shipments.models import Shipment
+from tracking.cache import invalidate_tracking
+from jobs.queue import enqueue
+from analytics.rollups import record_payment
 from .models import Payment
 import uuid
 
@@ -24,6 +28,9 @@ def process_payment(request, shipment_id):
                 'payment_status': 'pending'
             }
         )
+        if created:
+            record_payment(payment)
+        enqueue('payments.send_confirmation', {'payment_id': payment.id}, key=f'payment-{payment.id}')
         return Response({'message': 'COD payment registered'})
     
     else:
@@ -37,14 +44,20 @@ def process_payment(request, shipment_id):
                 'transaction_id': f"TXN{uuid.uuid4().hex[:8].upper()}"
             }
         )
+        if created:
+            record_payment(payment)
         
+        # Only these columns: status and the last_* projection belong to append_events
         shipment.payment_status = True
-        shipment.save()
+        shipment.save(update_fields=['payment_status', 'updated_at'])
+        invalidate_tracking(shipment.tracking_id)
+        enqueue('payments.send_confirmation', {'payment_id': payment.id}, key=f'payment-{payment.id}')
         
         return Response({'message': 'Payment processed successfully', 'transaction_id': payment.transaction_id})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def payment_status(request, shipment_id):
     shipment = get_object_or_404(Shipment, id=shipment_id)
     
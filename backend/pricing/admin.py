@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import Zone, RateCard
+
+@admin.register(Zone)
+class ZoneAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'geohash_prefixes', 'updated_at']
+    search_fields = ['code', 'name']
+
+@admin.register(RateCard)
+class RateCardAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'base_charge', 'per_kg', 'per_km', 'cod_charge', 'min_charge', 'updated_at']
+    list_filter = ['origin_zone', 'destination_zone']
@@ -0,0 +1,184 @@
+import re
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from rest_framework.exceptions import ValidationError
+
+from shipments.geo import encode_geohash, haversine_km
+from shipments.geocoding import get_geocode_cache
+from shipments.models import Shipment
+from .models import RateCard, Zone
+
+CENT = Decimal('0.01')
+GRAM = Decimal('0.001')
+
+# Largest cost Shipment.cost can store
+_cost_field = Shipment._meta.get_field('cost')
+MAX_COST = Decimal(10) ** (_cost_field.max_digits - _cost_field.decimal_places) - CENT
+
+DIMENSIONS = re.compile(
+    r'\b(\d+(?:\.\d+)?)\s*[x×*]\s*(\d+(?:\.\d+)?)\s*[x×*]\s*(\d+(?:\.\d+)?)\s*(mm|cm|m|in)?\b',
+    re.IGNORECASE,
+)
+CM_PER_UNIT = {'mm': Decimal('0.1'), 'cm': Decimal(1), 'm': Decimal(100), 'in': Decimal('2.54')}
+
+def volumetric_weight(dimensions):
+    # Free-text "L x W x H [unit]", centimetres when no unit is given; None if
+    # unparseable, ValidationError if a side is longer than PRICING_MAX_DIMENSION_CM
+    match = DIMENSIONS.search(dimensions or '')
+    if match is None:
+        return None
+    scale = CM_PER_UNIT[(match.group(4) or 'cm').lower()]
+    sides = [Decimal(match.group(index)) * scale for index in (1, 2, 3)]
+    if max(sides) > settings.PRICING_MAX_DIMENSION_CM:
+        raise ValidationError(f'No side may be longer than {settings.PRICING_MAX_DIMENSION_CM} cm.')
+    volume = sides[0] * sides[1] * sides[2]
+    return (volume / settings.PRICING_VOLUMETRIC_DIVISOR).quantize(GRAM, rounding=ROUND_HALF_UP)
+
+class Rate:
+    __slots__ = ('base_charge', 'per_kg', 'per_km', 'cod_charge', 'min_charge')
+    
+    def __init__(self, base_charge=0, per_kg=0, per_km=0, cod_charge=0, min_charge=0):
+        self.base_charge = Decimal(base_charge)
+        self.per_kg = Decimal(per_kg)
+        self.per_km = Decimal(per_km)
+        self.cod_charge = Decimal(cod_charge)
+        self.min_charge = Decimal(min_charge)
+    
+    def price(self, chargeable_weight, distance_km, cash_on_delivery):
+        cost = self.base_charge + self.per_kg * chargeable_weight
+        if distance_km:
+            cost += self.per_km * distance_km
+        if cash_on_delivery:
+            cost += self.cod_charge
+        cost = max(cost, self.min_charge)
+        if cost > MAX_COST:
+            raise ValidationError(f'The quoted cost exceeds {MAX_COST}.')
+        return cost.quantize(CENT, rounding=ROUND_HALF_UP)
+
+class RateTable:
+    # Zones indexed by geohash prefix and rates by (origin, destination) code, with
+    # None as the wildcard; built once from the database and swapped whole on reload
+    def __init__(self, zones, rates, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.zone_by_prefix = {}
+        for code, prefixes in zones:
+            for prefix in prefixes:
+                self.zone_by_prefix[prefix] = code
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.zone_by_prefix}, reverse=True)
+        self.rates = dict(rates)
+        self.default_rate = Rate(**settings.PRICING_DEFAULT_RATE)
+    
+    @classmethod
+    def load(cls, fingerprint=None):
+        zones = [(zone.code, zone.prefixes()) for zone in Zone.objects.all()]
+        rates = [
+            ((card.origin_zone and card.origin_zone.code, card.destination_zone and card.destination_zone.code), Rate(
+                card.base_charge, card.per_kg, card.per_km, card.cod_charge, card.min_charge
+            ))
+            for card in RateCard.objects.select_related('origin_zone', 'destination_zone')
+        ]
+        return cls(zones, rates, fingerprint)
+    
+    def zone_for(self, geohash):
+        # Longest matching prefix wins, so a city zone can sit inside a region zone
+        if geohash:
+            for length in self.prefix_lengths:
+                code = self.zone_by_prefix.get(geohash[:length])
+                if code is not None:
+                    return code
+        return None
+    
+    def rate_for(self, origin, destination):
+        rates = self.rates
+        return (
+            rates.get((origin, destination)) or rates.get((origin, None))
+            or rates.get((None, destination)) or rates.get((None, None)) or self.default_rate
+        )
+
+def rate_fingerprint():
+    zones = Zone.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    rates = RateCard.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return zones['count'], zones['updated'], rates['count'], rates['updated']
+
+_table = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def get_rate_table():
+    # Re-reads the rate cards only when their row count or newest updated_at moved,
+    # and checks that at most once per PRICING_RELOAD_INTERVAL
+    global _table, _checked_at
+    now = time.monotonic()
+    if _table is not None and now - _checked_at < settings.PRICING_RELOAD_INTERVAL:
+        return _table
+    with _lock:
+        if _table is None or now - _checked_at >= settings.PRICING_RELOAD_INTERVAL:
+            fingerprint = rate_fingerprint()
+            if _table is None or _table.fingerprint != fingerprint:
+                _table = RateTable.load(fingerprint)
+            _checked_at = now
+    return _table
+
+def reset_rate_table():
+    global _table
+    with _lock:
+        _table = None
+
+def price_shipments(items, table=None):
+    # Items need weight, dimensions, pickup_address, delivery_address and
+    # payment_method. Addresses are geocoded in one batch and distances computed
+    # as one vectorized haversine over the whole batch
+    table = table or get_rate_table()
+    points = get_geocode_cache().lookup_many(
+        [item['pickup_address'] for item in items] + [item['delivery_address'] for item in items]
+    )
+    origins = [points[item['pickup_address']] for item in items]
+    destinations = [points[item['delivery_address']] for item in items]
+    
+    def coordinates(located):
+        return np.array([point or (np.nan, np.nan) for point in located], dtype=float).reshape(-1, 2)
+    
+    origin, destination = coordinates(origins), coordinates(destinations)
+    distances = haversine_km(origin[:, 0], origin[:, 1], destination[:, 0], destination[:, 1])
+    
+    geohashes = {}
+    
+    def zone_for(point):
+        if point is None:
+            return None
+        if point not in geohashes:
+            geohashes[point] = table.zone_for(encode_geohash(*point))
+        return geohashes[point]
+    
+    # An item that cannot be priced gets {'errors': {field: [messages]}} in place of a quote
+    quotes = []
+    for item, origin_point, destination_point, distance in zip(items, origins, destinations, distances.tolist()):
+        weight = Decimal(item['weight'])
+        try:
+            volumetric = volumetric_weight(item.get('dimensions'))
+        except ValidationError as exc:
+            quotes.append({'errors': {'dimensions': exc.detail}})
+            continue
+        chargeable = (max(weight, volumetric) if volumetric is not None else weight).quantize(GRAM)
+        distance_km = None if np.isnan(distance) else Decimal(distance).quantize(GRAM, rounding=ROUND_HALF_UP)
+        origin_zone, destination_zone = zone_for(origin_point), zone_for(destination_point)
+        rate = table.rate_for(origin_zone, destination_zone)
+        try:
+            cost = rate.price(chargeable, distance_km, item['payment_method'] == 'cod')
+        except ValidationError as exc:
+            quotes.append({'errors': {'cost': exc.detail}})
+            continue
+        quotes.append({
+            'cost': cost,
+            'chargeable_weight': chargeable,
+            'volumetric_weight': volumetric,
+            'distance_km': distance_km,
+            'origin_zone': origin_zone,
+            'destination_zone': destination_zone,
+        })
+    return quotes
@@ -0,0 +1,38 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from pricing.engine import get_rate_table, price_shipments
+from shipments.geocoding import GazetteerGeocoder
+
+class Command(BaseCommand):
+    help = 'Price batches of synthetic shipments against the current rate tables and report quotes/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        places = list(GazetteerGeocoder().places)
+        rng = random.Random(0)
+        items = [
+            {
+                'weight': f'{rng.uniform(0.1, 30):.2f}',
+                'dimensions': f'{rng.randint(5, 80)}x{rng.randint(5, 60)}x{rng.randint(2, 40)} cm',
+                'pickup_address': f'{rng.randint(1, 999)} Main St, {rng.choice(places)}',
+                'delivery_address': f'{rng.randint(1, 999)} Market St, {rng.choice(places)}',
+                'payment_method': rng.choice(['cod', 'online']),
+            }
+            for _ in range(options['batch'])
+        ]
+        table = get_rate_table()
+        self.stdout.write(f'rate table: {len(table.rates)} rate cards, {len(table.zone_by_prefix)} zone prefixes')
+
+        # The first round also fills the geocode cache; later rounds are pure pricing
+        for round_number in range(options['rounds']):
+            start = time.perf_counter()
+            quotes = price_shipments(items)
+            elapsed = time.perf_counter() - start
+            label = 'cold' if round_number == 0 else 'warm'
+            self.stdout.write(f'{label}: {len(quotes)} quotes in {elapsed * 1000:.1f}ms ({len(quotes) / elapsed:.0f} quotes/s)')
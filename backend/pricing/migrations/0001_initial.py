@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Zone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('geohash_prefixes', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RateCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_charge', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_kg', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_km', models.DecimalField(decimal_places=4, default=0, max_digits=10)),
+                ('cod_charge', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('min_charge', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination_zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inbound_rates', to='pricing.zone')),
+                ('origin_zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbound_rates', to='pricing.zone')),
+            ],
+            options={
+                'unique_together': {('origin_zone', 'destination_zone')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+class Zone(models.Model):
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    # Comma-separated geohash prefixes of the geocoded points that fall in this zone
+    geohash_prefixes = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def prefixes(self):
+        return [prefix.strip().lower() for prefix in self.geohash_prefixes.split(',') if prefix.strip()]
+    
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+class RateCard(models.Model):
+    # A blank zone matches any zone; the most specific card for a lane wins
+    origin_zone = models.ForeignKey(Zone, on_delete=models.CASCADE, null=True, blank=True, related_name='outbound_rates')
+    destination_zone = models.ForeignKey(Zone, on_delete=models.CASCADE, null=True, blank=True, related_name='inbound_rates')
+    base_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_kg = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_km = models.DecimalField(max_digits=10, decimal_places=4, default=0)
+    cod_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    min_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['origin_zone', 'destination_zone']
+    
+    def __str__(self):
+        origin = self.origin_zone.code if self.origin_zone else '*'
+        destination = self.destination_zone.code if self.destination_zone else '*'
+        return f"{origin} -> {destination}"
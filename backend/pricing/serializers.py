@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from shipments.models import Shipment
+from .engine import volumetric_weight
+
+class QuoteSerializer(serializers.Serializer):
+    weight = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    dimensions = serializers.CharField(max_length=100, allow_blank=True, default='')
+    pickup_address = serializers.CharField()
+    delivery_address = serializers.CharField()
+    payment_method = serializers.ChoiceField(choices=Shipment.PAYMENT_CHOICES)
+    
+    def validate_dimensions(self, value):
+        volumetric_weight(value)
+        return value
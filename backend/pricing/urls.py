@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('quote/', views.quote_shipments, name='quote_shipments'),
+]
@@ -0,0 +1,54 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from .engine import price_shipments
+from .serializers import QuoteSerializer
+
+def format_decimal(value):
+    return None if value is None else '{:f}'.format(value)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def quote_shipments(request):
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'A non-empty list of shipments is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.PRICING_QUOTE_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.PRICING_QUOTE_MAX_ITEMS} shipments per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    child = QuoteSerializer(many=True).child
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, child.run_validation(item)))
+        except ValidationError as exc:
+            results[index] = {'index': index, 'errors': exc.detail}
+    
+    quotes = price_shipments([data for _, data in valid]) if valid else []
+    for (index, _), quote in zip(valid, quotes):
+        if 'errors' in quote:
+            results[index] = {'index': index, 'errors': quote['errors']}
+            continue
+        results[index] = {
+            'index': index,
+            'cost': format_decimal(quote['cost']),
+            'chargeable_weight': format_decimal(quote['chargeable_weight']),
+            'volumetric_weight': format_decimal(quote['volumetric_weight']),
+            'distance_km': format_decimal(quote['distance_km']),
+            'origin_zone': quote['origin_zone'],
+            'destination_zone': quote['destination_zone'],
+        }
+    
+    quoted = sum('errors' not in quote for quote in quotes)
+    return Response({
+        'quoted': quoted,
+        'failed': len(items) - quoted,
+        'results': results,
+    }, status=status.HTTP_200_OK if quoted else status.HTTP_400_BAD_REQUEST)
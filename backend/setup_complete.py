@@ -17,6 +17,7 @@ try:
     from django.core.management import execute_from_command_line
     from accounts.models import User
     from shipments.models import Shipment, ShipmentTracking
+    from shipments.events import append_events
     from payments.models import Payment
     
     print("Setting up database...")
@@ -91,31 +92,30 @@ try:
             cost=25.00,
             payment_method='online',
             payment_status=True,
-            status='in_transit',
             assigned_courier=courier
         )
         
         # Create tracking history
-        ShipmentTracking.objects.create(
-            shipment=shipment1,
-            status='Booked',
-            location='Origin Hub',
-            description='Package has been booked'
-        )
-        
-        ShipmentTracking.objects.create(
-            shipment=shipment1,
-            status='Picked Up',
-            location='Customer Location',
-            description='Package picked up from sender'
-        )
-        
-        ShipmentTracking.objects.create(
-            shipment=shipment1,
-            status='In Transit',
-            location='Transit Hub',
-            description='Package is in transit'
-        )
+        append_events([
+            ShipmentTracking(
+                shipment=shipment1,
+                status='Booked',
+                location='Origin Hub',
+                description='Package has been booked'
+            ),
+            ShipmentTracking(
+                shipment=shipment1,
+                status='Picked Up',
+                location='Customer Location',
+                description='Package picked up from sender'
+            ),
+            ShipmentTracking(
+                shipment=shipment1,
+                status='In Transit',
+                location='Transit Hub',
+                description='Package is in transit'
+            ),
+        ])
         
         # Create payment record
         Payment.objects.create(
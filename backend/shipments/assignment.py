@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from tracking.cache import invalidate_tracking
+from .geo import coordinate_arrays, haversine_km, latest_position
+from .models import Shipment
+
+User = get_user_model()
+
+ASSIGNABLE_STATUSES = ['booked', 'picked_up']
+ACTIVE_STATUSES = ['booked', 'picked_up', 'in_transit', 'out_for_delivery']
+
+def courier_state():
+    couriers = list(User.objects.filter(role='courier', is_active=True).order_by('id').values_list('id', flat=True))
+    index = {courier_id: position for position, courier_id in enumerate(couriers)}
+    
+    # A courier's position is the centroid of their active parcels' last known coordinates
+    active = list(
+        Shipment.objects.filter(assigned_courier_id__in=couriers, status__in=ACTIVE_STATUSES)
+        .annotate(**latest_position())
+        .values('assigned_courier_id', 'latest_latitude', 'latest_longitude')
+    )
+    owner = np.array([index[row['assigned_courier_id']] for row in active], dtype=np.intp)
+    lat, lon = coordinate_arrays(active)
+    located = ~np.isnan(lat)
+    
+    load = np.bincount(owner, minlength=len(couriers)).astype(float)
+    located_count = np.bincount(owner[located], minlength=len(couriers))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        courier_lat = np.bincount(owner[located], weights=lat[located], minlength=len(couriers)) / located_count
+        courier_lon = np.bincount(owner[located], weights=lon[located], minlength=len(couriers)) / located_count
+    return np.array(couriers, dtype=np.int64), load, courier_lat, courier_lon
+
+def plan_assignments(shipment_lat, shipment_lon, load, courier_lat, courier_lon):
+    # Courier column per shipment, -1 once every courier is full. Score is km away
+    # plus a km-equivalent penalty per active parcel; distances come from one matrix
+    # per block and load is bumped after every pick so the batch spreads out
+    load = load.copy()
+    capacity = settings.AUTO_ASSIGN_MAX_ACTIVE
+    penalty = settings.AUTO_ASSIGN_LOAD_PENALTY_KM
+    block = max(1, len(load))
+    choice = np.full(len(shipment_lat), -1, dtype=np.intp)
+    
+    for start in range(0, len(shipment_lat), block):
+        end = min(start + block, len(shipment_lat))
+        distance = haversine_km(
+            shipment_lat[start:end, None], shipment_lon[start:end, None],
+            courier_lat[None, :], courier_lon[None, :],
+        )
+        # A courier with no known position (a new one, say) counts as the median
+        # distance of the located ones, so load decides whether they get work; a
+        # shipment with no known position, or no located courier, leaves load alone
+        unknown = np.isnan(distance)
+        fallback = np.zeros(end - start)
+        known_rows = ~unknown.all(axis=1)
+        if known_rows.any():
+            fallback[known_rows] = np.nanmedian(distance[known_rows], axis=1)
+        distance = np.where(unknown, fallback[:, None], distance)
+        
+        for offset in range(end - start):
+            available = load < capacity
+            if not available.any():
+                return choice
+            score = distance[offset] + penalty * load
+            score[~available] = np.inf
+            best = int(np.argmin(score))
+            choice[start + offset] = best
+            load[best] += 1
+    return choice
+
+def auto_assign():
+    couriers, load, courier_lat, courier_lon = courier_state()
+    pending = Shipment.objects.filter(
+        assigned_courier__isnull=True, status__in=ASSIGNABLE_STATUSES
+    ).order_by('created_at', 'id')
+    if not len(couriers):
+        return {'assigned': 0, 'unassigned': pending.count(), 'couriers': 0}
+    
+    rows = list(pending.annotate(**latest_position()).values('id', 'tracking_id', 'latest_latitude', 'latest_longitude'))
+    lat, lon = coordinate_arrays(rows)
+    choice = plan_assignments(lat, lon, load, courier_lat, courier_lon)
+    
+    # One UPDATE per courier rather than bulk_update's per-row CASE; the null guard
+    # leaves alone anything an admin assigned by hand since the rows were read
+    by_courier = defaultdict(list)
+    for row, column in zip(rows, choice):
+        if column >= 0:
+            by_courier[int(couriers[column])].append(row['id'])
+    
+    now = timezone.now()
+    assigned = 0
+    with transaction.atomic():
+        for courier_id, shipment_ids in by_courier.items():
+            assigned += Shipment.objects.filter(id__in=shipment_ids, assigned_courier__isnull=True).update(
+                assigned_courier_id=courier_id, updated_at=now
+            )
+    
+    for row, column in zip(rows, choice):
+        if column >= 0:
+            invalidate_tracking(row['tracking_id'])
+    
+    return {'assigned': assigned, 'unassigned': len(rows) - assigned, 'couriers': len(couriers)}
@@ -0,0 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from courier_backend import fastjson
+from courier_backend.async_api import authenticated, json_response, require_get
+from courier_backend.pagination import paginate_keyset, stream_ndjson
+from courier_backend.replicas import replica_reads
+from .conditional import shipment_etag, validators_queryset, not_modified, set_validators
+from .models import Shipment
+from .fast_serializers import shipment_values, serialize_shipments
+from .serializers import ShipmentSerializer
+from .views import visible_shipments, can_view_shipment
+
+@require_get
+@authenticated
+@replica_reads
+async def list_shipments(request):
+    shipments = await sync_to_async(visible_shipments)(request.user)
+    
+    if request.GET.get('export') == 'ndjson':
+        return stream_ndjson(shipments, ShipmentSerializer, 'shipments.ndjson', asynchronous=True)
+    
+    page, next_cursor = await sync_to_async(paginate_keyset)(request.GET, shipment_values(shipments))
+    results = await sync_to_async(serialize_shipments)(page, settings.SHIPMENT_LIST_HISTORY_LIMIT)
+    return fastjson.json_response({'results': results, 'next_cursor': next_cursor})
+
+@require_get
+@authenticated
+@replica_reads
+async def shipment_detail(request, shipment_id):
+    validators = await validators_queryset(id=shipment_id).afirst()
+    if validators is None:
+        return json_response({'detail': 'Not found.'}, status=404)
+    
+    if not can_view_shipment(request.user, validators['sender_id'], validators['assigned_courier_id']):
+        return json_response({'error': 'Permission denied'}, status=403)
+    
+    etag = shipment_etag(validators['id'], validators['updated_at'], validators['last_seq'])
+    response = not_modified(request, etag, validators['updated_at'])
+    if response is not None:
+        return response
+    
+    row = await shipment_values(Shipment.objects.filter(id=shipment_id)).afirst()
+    if row is None:
+        return json_response({'detail': 'Not found.'}, status=404)
+    data = (await sync_to_async(serialize_shipments)([row]))[0]
+    return set_validators(fastjson.json_response(data), etag, validators['updated_at'])
@@ -0,0 +1,27 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Shipment
+
+def shipment_etag(shipment_id, updated_at, last_seq):
+    return f'"{shipment_id}-{updated_at.timestamp():.6f}-{last_seq}"'
+
+def validators_queryset(**lookup):
+    return (
+        Shipment.objects.filter(**lookup)
+        .values('id', 'sender_id', 'assigned_courier_id', 'updated_at', 'last_seq')
+    )
+
+def shipment_validators(**lookup):
+    # One indexed lookup: enough to answer a conditional GET or a permission check
+    return validators_queryset(**lookup).first()
+
+def not_modified(request, etag, last_modified):
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,93 @@
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Shipment, ShipmentTracking
+
+STATUSES = {code for code, _ in Shipment.STATUS_CHOICES}
+
+PROJECTION_FIELDS = ['status', 'last_seq', 'last_event_at', 'last_location', 'last_latitude', 'last_longitude']
+
+def normalize_status(value):
+    # Tracking statuses are free text ("Booked", "in_transit"); map them onto Shipment.STATUS_CHOICES
+    status = (value or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return status if status in STATUSES else None
+
+def fold(shipment, event):
+    # The latest event time wins, ties going to the later event in the log, so a
+    # backdated scan is recorded without rolling the status back. Returns the
+    # status the shipment moved to (any status for its first event), else None
+    if shipment.last_event_at is not None and event.timestamp < shipment.last_event_at:
+        return None
+    first = shipment.last_event_at is None
+    shipment.last_event_at = event.timestamp
+    shipment.last_location = event.location
+    if event.latitude is not None and event.longitude is not None:
+        shipment.last_latitude, shipment.last_longitude = event.latitude, event.longitude
+    status = normalize_status(event.status)
+    if status is None or (status == shipment.status and not first):
+        return None
+    shipment.status = status
+    return status
+
+def project(shipment, events):
+    # Number events after the shipment's head and fold them into its projection;
+    # for shipments not saved yet this fills everything in before the insert.
+    # Each event's transition is the status it moved the shipment to, or None
+    for event in events:
+        shipment.last_seq += 1
+        event.seq = shipment.last_seq
+        # The analytics rollups count these status changes, not every scan
+        event.transition = fold(shipment, event)
+
+def save_projections(shipments):
+    # One prepared UPDATE run per shipment: bulk_update's CASE/WHEN over a few
+    # thousand ids costs more to build than the writes themselves
+    connection = connections[router.db_for_write(Shipment)]
+    quote = connection.ops.quote_name
+    fields = [Shipment._meta.get_field(name) for name in PROJECTION_FIELDS + ['updated_at']]
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        quote(Shipment._meta.db_table),
+        ', '.join('%s = %%s' % quote(field.column) for field in fields),
+        quote(Shipment._meta.pk.column),
+    )
+    rows = [
+        [field.get_db_prep_save(getattr(shipment, field.attname), connection) for field in fields] + [shipment.pk]
+        for shipment in shipments
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+def append_events(events):
+    # Appends unsaved ShipmentTracking rows (in arrival order) and moves each
+    # shipment's projection forward in the same transaction. Returns the
+    # updated shipments by id
+    if not events:
+        return {}
+    for event in events:
+        if event.timestamp is None:
+            event.timestamp = timezone.now()
+    with transaction.atomic(using=router.db_for_write(Shipment)):
+        shipments = Shipment.objects.select_for_update().only('id', 'tracking_id', *PROJECTION_FIELDS).in_bulk(
+            {event.shipment_id for event in events}
+        )
+        grouped = {}
+        for event in events:
+            grouped.setdefault(event.shipment_id, []).append(event)
+        now = timezone.now()
+        for shipment_id, group in grouped.items():
+            project(shipments[shipment_id], group)
+            shipments[shipment_id].updated_at = now
+        ShipmentTracking.objects.bulk_create(events)
+        save_projections(shipments.values())
+    return shipments
+
+def rebuild_projection(shipment, events=None):
+    # Recomputes the projection from the log; last_seq never moves back, so the
+    # numbers of removed events are not handed out again
+    shipment.status = 'booked'
+    shipment.last_event_at = None
+    shipment.last_location = ''
+    shipment.last_latitude = shipment.last_longitude = None
+    for event in shipment.tracking_history.order_by('seq') if events is None else events:
+        shipment.last_seq = max(shipment.last_seq, event.seq)
+        fold(shipment, event)
@@ -0,0 +1,99 @@
+import decimal
+from collections import defaultdict
+
+from django.utils import timezone
+
+from .models import Shipment, ShipmentTracking, latest_tracking
+
+# Hand-rolled equivalents of ShipmentSerializer / ShipmentTrackingSerializer that
+# work from .values() rows. Output must stay identical to the DRF serializers;
+# FastSerializerTests checks that, and bench_serializers does again against the
+# real data before timing anything.
+
+SHIPMENT_COLUMNS = (
+    'id', 'tracking_id', 'sender_id', 'sender__first_name', 'sender__last_name',
+    'receiver_name', 'receiver_phone', 'receiver_address', 'package_description',
+    'weight', 'dimensions', 'pickup_address', 'delivery_address', 'cost',
+    'payment_method', 'payment_status', 'status', 'assigned_courier_id',
+    'created_at', 'updated_at',
+)
+
+TRACKING_COLUMNS = ('shipment_id', 'status', 'location', 'description', 'latitude', 'longitude', 'timestamp')
+
+def decimal_formatter(model, field_name):
+    field = model._meta.get_field(field_name)
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.Context(prec=field.max_digits)
+    
+    def format_decimal(value):
+        if value is None:
+            return None
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(quantum, context=context))
+    return format_decimal
+
+def format_datetime(value):
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+format_weight = decimal_formatter(Shipment, 'weight')
+format_cost = decimal_formatter(Shipment, 'cost')
+format_latitude = decimal_formatter(ShipmentTracking, 'latitude')
+format_longitude = decimal_formatter(ShipmentTracking, 'longitude')
+
+def shipment_values(queryset):
+    return queryset.prefetch_related(None).values(*SHIPMENT_COLUMNS)
+
+def tracking_entry(status, location, description, latitude, longitude, timestamp):
+    return {
+        'status': status,
+        'location': location,
+        'description': description,
+        'latitude': format_latitude(latitude),
+        'longitude': format_longitude(longitude),
+        'timestamp': format_datetime(timestamp),
+    }
+
+def serialize_tracking(shipment_ids, history_limit=None):
+    history = defaultdict(list)
+    if not shipment_ids:
+        return history
+    events = latest_tracking(history_limit).filter(shipment_id__in=shipment_ids).values_list(*TRACKING_COLUMNS)
+    for shipment_id, status, location, description, latitude, longitude, timestamp in events:
+        history[shipment_id].append(tracking_entry(status, location, description, latitude, longitude, timestamp))
+    return history
+
+def serialize_shipments(rows, history_limit=None, history=None):
+    # history (shipment id -> serialized events) skips the query, e.g. for archived rows
+    if history is None:
+        history = serialize_tracking([row['id'] for row in rows], history_limit)
+    return [
+        {
+            'id': row['id'],
+            'tracking_id': str(row['tracking_id']),
+            'sender': row['sender_id'],
+            'sender_name': f"{row['sender__first_name']} {row['sender__last_name']}".strip(),
+            'receiver_name': row['receiver_name'],
+            'receiver_phone': row['receiver_phone'],
+            'receiver_address': row['receiver_address'],
+            'package_description': row['package_description'],
+            'weight': format_weight(row['weight']),
+            'dimensions': row['dimensions'],
+            'pickup_address': row['pickup_address'],
+            'delivery_address': row['delivery_address'],
+            'cost': format_cost(row['cost']),
+            'payment_method': row['payment_method'],
+            'payment_status': bool(row['payment_status']),
+            'status': row['status'],
+            'assigned_courier': row['assigned_courier_id'],
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+            'tracking_history': history.get(row['id'], []),
+        }
+        for row in rows
+    ]
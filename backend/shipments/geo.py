@@ -0,0 +1,112 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Q
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    # Broadcasts like any NumPy ufunc, so (n, 1) against (1, m) gives an n x m matrix
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def latest_position():
+    # Annotations for a shipment's last reported coordinates, kept on the row by the event projection
+    return {
+        'latest_latitude': F('last_latitude'),
+        'latest_longitude': F('last_longitude'),
+    }
+
+def coordinate_arrays(rows, lat_key='latest_latitude', lon_key='latest_longitude'):
+    # Missing coordinates become NaN so callers can mask them in bulk
+    lat = np.array([np.nan if row[lat_key] is None else float(row[lat_key]) for row in rows], dtype=float)
+    lon = np.array([np.nan if row[lon_key] is None else float(row[lon_key]) for row in rows], dtype=float)
+    return lat, lon
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+KM_PER_DEGREE = 111.195
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude; each one halves the remaining interval
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+def geohash_cell_size(precision):
+    # Degrees of latitude and longitude spanned by one cell
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon):
+    # Finest geohash cells that cover the box in at most GEOHASH_MAX_CELLS prefixes;
+    # each prefix is one B-tree range on the indexed column
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = geohash_cell_size(precision)
+        rows = range(int((min_lat + 90) // cell_lat), int(min((max_lat + 90) // cell_lat, 180 / cell_lat - 1)) + 1)
+        columns = range(int((min_lon + 180) // cell_lon), int(min((max_lon + 180) // cell_lon, 360 / cell_lon - 1)) + 1)
+        if len(rows) * len(columns) <= settings.GEOHASH_MAX_CELLS:
+            return sorted({
+                encode_geohash(-90 + (row + 0.5) * cell_lat, -180 + (column + 0.5) * cell_lon, precision)
+                for row in rows for column in columns
+            })
+    return ['']
+
+def geohash_filter(cells, field='delivery_geohash'):
+    # '~' sorts after every base32 character, so [cell, cell~) is exactly the prefix
+    condition = Q()
+    for cell in cells:
+        condition |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '~'})
+    return condition
+
+def within_bbox(queryset, min_lat, min_lon, max_lat, max_lon):
+    return queryset.filter(
+        geohash_filter(covering_cells(min_lat, min_lon, max_lat, max_lon)),
+        delivery_latitude__range=(min_lat, max_lat),
+        delivery_longitude__range=(min_lon, max_lon),
+    )
+
+def radius_bbox(lat, lon, radius_km):
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = np.cos(np.radians(lat))
+    lon_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (
+        max(-90.0, lat - lat_delta), max(-180.0, lon - lon_delta),
+        min(90.0, lat + lat_delta), min(180.0, lon + lon_delta),
+    )
+
+def within_radius(queryset, lat, lon, radius_km, fields):
+    # Geohash ranges narrow the rows to the circle's bounding box, then exact
+    # great-circle distances drop the corners; nearest first
+    rows = list(within_bbox(queryset, *radius_bbox(lat, lon, radius_km)).values(
+        *fields, 'delivery_latitude', 'delivery_longitude'
+    ))
+    if not rows:
+        return []
+    row_lat, row_lon = coordinate_arrays(rows, 'delivery_latitude', 'delivery_longitude')
+    distance = haversine_km(lat, lon, row_lat, row_lon)
+    nearby = []
+    for index in np.argsort(distance, kind='stable'):
+        if distance[index] > radius_km:
+            break
+        rows[index]['distance_km'] = round(float(distance[index]), 3)
+        nearby.append(rows[index])
+    return nearby
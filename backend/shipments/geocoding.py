@@ -0,0 +1,139 @@
+import csv
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .geo import encode_geohash
+from .models import GeocodedAddress
+
+ABBREVIATIONS = {
+    'st': 'street',
+    'rd': 'road',
+    'ave': 'avenue',
+    'av': 'avenue',
+    'blvd': 'boulevard',
+    'ln': 'lane',
+    'dr': 'drive',
+    'ct': 'court',
+    'hwy': 'highway',
+    'apt': 'apartment',
+    'n': 'north',
+    's': 'south',
+    'e': 'east',
+    'w': 'west',
+}
+
+def normalize_address(address):
+    text = unicodedata.normalize('NFKC', address or '').lower()
+    words = re.findall(r'[a-z0-9]+', text)
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+def address_key(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+class GazetteerGeocoder:
+    # Offline stand-in for a real geocoder: a CSV of place,latitude,longitude where
+    # place is a postcode or a city name. Postcodes win, then the longest place name
+    MAX_PLACE_WORDS = 3
+    
+    def __init__(self, path=None):
+        self.places = {}
+        with open(path or settings.GEOCODER_GAZETTEER, newline='') as handle:
+            for row in csv.DictReader(handle):
+                self.places[normalize_address(row['place'])] = (float(row['latitude']), float(row['longitude']))
+    
+    def geocode(self, normalized):
+        words = normalized.split()
+        best = None
+        for size in range(1, self.MAX_PLACE_WORDS + 1):
+            for start in range(len(words) - size + 1):
+                place = ' '.join(words[start:start + size])
+                if place in self.places:
+                    rank = (place.isdigit(), size, start)
+                    if best is None or rank > best[0]:
+                        best = (rank, place)
+        return self.places[best[1]] if best else None
+
+class GeocodeCache:
+    # In-process LRU in front of the GeocodedAddress table in front of the geocoder
+    def __init__(self, geocoder, maxsize):
+        self.geocoder = geocoder
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.hits = self.stored = self.geocoded = 0
+    
+    def _remember(self, normalized, point):
+        with self._lock:
+            self._memory[normalized] = point
+            self._memory.move_to_end(normalized)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+    
+    def lookup_many(self, addresses):
+        normalized = {address: normalize_address(address) for address in set(addresses)}
+        points = {}
+        with self._lock:
+            for text in set(normalized.values()):
+                if text in self._memory:
+                    self._memory.move_to_end(text)
+                    points[text] = self._memory[text]
+        self.hits += len(points)
+        
+        missing = {address_key(text): text for text in set(normalized.values()) if text not in points}
+        if missing:
+            for row in GeocodedAddress.objects.filter(key__in=list(missing)).values('key', 'latitude', 'longitude'):
+                point = None if row['latitude'] is None else (float(row['latitude']), float(row['longitude']))
+                points[missing.pop(row['key'])] = point
+                self.stored += 1
+        
+        if missing:
+            rows = []
+            for key, text in missing.items():
+                point = self.geocoder.geocode(text) if text else None
+                points[text] = point
+                rows.append(GeocodedAddress(
+                    key=key,
+                    address=text,
+                    latitude=None if point is None else round(Decimal(point[0]), 6),
+                    longitude=None if point is None else round(Decimal(point[1]), 6),
+                ))
+            # Another worker may have cached the same address meanwhile
+            GeocodedAddress.objects.bulk_create(rows, ignore_conflicts=True)
+            self.geocoded += len(rows)
+        
+        for text in set(normalized.values()):
+            self._remember(text, points[text])
+        return {address: points[text] for address, text in normalized.items()}
+    
+    def lookup(self, address):
+        return self.lookup_many([address])[address]
+    
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+@lru_cache(maxsize=None)
+def get_geocode_cache():
+    return GeocodeCache(import_string(settings.GEOCODER)(), settings.GEOCODE_MEMORY_CACHE_SIZE)
+
+def delivery_fields(point):
+    # Model field values for a geocoded delivery point, or cleared ones for a miss
+    if point is None:
+        return {'delivery_latitude': None, 'delivery_longitude': None, 'delivery_geohash': ''}
+    return {
+        'delivery_latitude': round(Decimal(point[0]), 6),
+        'delivery_longitude': round(Decimal(point[1]), 6),
+        'delivery_geohash': encode_geohash(point[0], point[1]),
+    }
+
+def locate_deliveries(addresses):
+    points = get_geocode_cache().lookup_many(addresses)
+    return {address: delivery_fields(point) for address, point in points.items()}
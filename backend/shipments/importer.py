@@ -0,0 +1,343 @@
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from analytics.rollups import record_tracking_events
+from archive.models import ArchivedShipment
+from notifications.dispatcher import skip_events
+from pricing.engine import price_shipments
+from .events import project
+from .geocoding import locate_deliveries
+from .models import Shipment, ShipmentTracking, generate_tracking_ids
+
+# One record per shipment. sender and assigned_courier are usernames; cost is
+# priced like a new booking when missing; tracking_history is a list of events
+# (a JSON array in CSV files) and defaults to a single "Booked" event
+TEXT_FIELDS = (
+    'receiver_name', 'receiver_phone', 'receiver_address', 'package_description',
+    'dimensions', 'pickup_address', 'delivery_address',
+)
+REQUIRED_FIELDS = (
+    'receiver_name', 'receiver_phone', 'receiver_address', 'package_description',
+    'pickup_address', 'delivery_address',
+)
+TRUE_VALUES = ('true', '1', 'yes', 'y', 't')
+FALSE_VALUES = ('false', '0', 'no', 'n', 'f', '')
+STATUS_LABELS = dict(Shipment.STATUS_CHOICES)
+
+class RecordReader:
+    # Yields (record, error, end offset); the offset is the byte position just
+    # past the record, so a checkpoint can seek straight back to it
+    def __init__(self, path, file_format, offset=0):
+        self.path = path
+        self.file_format = file_format
+        self.offset = offset
+    
+    def lines(self, handle):
+        for line in iter(handle.readline, b''):
+            self.offset += len(line)
+            yield line.decode('utf-8')
+    
+    def __iter__(self):
+        with open(self.path, 'rb') as handle:
+            if self.file_format == 'csv':
+                header = handle.readline()
+                columns = next(csv.reader([header.decode('utf-8-sig')]), [])
+                self.offset = max(self.offset, len(header))
+                handle.seek(self.offset)
+                for values in csv.reader(self.lines(handle)):
+                    if not any(values):
+                        continue
+                    if len(values) != len(columns):
+                        yield None, f'Expected {len(columns)} columns, got {len(values)}', self.offset
+                    else:
+                        yield dict(zip(columns, values)), None, self.offset
+            else:
+                handle.seek(self.offset)
+                for line in self.lines(handle):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as exc:
+                        yield None, f'Invalid JSON: {exc}', self.offset
+                        continue
+                    if isinstance(record, dict):
+                        yield record, None, self.offset
+                    else:
+                        yield None, 'Expected a JSON object', self.offset
+
+class UserCache:
+    # username -> (id, role), or None for unknown names; one query per batch of new names
+    def __init__(self):
+        self.users = {}
+    
+    def resolve(self, usernames):
+        missing = set(usernames) - self.users.keys()
+        if missing:
+            found = {
+                username: (pk, role)
+                for username, pk, role in User.objects.filter(username__in=missing).values_list('username', 'id', 'role')
+            }
+            for username in missing:
+                self.users[username] = found.get(username)
+        return self.users
+
+def text_column(records, name, default=''):
+    return np.array([str(record.get(name) or default).strip() for record in records], dtype=str)
+
+def number_column(values):
+    # NaN marks blanks and garbage; parse the whole column at once unless a bad value forces the slow path
+    strings = np.array([str(value).strip() if value is not None else '' for value in values], dtype=str)
+    try:
+        return strings, strings.astype(float)
+    except ValueError:
+        numbers = np.full(len(strings), np.nan)
+        for index, value in enumerate(strings):
+            try:
+                numbers[index] = float(value)
+            except ValueError:
+                pass
+        return strings, numbers
+
+def decimal_places_exceeded(numbers, places):
+    scaled = numbers * 10 ** places
+    return np.abs(scaled - np.round(scaled)) > 1e-6
+
+def datetime_column(values):
+    parsed = []
+    for value in values:
+        if value in (None, ''):
+            parsed.append(None)
+            continue
+        try:
+            moment = parse_datetime(str(value).strip())
+        except ValueError:
+            moment = None
+        if moment is not None and timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        parsed.append(moment if moment is not None else False)
+    return parsed
+
+class BatchErrors(defaultdict):
+    def __init__(self):
+        super().__init__(dict)
+    
+    def flag(self, mask, field, message):
+        for index in np.flatnonzero(mask):
+            self[int(index)].setdefault(field, []).append(message)
+
+def parse_history(records, errors):
+    histories = []
+    for index, record in enumerate(records):
+        history = record.get('tracking_history') or []
+        if isinstance(history, str):
+            try:
+                history = json.loads(history)
+            except ValueError:
+                errors[index].setdefault('tracking_history', []).append('Invalid JSON.')
+                history = []
+        if not isinstance(history, list) or not all(isinstance(event, dict) for event in history):
+            errors[index].setdefault('tracking_history', []).append('Expected a list of events.')
+            history = []
+        histories.append(history)
+    return histories
+
+def validate_events(histories, errors):
+    # Flatten every event of the batch into columns, check them together, then
+    # charge each failure to the shipment it belongs to
+    owners = np.array([index for index, history in enumerate(histories) for _ in history], dtype=int)
+    events = [event for history in histories for event in history]
+    if not events:
+        return [[] for _ in histories]
+    
+    event_errors = BatchErrors()
+    status = text_column(events, 'status')
+    location = text_column(events, 'location')
+    event_errors.flag(status == '', 'status', 'This field is required.')
+    event_errors.flag(np.char.str_len(status) > ShipmentTracking._meta.get_field('status').max_length,
+                      'status', 'Too long.')
+    event_errors.flag(np.char.str_len(location) > ShipmentTracking._meta.get_field('location').max_length,
+                      'location', 'Too long.')
+    coordinates = {}
+    for name, limit in (('latitude', 90), ('longitude', 180)):
+        strings, numbers = number_column([event.get(name) for event in events])
+        event_errors.flag((strings != '') & ~(np.abs(numbers) <= limit), name, 'A valid coordinate is required.')
+        coordinates[name] = strings
+    timestamps = datetime_column([event.get('timestamp') for event in events])
+    event_errors.flag(np.array([moment is None for moment in timestamps]), 'timestamp', 'This field is required.')
+    event_errors.flag(np.array([moment is False for moment in timestamps]), 'timestamp', 'Invalid datetime.')
+    
+    for index, problems in event_errors.items():
+        errors[int(owners[index])].setdefault('tracking_history', []).append(problems)
+    
+    parsed = [[] for _ in histories]
+    quantum = Decimal('0.000001')
+    for index, owner in enumerate(owners):
+        if owner in errors:
+            continue
+        latitude, longitude = coordinates['latitude'][index], coordinates['longitude'][index]
+        parsed[owner].append({
+            'status': status[index],
+            'location': location[index],
+            'description': str(events[index].get('description') or ''),
+            'latitude': Decimal(latitude).quantize(quantum) if latitude else None,
+            'longitude': Decimal(longitude).quantize(quantum) if longitude else None,
+            'timestamp': timestamps[index],
+        })
+    for history in parsed:
+        history.sort(key=lambda event: event['timestamp'] or timezone.now())
+    return parsed
+
+def validate_batch(records, users, default_sender=None):
+    # Returns ([(batch index, shipment fields, events)], {batch index: errors})
+    size = len(records)
+    errors = BatchErrors()
+    
+    text = {name: text_column(records, name) for name in TEXT_FIELDS}
+    for name in REQUIRED_FIELDS:
+        errors.flag(text[name] == '', name, 'This field is required.')
+    for name in TEXT_FIELDS:
+        max_length = Shipment._meta.get_field(name).max_length
+        if max_length:
+            errors.flag(np.char.str_len(text[name]) > max_length, name, f'Ensure this field has no more than {max_length} characters.')
+    
+    weight_text, weight = number_column([record.get('weight') for record in records])
+    errors.flag(~(weight > 0), 'weight', 'A positive number is required.')
+    errors.flag(decimal_places_exceeded(weight, 2) | (weight >= 1e8), 'weight', 'Too many digits.')
+    cost_text, cost = number_column([record.get('cost') for record in records])
+    errors.flag((cost_text != '') & ~(cost >= 0), 'cost', 'A valid amount is required.')
+    errors.flag((cost_text != '') & (decimal_places_exceeded(cost, 2) | (cost >= 1e8)), 'cost', 'Too many digits.')
+    
+    payment_method = np.char.lower(text_column(records, 'payment_method', 'cod'))
+    errors.flag(~np.isin(payment_method, [code for code, _ in Shipment.PAYMENT_CHOICES]),
+                'payment_method', 'Not a valid choice.')
+    paid = np.char.lower(text_column(records, 'payment_status'))
+    errors.flag(~np.isin(paid, TRUE_VALUES + FALSE_VALUES), 'payment_status', 'Must be a valid boolean.')
+    status = np.char.lower(text_column(records, 'status'))
+    errors.flag((status != '') & ~np.isin(status, [code for code, _ in Shipment.STATUS_CHOICES]),
+                'status', 'Not a valid choice.')
+    
+    tracking_ids = text_column(records, 'tracking_id')
+    given = tracking_ids != ''
+    errors.flag(np.char.str_len(tracking_ids) > Shipment._meta.get_field('tracking_id').max_length,
+                'tracking_id', 'Too long.')
+    unique, first, inverse = np.unique(tracking_ids, return_index=True, return_inverse=True)
+    errors.flag(given & (first[inverse] != np.arange(size)), 'tracking_id', 'Duplicate of an earlier row.')
+    given_ids = list(unique[unique != ''])
+    taken = set(Shipment.objects.filter(tracking_id__in=given_ids).values_list('tracking_id', flat=True))
+    taken |= set(ArchivedShipment.objects.filter(tracking_id__in=given_ids).values_list('tracking_id', flat=True))
+    errors.flag(given & np.isin(tracking_ids, list(taken)), 'tracking_id', 'Already exists.')
+    
+    senders = text_column(records, 'sender', default_sender or '')
+    couriers = text_column(records, 'assigned_courier')
+    known = users.resolve((set(senders) | set(couriers)) - {''})
+    errors.flag(np.array([known.get(name) is None for name in senders]), 'sender', 'Unknown username.')
+    errors.flag(np.array([name != '' and (known.get(name) or (None, None))[1] != 'courier' for name in couriers]),
+                'assigned_courier', 'Unknown courier username.')
+    
+    created_at = datetime_column([record.get('created_at') for record in records])
+    errors.flag(np.array([moment is False for moment in created_at]), 'created_at', 'Invalid datetime.')
+    
+    histories = validate_events(parse_history(records, errors), errors)
+    
+    valid = []
+    cent = Decimal('0.01')
+    for index in range(size):
+        if index in errors:
+            continue
+        events = histories[index]
+        booked_at = created_at[index] or (events[0]['timestamp'] if events else None) or timezone.now()
+        if not events:
+            # Without a history the status column, if any, becomes the one event
+            events = [{
+                'status': STATUS_LABELS.get(status[index], 'Booked'), 'location': 'Origin',
+                'description': 'Imported shipment', 'latitude': None, 'longitude': None, 'timestamp': booked_at,
+            }]
+        fields = {name: text[name][index] for name in TEXT_FIELDS}
+        fields.update(
+            tracking_id=tracking_ids[index] or None,
+            sender_id=known[senders[index]][0],
+            assigned_courier_id=known[couriers[index]][0] if couriers[index] else None,
+            weight=Decimal(weight_text[index]).quantize(cent),
+            cost=Decimal(cost_text[index]).quantize(cent) if cost_text[index] else None,
+            payment_method=payment_method[index],
+            payment_status=paid[index] in TRUE_VALUES,
+            created_at=booked_at,
+            updated_at=max(booked_at, events[-1]['timestamp']),
+        )
+        valid.append((index, fields, events))
+    
+    # Missing costs are priced like new bookings; a row the engine rejects is an error row
+    unpriced = [(index, fields) for index, fields, _ in valid if fields['cost'] is None]
+    for (index, fields), quote in zip(unpriced, price_shipments([fields for _, fields in unpriced])):
+        if 'errors' in quote:
+            errors[index].update(quote['errors'])
+        else:
+            fields['cost'] = quote['cost']
+    valid = [row for row in valid if row[0] not in errors]
+    return valid, dict(errors)
+
+def restore_dates(shipments, dates):
+    # bulk_create stamps created_at/updated_at with the current time; put the
+    # imported dates back with one prepared UPDATE run, like save_projections
+    connection = connections[router.db_for_write(Shipment)]
+    quote = connection.ops.quote_name
+    fields = [Shipment._meta.get_field(name) for name in ('created_at', 'updated_at')]
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        quote(Shipment._meta.db_table),
+        ', '.join('%s = %%s' % quote(field.column) for field in fields),
+        quote(Shipment._meta.pk.column),
+    )
+    rows = []
+    for shipment, values in zip(shipments, dates):
+        for field, value in zip(fields, values):
+            setattr(shipment, field.attname, value)
+        rows.append([field.get_db_prep_save(value, connection) for field, value in zip(fields, values)] + [shipment.pk])
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+def import_batch(valid, checkpoint, before_commit=None):
+    # Writes one validated batch and advances the checkpoint in the same transaction.
+    # before_commit (e.g. writing the batch's rejected rows) runs inside it, just
+    # before the checkpoint is saved, so if it fails nothing is committed
+    if not valid:
+        if before_commit is not None:
+            before_commit()
+        checkpoint.save()
+        return 0, 0
+    locations = locate_deliveries([fields['delivery_address'] for _, fields, _ in valid])
+    missing = [fields for _, fields, _ in valid if not fields['tracking_id']]
+    for fields, tracking_id in zip(missing, generate_tracking_ids(len(missing))):
+        fields['tracking_id'] = tracking_id
+    
+    shipments = []
+    histories = []
+    dates = [(fields['created_at'], fields['updated_at']) for _, fields, _ in valid]
+    for _, fields, history in valid:
+        shipment = Shipment(**fields, **locations[fields['delivery_address']])
+        history = [ShipmentTracking(**event) for event in history]
+        project(shipment, history)
+        shipments.append(shipment)
+        histories.append(history)
+    with transaction.atomic():
+        shipments = Shipment.objects.bulk_create(shipments)
+        restore_dates(shipments, dates)
+        for shipment, history in zip(shipments, histories):
+            for event in history:
+                event.shipment = shipment
+        events = ShipmentTracking.objects.bulk_create([event for history in histories for event in history])
+        record_tracking_events(events)
+        # Legacy history is not news: no email, SMS or webhook for it
+        skip_events(min(event.id for event in events), max(event.id for event in events))
+        if before_commit is not None:
+            before_commit()
+        checkpoint.save()
+    return len(shipments), len(events)
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipments.assignment import auto_assign
+
+class Command(BaseCommand):
+    help = 'Assign every unassigned booked/picked-up shipment to a courier by proximity and load'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        result = auto_assign()
+        self.stdout.write(
+            f"assigned {result['assigned']} shipments to {result['couriers']} couriers "
+            f"({result['unassigned']} left unassigned) in {time.perf_counter() - start:.2f}s"
+        )
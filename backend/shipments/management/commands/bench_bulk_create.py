@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+SAMPLE_SHIPMENT = {
+    'receiver_name': 'Bench Receiver',
+    'receiver_phone': '+1234567892',
+    'receiver_address': '789 Receiver Rd, City, State 12345',
+    'package_description': 'Benchmark parcel',
+    'weight': '2.50',
+    'dimensions': '40x30x5 cm',
+    'pickup_address': '456 Customer Ave, City, State 12345',
+    'delivery_address': '789 Receiver Rd, City, State 12345',
+    'payment_method': 'online',
+}
+
+class Command(BaseCommand):
+    help = 'Compare shipment booking throughput of the single and bulk create endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='customer1')
+        parser.add_argument('--count', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        client = APIClient()
+        client.force_authenticate(user)
+        count = options['count']
+
+        def single():
+            for _ in range(count):
+                client.post('/api/shipments/create/', SAMPLE_SHIPMENT, format='json')
+
+        def bulk():
+            client.post('/api/shipments/bulk-create/', [SAMPLE_SHIPMENT] * count, format='json')
+
+        for label, run in (('single', single), ('bulk', bulk)):
+            # Roll back so the benchmark leaves no shipments behind
+            with transaction.atomic():
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+            self.stdout.write(f'{label:>6}: {count} shipments in {elapsed:.2f}s ({count / elapsed:.0f} rows/s)')
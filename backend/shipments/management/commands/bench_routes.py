@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from shipments.routing import distance_matrix, get_solver, route_length
+
+class Command(BaseCommand):
+    help = 'Solve synthetic delivery routes and report solve time and route length per solver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000])
+        parser.add_argument('--solvers', nargs='+', default=[
+            'shipments.routing.nearest_neighbour',
+            'shipments.routing.nearest_neighbour_two_opt',
+        ])
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        for size in options['sizes']:
+            # Stops scattered over roughly 30 x 30 km of city
+            lat = 12.97 + rng.uniform(-0.135, 0.135, size)
+            lon = 77.59 + rng.uniform(-0.14, 0.14, size)
+            distance = distance_matrix(lat, lon)
+            for path in options['solvers']:
+                solver = get_solver(path)
+                start = time.perf_counter()
+                order = solver(distance, 0)
+                elapsed = time.perf_counter() - start
+                assert sorted(order) == list(range(size))
+                self.stdout.write(
+                    f'{size:>5} stops  {path.rsplit(".", 1)[-1]:<26} '
+                    f'{elapsed * 1000:>9.1f}ms  {route_length(distance, order):>8.1f}km'
+                )
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from courier_backend.fastjson import dumps, orjson
+from shipments.fast_serializers import shipment_values, serialize_shipments
+from shipments.models import Shipment
+from shipments.serializers import ShipmentSerializer
+
+class Command(BaseCommand):
+    help = 'Check the fast shipment serializer against ShipmentSerializer and compare objects/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        queryset = Shipment.objects.order_by('-created_at', '-id')[:options['limit']]
+        renderer = JSONRenderer()
+
+        def drf():
+            return [renderer.render(item) for item in ShipmentSerializer(queryset.with_tracking(), many=True).data]
+
+        def fast():
+            return [dumps(item) for item in serialize_shipments(list(shipment_values(queryset)))]
+
+        expected, actual = drf(), fast()
+        if not expected:
+            raise CommandError('No shipments to serialize')
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            if left != right:
+                raise CommandError(f'Output differs at row {index}:\n  drf:  {left}\n  fast: {right}')
+        if len(expected) != len(actual):
+            raise CommandError(f'Row counts differ: drf={len(expected)} fast={len(actual)}')
+        self.stdout.write(f'parity: {len(expected)} shipments byte-identical (encoder: {"orjson" if orjson else "json"})')
+
+        for label, run in (('drf', drf), ('fast', fast)):
+            start = time.perf_counter()
+            for _ in range(options['rounds']):
+                run()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{label:>4}: {len(expected) * options["rounds"] / elapsed:.0f} shipments/s')
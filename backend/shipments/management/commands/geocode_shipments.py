@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shipments.geocoding import get_geocode_cache, locate_deliveries
+from shipments.models import Shipment
+
+class Command(BaseCommand):
+    help = 'Geocode delivery addresses and fill the delivery point spatial index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Redo shipments that already have a delivery point')
+
+    def handle(self, *args, **options):
+        queryset = Shipment.objects.only('id', 'delivery_address').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(delivery_geohash='')
+        
+        updated = located = 0
+        last_id = 0
+        while True:
+            shipments = list(queryset.filter(id__gt=last_id)[:settings.EXPORT_CHUNK_SIZE])
+            if not shipments:
+                break
+            locations = locate_deliveries([shipment.delivery_address for shipment in shipments])
+            for shipment in shipments:
+                for field, value in locations[shipment.delivery_address].items():
+                    setattr(shipment, field, value)
+                located += bool(shipment.delivery_geohash)
+            Shipment.objects.bulk_update(shipments, ['delivery_latitude', 'delivery_longitude', 'delivery_geohash'])
+            updated += len(shipments)
+            last_id = shipments[-1].id
+        
+        cache = get_geocode_cache()
+        self.stdout.write(
+            f'{updated} shipments checked, {located} located; geocoder calls: {cache.geocoded}, '
+            f'table hits: {cache.stored}, memory hits: {cache.hits}'
+        )
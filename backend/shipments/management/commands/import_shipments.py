@@ -0,0 +1,101 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import User
+from shipments.importer import RecordReader, UserCache, import_batch, validate_batch
+from shipments.models import ShipmentImport
+
+class Command(BaseCommand):
+    help = 'Load legacy shipments and their tracking history from a CSV or NDJSON file, resumably'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--sender', help='Username of the merchant for rows without a sender column')
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE)
+        parser.add_argument('--errors', help='Where rejected rows are written (default: <path>.errors.ndjson)')
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint and start over')
+    
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f'{path} not found')
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        if options['sender'] and not User.objects.filter(username=options['sender']).exists():
+            raise CommandError(f"User {options['sender']} not found")
+        
+        checkpoint, created = ShipmentImport.objects.get_or_create(source=path)
+        if options['restart'] and not created:
+            checkpoint.offset = checkpoint.rows = checkpoint.imported = checkpoint.rejected = 0
+            checkpoint.finished_at = None
+            checkpoint.save()
+        elif checkpoint.finished_at:
+            raise CommandError(f'{path} was fully imported at {checkpoint.finished_at}; pass --restart to load it again')
+        if checkpoint.offset > os.path.getsize(path):
+            raise CommandError(f'{path} is shorter than its checkpoint; pass --restart if it was replaced')
+        if checkpoint.offset:
+            self.stdout.write(f'Resuming after row {checkpoint.rows} (byte {checkpoint.offset})')
+        
+        errors_path = options['errors'] or path + '.errors.ndjson'
+        if checkpoint.offset and os.path.exists(errors_path):
+            self.drop_uncommitted_errors(errors_path, checkpoint.rows)
+        reader = RecordReader(path, file_format, checkpoint.offset)
+        users = UserCache()
+        start = time.perf_counter()
+        started_rows = checkpoint.rows
+        with open(errors_path, 'a' if checkpoint.offset else 'w') as errors_file:
+            batch = []
+            for item in reader:
+                batch.append(item)
+                if len(batch) >= options['batch_size']:
+                    self.load(batch, checkpoint, users, options['sender'], errors_file)
+                    self.progress(checkpoint, started_rows, start)
+                    batch = []
+            if batch:
+                self.load(batch, checkpoint, users, options['sender'], errors_file)
+        
+        checkpoint.finished_at = timezone.now()
+        checkpoint.save()
+        self.progress(checkpoint, started_rows, start)
+        if checkpoint.rejected:
+            self.stdout.write(f'Rejected rows written to {errors_path}')
+    
+    def load(self, batch, checkpoint, users, sender, errors_file):
+        first_row = checkpoint.rows + 1
+        parsed = [(position, record) for position, (record, error, _) in enumerate(batch) if record is not None]
+        valid, errors = validate_batch([record for _, record in parsed], users, sender)
+        rejected = {position: {'non_field_errors': [error]} for position, (record, error, _) in enumerate(batch) if error}
+        rejected.update((parsed[index][0], problems) for index, problems in errors.items())
+        
+        checkpoint.offset = batch[-1][2]
+        checkpoint.rows += len(batch)
+        checkpoint.imported += len(valid)
+        checkpoint.rejected += len(rejected)
+        
+        def write_errors():
+            # Flushed before the checkpoint commits, so a resumed run never skips them
+            for position in sorted(rejected):
+                errors_file.write(json.dumps({'row': first_row + position, 'errors': rejected[position]}) + '\n')
+            errors_file.flush()
+            os.fsync(errors_file.fileno())
+        
+        import_batch(valid, checkpoint, write_errors)
+    
+    def drop_uncommitted_errors(self, errors_path, rows):
+        # Errors of a batch whose checkpoint never committed are written again on resume
+        with open(errors_path) as errors_file:
+            kept = [line for line in errors_file if line.strip() and json.loads(line)['row'] <= rows]
+        with open(errors_path, 'w') as errors_file:
+            errors_file.writelines(kept)
+    
+    def progress(self, checkpoint, started_rows, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{checkpoint.rows} rows read, {checkpoint.imported} imported, {checkpoint.rejected} rejected '
+            f'({(checkpoint.rows - started_rows) / elapsed if elapsed else 0:.0f} rows/s)'
+        )
@@ -0,0 +1,147 @@
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, router
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from courier_backend.sqlite import tuned_databases
+from shipments.models import Shipment
+from tracking.views import build_tracking_payload
+
+STATUSES = ['picked_up', 'in_transit', 'out_for_delivery']
+
+def mode_databases(mode, path):
+    if mode == 'stock':
+        return {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}}, []
+    return (
+        tuned_databases(path, settings.SQLITE_PRAGMAS, settings.SQLITE_CONN_MAX_AGE),
+        ['courier_backend.routers.ReadWriteRouter'],
+    )
+
+def use_databases(databases, routers):
+    # Swap the connection settings for this process; every thread opens fresh
+    # connections from them on its next query
+    connections.close_all()
+    for alias in connections.settings:
+        if hasattr(connections._connections, alias):
+            delattr(connections._connections, alias)
+    connections.settings = connections.configure_settings(databases)
+    router.routers = [import_string(path)() for path in routers]
+
+class Command(BaseCommand):
+    help = 'Hammer a copy of the SQLite database with concurrent status updates and tracking reads, stock vs tuned setup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='admin', help='Staff user making the status updates')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that are status updates')
+        parser.add_argument('--shipments', type=int, default=200, help='Shipments the load is spread over')
+        parser.add_argument('--mode', choices=['stock', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES['default']
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('This load test is for SQLite databases only')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+        shipments = list(Shipment.objects.order_by('-id').values_list('id', 'tracking_id')[:options['shipments']])
+        if not shipments:
+            raise CommandError('No shipments to load')
+
+        original = connections.settings, router.routers
+        # Failed requests are counted below; their tracebacks would drown the report
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        modes = ['stock', 'tuned'] if options['mode'] == 'both' else [options['mode']]
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                for mode in modes:
+                    # Each mode gets its own copy, so the real database is never written
+                    path = os.path.join(directory, f'{mode}.sqlite3')
+                    with sqlite3.connect(source['NAME']) as origin, sqlite3.connect(path) as copy:
+                        origin.backup(copy)
+                        copy.execute('PRAGMA journal_mode = DELETE')
+                    use_databases(*mode_databases(mode, path))
+                    self.report(mode, self.run(user, shipments, options))
+            finally:
+                connections.close_all()
+                connections.settings, router.routers = original
+                request_logger.setLevel(log_level)
+
+    def run(self, user, shipments, options):
+        deadline = time.perf_counter() + options['seconds']
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            futures = [
+                pool.submit(self.worker, user, shipments, options['write_ratio'], deadline, seed)
+                for seed in range(options['threads'])
+            ]
+            results = [future.result() for future in futures]
+        totals = {kind: {'ok': [], 'errors': 0, 'locked': 0} for kind in ('read', 'write')}
+        for result in results:
+            for kind, stats in result.items():
+                totals[kind]['ok'] += stats['ok']
+                totals[kind]['errors'] += stats['errors']
+                totals[kind]['locked'] += stats['locked']
+        totals['seconds'] = options['seconds']
+        return totals
+
+    def worker(self, user, shipments, write_ratio, deadline, seed):
+        rng = random.Random(seed)
+        client = APIClient()
+        client.force_authenticate(user)
+        stats = {kind: {'ok': [], 'errors': 0, 'locked': 0} for kind in ('read', 'write')}
+        try:
+            while time.perf_counter() < deadline:
+                shipment_id, tracking_id = rng.choice(shipments)
+                kind = 'write' if rng.random() < write_ratio else 'read'
+                start = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        response = client.put(
+                            f'/api/shipments/{shipment_id}/update-status/',
+                            {'status': rng.choice(STATUSES), 'location': 'Load test'}, format='json',
+                        )
+                        ok = response.status_code == 200
+                    else:
+                        # Straight to the database: the tracking cache would hide the read path
+                        ok = build_tracking_payload(tracking_id) is not None
+                except OperationalError as exc:
+                    ok = False
+                    if 'locked' in str(exc):
+                        stats[kind]['locked'] += 1
+                if ok:
+                    stats[kind]['ok'].append((time.perf_counter() - start) * 1000)
+                else:
+                    stats[kind]['errors'] += 1
+        finally:
+            connections.close_all()
+        return stats
+
+    def report(self, mode, totals):
+        self.stdout.write(f'{mode}:')
+        for kind in ('read', 'write'):
+            stats = totals[kind]
+            attempts = len(stats['ok']) + stats['errors']
+            line = (
+                f'  {kind:>5}s: {len(stats["ok"]) / totals["seconds"]:8.0f}/s ok, '
+                f'{stats["errors"]} failed of {attempts} ({stats["errors"] / attempts if attempts else 0:.1%}), '
+                f'{stats["locked"]} "database is locked"'
+            )
+            if len(stats['ok']) >= 2:
+                percentiles = statistics.quantiles(stats['ok'], n=100)
+                line += f', p50={percentiles[49]:.1f}ms p99={percentiles[98]:.1f}ms'
+            self.stdout.write(line)
@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from shipments.events import PROJECTION_FIELDS, rebuild_projection
+from shipments.models import Shipment, ShipmentTracking
+from tracking.cache import invalidate_tracking
+
+class Command(BaseCommand):
+    help = "Recompute every shipment's status and last location from its tracking event log"
+
+    def handle(self, *args, **options):
+        queryset = Shipment.objects.only('id', 'tracking_id', *PROJECTION_FIELDS).order_by('id')
+        checked = changed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                shipments = list(queryset.select_for_update().filter(id__gt=last_id)[:settings.EXPORT_CHUNK_SIZE])
+                if not shipments:
+                    break
+                logs = defaultdict(list)
+                for event in ShipmentTracking.objects.filter(shipment__in=shipments).order_by('shipment_id', 'seq'):
+                    logs[event.shipment_id].append(event)
+                
+                stale = []
+                for shipment in shipments:
+                    before = [getattr(shipment, field) for field in PROJECTION_FIELDS]
+                    rebuild_projection(shipment, logs[shipment.id])
+                    if [getattr(shipment, field) for field in PROJECTION_FIELDS] != before:
+                        # A new updated_at also changes the ETag clients revalidate with
+                        shipment.updated_at = timezone.now()
+                        stale.append(shipment)
+                Shipment.objects.bulk_update(stale, PROJECTION_FIELDS + ['updated_at'])
+            for shipment in stale:
+                invalidate_tracking(shipment.tracking_id)
+            checked += len(shipments)
+            changed += len(stale)
+            last_id = shipments[-1].id
+        self.stdout.write(f'{checked} shipments checked, {changed} projections corrected')
@@ -0,0 +1,37 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = 'Stand-in for replication: copy the primary SQLite database onto every DATABASE_REPLICAS file, over and over'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between copies, roughly the replication lag')
+        parser.add_argument('--once', action='store_true', help='Copy once and exit')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']['NAME']
+        replicas = [settings.DATABASES[alias]['NAME'] for alias in settings.DATABASE_REPLICAS]
+        if not replicas:
+            raise CommandError('No replicas configured; set SQLITE_REPLICAS to one or more database files')
+
+        copies = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                for path in replicas:
+                    # The backup API copies a consistent snapshot, and replica readers
+                    # keep their own snapshot until it lands
+                    with closing(sqlite3.connect(primary)) as source, closing(sqlite3.connect(path, timeout=30)) as target:
+                        source.backup(target)
+                copies += 1
+                if options['once']:
+                    break
+                self.stdout.write(f'{len(replicas)} replicas refreshed in {time.perf_counter() - start:.3f}s', ending='\r')
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'{copies} rounds copied to {", ".join(map(str, replicas))}')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0002_geocodedaddress_shipment_delivery_geohash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['updated_at', 'id'], name='shipment_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_events(apps, schema_editor):
+    # Existing events are numbered in timestamp order; rebuild_shipment_projections
+    # fills in the rest of the projection afterwards
+    Shipment = apps.get_model('shipments', 'Shipment')
+    ShipmentTracking = apps.get_model('shipments', 'ShipmentTracking')
+    events = []
+    last_seq = {}
+    for event in ShipmentTracking.objects.only('id', 'shipment_id').order_by('shipment_id', 'timestamp', 'id').iterator():
+        last_seq[event.shipment_id] = event.seq = last_seq.get(event.shipment_id, 0) + 1
+        events.append(event)
+    ShipmentTracking.objects.bulk_update(events, ['seq'], batch_size=1000)
+    Shipment.objects.bulk_update(
+        [Shipment(id=shipment_id, last_seq=seq) for shipment_id, seq in last_seq.items()], ['last_seq'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0004_shipmentimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_location',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='last_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shipmenttracking',
+            name='seq',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(number_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shipmenttracking',
+            name='shipment',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tracking_history', to='shipments.shipment'),
+        ),
+        migrations.AddConstraint(
+            model_name='shipmenttracking',
+            constraint=models.UniqueConstraint(fields=('shipment', 'seq'), name='tracking_shipment_seq_uniq'),
+        ),
+    ]
@@ -1,9 +1,35 @@
 from django.db import models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import uuid
 
+from archive.models import ArchivedShipment
+
 User = get_user_model()
 
+def latest_tracking(history_limit=None):
+    # Newest first within each shipment, the order of tracking_shipment_ts_idx; with
+    # a limit, keep only the latest N events of each shipment
+    history = ShipmentTracking.objects.order_by('shipment_id', '-timestamp', '-id')
+    if history_limit:
+        history = history.annotate(
+            history_rank=Window(
+                RowNumber(),
+                partition_by=F('shipment_id'),
+                order_by=[F('timestamp').desc(), F('id').desc()],
+            )
+        ).filter(history_rank__lte=history_limit)
+    return history
+
+class ShipmentQuerySet(models.QuerySet):
+    def with_tracking(self, history_limit=None):
+        # Sender and tracking history in two extra queries, however many rows
+        return self.select_related('sender').prefetch_related(
+            models.Prefetch('tracking_history', queryset=latest_tracking(history_limit))
+        )
+
 class Shipment(models.Model):
     STATUS_CHOICES = [
         ('booked', 'Booked'),
@@ -36,12 +62,37 @@ class Shipment(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_CHOICES)
     payment_status = models.BooleanField(default=False)
     
+    # status and the last_* fields are a projection of the tracking event log,
+    # written only by shipments.events in the transaction that appends events
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='booked')
+    last_seq = models.PositiveIntegerField(default=0)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    last_location = models.CharField(max_length=200, blank=True, default='')
+    last_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    last_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     assigned_courier = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_shipments')
     
+    # Geocoded delivery point; the geohash is the spatial index for nearby queries
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    delivery_geohash = models.CharField(max_length=12, blank=True, default='')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ShipmentQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='shipment_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='shipment_updated_idx'),
+            models.Index(fields=['sender', 'created_at'], name='shipment_sender_created_idx'),
+            models.Index(fields=['assigned_courier', 'created_at'], name='shipment_courier_created_idx'),
+            models.Index(fields=['assigned_courier', 'status'], name='shipment_courier_status_idx'),
+            models.Index(fields=['status'], name='shipment_status_idx'),
+            models.Index(fields=['delivery_geohash'], name='shipment_delivery_geohash_idx'),
+        ]
+    
     def save(self, *args, **kwargs):
         if not self.tracking_id:
             self.tracking_id = f"TRK{uuid.uuid4().hex[:8].upper()}"
@@ -50,17 +101,75 @@ class Shipment(models.Model):
     def __str__(self):
         return f"{self.tracking_id} - {self.receiver_name}"
 
+def generate_tracking_ids(count):
+    # Draw candidates locally and drop any already taken with one query per round
+    tracking_ids = set()
+    while len(tracking_ids) < count:
+        candidates = {f"TRK{uuid.uuid4().hex[:8].upper()}" for _ in range(count - len(tracking_ids))}
+        candidates -= tracking_ids
+        candidates -= set(
+            Shipment.objects.filter(tracking_id__in=candidates).values_list('tracking_id', flat=True)
+        )
+        candidates -= set(
+            ArchivedShipment.objects.filter(tracking_id__in=candidates).values_list('tracking_id', flat=True)
+        )
+        tracking_ids |= candidates
+    return list(tracking_ids)
+
+class GeocodedAddress(models.Model):
+    # Persistent geocode cache keyed on a digest of the normalized address text;
+    # misses are stored too (null coordinates) so they are not retried every time
+    key = models.CharField(max_length=40, unique=True)
+    address = models.TextField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.address
+
 class ShipmentTracking(models.Model):
-    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='tracking_history')
+    # Append-only event log; seq numbers each shipment's events 1, 2, 3... in the
+    # order they were appended, independent of the (possibly backdated) timestamp
+    # (shipment, seq) and (shipment, -timestamp, -id) both lead with the shipment, so
+    # the foreign key needs no index of its own
+    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='tracking_history', db_index=False)
+    seq = models.PositiveIntegerField()
     status = models.CharField(max_length=100)
     location = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['shipment', '-timestamp', '-id'], name='tracking_shipment_ts_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['shipment', 'seq'], name='tracking_shipment_seq_uniq'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Tracking events are append-only')
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.shipment.tracking_id} - {self.status}"
+
+class ShipmentImport(models.Model):
+    # Resume point of an import_shipments run, saved in the same transaction as
+    # each imported chunk so a restarted run never loads a row twice
+    source = models.CharField(max_length=500, unique=True)
+    offset = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    rejected = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.shipment.tracking_id} - {self.status}"
\ No newline at end of file
+        return self.source
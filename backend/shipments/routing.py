@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .geo import coordinate_arrays, haversine_km, latest_position
+from .models import Shipment
+
+def distance_matrix(lat, lon):
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+def route_length(distance, order):
+    order = np.asarray(order)
+    return float(distance[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+def nearest_neighbour(distance, start=0):
+    unvisited = np.ones(len(distance), dtype=bool)
+    order = [start]
+    unvisited[start] = False
+    for _ in range(len(distance) - 1):
+        row = np.where(unvisited, distance[order[-1]], np.inf)
+        nearest = int(np.argmin(row))
+        order.append(nearest)
+        unvisited[nearest] = False
+    return order
+
+def two_opt(distance, order, time_limit=None):
+    # Open path with a fixed first stop. A zero-cost dummy end node turns it into
+    # the closed-endpoint case, so every candidate reversal r[i..j] for one i is
+    # scored in a single vectorized expression
+    size = len(order)
+    if size < 4:
+        return list(order)
+    padded = np.zeros((size + 1, size + 1))
+    padded[:size, :size] = distance
+    route = np.array(list(order) + [size])
+    deadline = time.monotonic() + time_limit if time_limit else None
+    
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, size - 1):
+            j = np.arange(i + 1, size)
+            a, b = route[i - 1], route[i]
+            c, d = route[j], route[j + 1]
+            delta = padded[a, c] + padded[b, d] - padded[a, b] - padded[c, d]
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                end = j[best]
+                route[i:end + 1] = route[i:end + 1][::-1]
+                improved = True
+        if deadline and time.monotonic() > deadline:
+            break
+    return route[:-1].tolist()
+
+def nearest_neighbour_two_opt(distance, start=0):
+    return two_opt(distance, nearest_neighbour(distance, start), settings.ROUTE_SOLVER_TIME_LIMIT)
+
+def get_solver(path=None):
+    return import_string(path or settings.ROUTE_SOLVER)
+
+def plan_route(courier, start=None, solver=None):
+    stops = list(
+        Shipment.objects.filter(assigned_courier=courier, status='out_for_delivery')
+        .order_by('created_at', 'id')
+        .annotate(**latest_position())
+        .values(
+            'id', 'tracking_id', 'receiver_name', 'delivery_address',
+            'delivery_latitude', 'delivery_longitude', 'latest_latitude', 'latest_longitude',
+        )
+    )
+    # Geocoded delivery points first, the last tracked position where geocoding missed
+    lat, lon = coordinate_arrays(stops, 'delivery_latitude', 'delivery_longitude')
+    tracked_lat, tracked_lon = coordinate_arrays(stops)
+    missing = np.isnan(lat)
+    lat[missing], lon[missing] = tracked_lat[missing], tracked_lon[missing]
+    located = np.flatnonzero(~np.isnan(lat))
+    unlocated = [stops[index] for index in np.flatnonzero(np.isnan(lat))]
+    
+    # An explicit start position becomes node 0 and is dropped from the output
+    points_lat, points_lon = lat[located], lon[located]
+    if start is not None:
+        points_lat = np.concatenate([[start[0]], points_lat])
+        points_lon = np.concatenate([[start[1]], points_lon])
+    
+    distance = distance_matrix(points_lat, points_lon)
+    order = (solver or get_solver())(distance, 0) if len(distance) else []
+    
+    route = []
+    previous = None
+    for node in order:
+        if start is not None and node == 0:
+            previous = node
+            continue
+        index = located[node - 1 if start is not None else node]
+        stop = stops[index]
+        route.append({
+            'id': stop['id'],
+            'tracking_id': stop['tracking_id'],
+            'receiver_name': stop['receiver_name'],
+            'delivery_address': stop['delivery_address'],
+            'latitude': float(lat[index]),
+            'longitude': float(lon[index]),
+            'leg_km': round(float(distance[previous, node]), 3) if previous is not None else 0.0,
+        })
+        previous = node
+    
+    return {
+        'courier': courier.id,
+        'distance_km': round(route_length(distance, order), 3),
+        'stops': route,
+        'unlocated': [
+            {'id': stop['id'], 'tracking_id': stop['tracking_id'], 'delivery_address': stop['delivery_address']}
+            for stop in unlocated
+        ],
+    }
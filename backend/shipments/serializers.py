@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from django.utils import timezone
+from pricing.engine import price_shipments, volumetric_weight
 from .models import Shipment, ShipmentTracking
 
 class ShipmentTrackingSerializer(serializers.ModelSerializer):
@@ -30,10 +32,23 @@ class CreateShipmentSerializer(serializers.ModelSerializer):
             'delivery_address', 'payment_method'
         ]
     
+    def validate_dimensions(self, value):
+        volumetric_weight(value)
+        return value
+    
     def create(self, validated_data):
-        # Calculate cost based on weight (simple calculation)
-        weight = validated_data['weight']
-        cost = float(weight) * 10  # $10 per kg
-        validated_data['cost'] = cost
+        quote = price_shipments([validated_data])[0]
+        if 'errors' in quote:
+            raise serializers.ValidationError(quote['errors'])
+        validated_data['cost'] = quote['cost']
         
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class ScanSerializer(serializers.Serializer):
+    tracking_id = serializers.CharField(max_length=36)
+    status = serializers.ChoiceField(choices=Shipment.STATUS_CHOICES)
+    location = serializers.CharField(max_length=200, allow_blank=True, default='')
+    description = serializers.CharField(allow_blank=True, default='')
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False, allow_null=True)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False, allow_null=True)
+    scanned_at = serializers.DateTimeField(default=timezone.now)
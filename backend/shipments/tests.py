@@ -0,0 +1,595 @@
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import OTP, User
+from courier_backend.fastjson import dumps
+from shipments.assignment import plan_assignments
+from shipments.conditional import validators_queryset
+from shipments.events import append_events
+from shipments.fast_serializers import serialize_shipments, shipment_values
+from shipments.geo import encode_geohash, radius_bbox, within_bbox
+from shipments.importer import import_batch
+from shipments.models import Shipment, ShipmentImport, ShipmentTracking, latest_tracking
+from shipments.serializers import ShipmentSerializer
+from support.models import Ticket
+
+KEYSET_ORDERING = ('-created_at', '-id')
+
+# As SQLite names them in plans; unique fields and constraints get automatic indexes
+TRACKING_ID_INDEX = 'INDEX sqlite_autoindex_shipments_shipment_1'
+TRACKING_SEQ_INDEX = 'INDEX sqlite_autoindex_shipments_shipmenttracking_1'
+
+def hot_queries():
+    # (label, queryset, the index its plan must use)
+    return [
+        ('customer shipment list', Shipment.objects.filter(sender_id=1).order_by(*KEYSET_ORDERING)[:51],
+         'INDEX shipment_sender_created_idx'),
+        ('courier shipment list', Shipment.objects.filter(assigned_courier_id=1).order_by(*KEYSET_ORDERING)[:51],
+         'INDEX shipment_courier_created_idx'),
+        ('admin shipment list', Shipment.objects.order_by(*KEYSET_ORDERING)[:51], 'INDEX shipment_created_idx'),
+        ('shipments by status', Shipment.objects.filter(status='in_transit'), 'INDEX shipment_status_idx'),
+        ('unassigned shipments', Shipment.objects.filter(
+            assigned_courier__isnull=True, status__in=['booked', 'picked_up']
+        ).order_by('created_at', 'id'), 'INDEX shipment_courier_created_idx'),
+        ('shipments near a point', within_bbox(Shipment.objects.all(), *radius_bbox(40.7128, -74.006, 5)),
+         'INDEX shipment_delivery_geohash_idx'),
+        ('public tracking lookup', Shipment.objects.filter(tracking_id='TRK12345678'), TRACKING_ID_INDEX),
+        ('tracking history', latest_tracking().filter(shipment_id__in=[1, 2]), 'INDEX tracking_shipment_ts_idx'),
+        ('shipment tracking history', ShipmentTracking.objects.filter(shipment_id=1), 'INDEX tracking_shipment_ts_idx'),
+        ('tracking events since seq', ShipmentTracking.objects.filter(shipment_id=1, seq__gt=3).order_by('seq'),
+         TRACKING_SEQ_INDEX),
+        ('conditional GET validators', validators_queryset(id=1), 'INTEGER PRIMARY KEY'),
+        ('otp verification', OTP.objects.filter(user_id=1, code='123456', is_used=False), 'INDEX otp_unused_idx'),
+        ('customer ticket list', Ticket.objects.filter(user_id=1).order_by(*KEYSET_ORDERING)[:51],
+         'INDEX ticket_user_created_idx'),
+        ('admin ticket list', Ticket.objects.order_by(*KEYSET_ORDERING)[:51], 'INDEX ticket_created_idx'),
+    ]
+
+class HotQueryPlanTests(TestCase):
+    # The hot API queries must each be answered from their index: no full table
+    # scan and no temporary B-tree to sort the rows afterwards
+    def test_hot_queries_use_their_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan checks only understand SQLite plans')
+        for label, queryset, index in hot_queries():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertRegex(plan, rf'\bUSING (COVERING )?{re.escape(index)}\b')
+                self.assertNotRegex(plan, r'\bSCAN \w+(?!\w| USING)')
+                self.assertNotIn('TEMP B-TREE', plan)
+
+def create_shipments(sender, count, events=3, courier=None):
+    shipments = Shipment.objects.bulk_create([
+        Shipment(
+            tracking_id=f'TRK{sender.id}X{Shipment.objects.count() + index}', sender=sender, assigned_courier=courier,
+            receiver_name='Receiver', receiver_phone='555-0100', receiver_address='1 Main St',
+            package_description='Parcel', weight=2, pickup_address='Depot', delivery_address='1 Main St',
+            cost=20, payment_method='cod',
+        )
+        for index in range(count)
+    ])
+    append_events([
+        ShipmentTracking(shipment=shipment, status=status, location='Hub')
+        for shipment in shipments
+        for status in ['Booked', 'picked_up', 'in_transit'][:events]
+    ])
+    return shipments
+
+class ShipmentQueryCountTests(TestCase):
+    # Listing and detail queries must not grow with the number of rows or
+    # tracking events: no per-shipment or per-event queries
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+        cls.courier = User.objects.create_user('courier', password='x', role='courier')
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+    
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+    
+    def count_queries(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def assert_list_queries_constant(self, user):
+        client = self.client_for(user)
+        create_shipments(self.customer, 2, courier=self.courier)
+        expected = self.count_queries(client, '/api/shipments/list/')
+        create_shipments(self.customer, 30, courier=self.courier)
+        with self.assertNumQueries(expected):
+            response = client.get('/api/shipments/list/')
+        self.assertEqual(len(response.json()['results']), 32)
+    
+    def test_customer_list_queries_do_not_grow_with_rows(self):
+        self.assert_list_queries_constant(self.customer)
+    
+    def test_courier_list_queries_do_not_grow_with_rows(self):
+        self.assert_list_queries_constant(self.courier)
+    
+    def test_admin_list_queries_do_not_grow_with_rows(self):
+        self.assert_list_queries_constant(self.admin)
+    
+    def test_detail_queries_do_not_grow_with_history(self):
+        short, = create_shipments(self.customer, 1, events=1)
+        long, = create_shipments(self.customer, 1)
+        append_events([ShipmentTracking(shipment=long, status='in_transit', location='Hub') for _ in range(20)])
+        client = self.client_for(self.customer)
+        expected = self.count_queries(client, f'/api/shipments/{short.id}/')
+        with self.assertNumQueries(expected):
+            response = client.get(f'/api/shipments/{long.id}/')
+        self.assertEqual(len(response.json()['tracking_history']), 23)
+
+class FastSerializerTests(TestCase):
+    # serialize_shipments must produce exactly what ShipmentSerializer does
+    def test_matches_drf_serializer(self):
+        named = User.objects.create_user('named', password='x', role='customer', first_name='Ada', last_name='Lovelace')
+        unnamed = User.objects.create_user('unnamed', password='x', role='customer')
+        courier = User.objects.create_user('courier', password='x', role='courier')
+        plain, = create_shipments(unnamed, 1, events=0)
+        detailed, = create_shipments(named, 1, courier=courier)
+        Shipment.objects.filter(id=detailed.id).update(
+            weight=Decimal('12.5'), cost=Decimal('1234.05'), dimensions='10x20x30 cm',
+            payment_method='online', payment_status=True, status='out_for_delivery',
+        )
+        append_events([
+            ShipmentTracking(
+                shipment=detailed, status='out_for_delivery', location='Hub', description='On the van',
+                latitude=Decimal('40.712776'), longitude=Decimal('-74.005974'),
+                timestamp=datetime(2024, 2, 29, 23, 59, 59, 123456, tzinfo=dt_timezone.utc),
+            ),
+            ShipmentTracking(
+                shipment=detailed, status='Delayed', location='', latitude=Decimal('-0.5'), longitude=None,
+                timestamp=datetime(2024, 3, 1, tzinfo=dt_timezone.utc),
+            ),
+        ])
+        
+        queryset = Shipment.objects.filter(id__in=[plain.id, detailed.id]).order_by('id')
+        expected = ShipmentSerializer(queryset.with_tracking(), many=True).data
+        actual = serialize_shipments(list(shipment_values(queryset)))
+        self.assertEqual(actual, [dict(item) for item in expected])
+        renderer = JSONRenderer()
+        self.assertEqual([dumps(item) for item in actual], [renderer.render(item) for item in expected])
+        
+        self.assertIsNone(actual[0]['assigned_courier'])
+        self.assertEqual(actual[0]['tracking_history'], [])
+        self.assertEqual(actual[1]['cost'], '1234.05')
+        self.assertIsNone(actual[1]['tracking_history'][0]['longitude'])
+
+class ShipmentListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+        cls.shipments = create_shipments(cls.customer, 5, events=1)
+        # Three share a created_at, so the id tiebreak decides their order
+        tied = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        Shipment.objects.filter(id__in=[shipment.id for shipment in cls.shipments[1:4]]).update(created_at=tied)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def test_cursor_walks_every_row_once_in_order(self):
+        expected = list(Shipment.objects.order_by(*KEYSET_ORDERING).values_list('id', flat=True))
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/api/shipments/list/', params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [item['id'] for item in page['results']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+    
+    def test_bad_cursor_is_rejected(self):
+        for cursor in ['not-a-cursor', 'WzEsIDJd', 'WyJub3QgYSBkYXRlIiwgMV0=']:
+            with self.subTest(cursor):
+                response = self.client.get('/api/shipments/list/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+    
+    def test_ndjson_export_is_one_shipment_per_line(self):
+        response = self.client.get('/api/shipments/list/', {'export': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.endswith(b'\n'))
+        lines = body.decode().splitlines()
+        expected = Shipment.objects.order_by(*KEYSET_ORDERING).with_tracking()
+        self.assertEqual([json.loads(line) for line in lines], json.loads(JSONRenderer().render(
+            ShipmentSerializer(expected, many=True).data
+        )))
+
+class ConditionalGetTests(TestCase):
+    # Detail and public tracking answer If-None-Match with 304 until the shipment
+    # changes; after an update the old ETag must get the new body
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+        cls.courier = User.objects.create_user('courier', password='x', role='courier')
+        cls.shipment, = create_shipments(cls.customer, 1, events=1, courier=cls.courier)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+    
+    def update_status(self, new_status):
+        courier = APIClient()
+        courier.force_authenticate(self.courier)
+        response = courier.put(
+            f'/api/shipments/{self.shipment.id}/update-status/', {'status': new_status}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+    
+    def assert_revalidates(self, path):
+        first = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertTrue(first.has_header('Last-Modified'))
+        
+        cached = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        
+        self.update_status('in_transit')
+        fresh = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], etag)
+        self.assertEqual(fresh.json()['status'], 'in_transit')
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+    
+    def test_shipment_detail(self):
+        self.assert_revalidates(f'/api/shipments/{self.shipment.id}/')
+    
+    def test_public_tracking(self):
+        self.assert_revalidates(f'/api/tracking/{self.shipment.tracking_id}/')
+    
+    def test_detail_permission_is_checked_before_304(self):
+        etag = self.client.get(f'/api/shipments/{self.shipment.id}/')['ETag']
+        stranger = APIClient()
+        stranger.force_authenticate(User.objects.create_user('stranger', password='x', role='customer'))
+        response = stranger.get(f'/api/shipments/{self.shipment.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+class BulkCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+    
+    def item(self, **overrides):
+        return {
+            'receiver_name': 'Receiver', 'receiver_phone': '555-0100', 'receiver_address': '1 Main St',
+            'package_description': 'Parcel', 'weight': '2.00', 'pickup_address': 'Depot',
+            'delivery_address': '1 Main St', 'payment_method': 'cod', **overrides,
+        }
+    
+    def test_bad_items_are_reported_and_the_rest_created(self):
+        items = [
+            self.item(),
+            self.item(receiver_name='', payment_method='cheque'),
+            self.item(dimensions='2000x10x10'),
+            self.item(receiver_name='Second'),
+        ]
+        response = self.client.post('/api/shipments/bulk-create/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        results = body['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3])
+        self.assertEqual(set(results[1]['errors']), {'receiver_name', 'payment_method'})
+        self.assertEqual(set(results[2]['errors']), {'dimensions'})
+        
+        created = Shipment.objects.in_bulk([results[0]['id'], results[3]['id']])
+        self.assertEqual(len(created), 2)
+        self.assertEqual(Shipment.objects.count(), 2)
+        for result in (results[0], results[3]):
+            shipment = created[result['id']]
+            self.assertEqual(shipment.tracking_id, result['tracking_id'])
+            self.assertEqual(shipment.sender, self.customer)
+            self.assertEqual(shipment.last_seq, 1)
+            self.assertEqual(list(shipment.tracking_history.values_list('seq', 'status')), [(1, 'Booked')])
+        self.assertEqual(created[results[3]['id']].receiver_name, 'Second')
+    
+    def test_all_bad_items_create_nothing(self):
+        response = self.client.post('/api/shipments/bulk-create/', [self.item(weight='heavy')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (0, 1))
+        self.assertFalse(Shipment.objects.exists())
+    
+    def test_empty_or_oversized_batches_are_rejected(self):
+        self.assertEqual(self.client.post('/api/shipments/bulk-create/', [], format='json').status_code, 400)
+        with self.settings(BULK_CREATE_MAX_ITEMS=2):
+            response = self.client.post('/api/shipments/bulk-create/', [self.item()] * 3, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Shipment.objects.exists())
+
+class EventLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+    
+    def event(self, shipment, status, day, location='Hub'):
+        return ShipmentTracking(
+            shipment=shipment, status=status, location=location, timestamp=datetime(2024, 1, day, tzinfo=dt_timezone.utc)
+        )
+    
+    def client_history(self, shipment):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        return client.get(f'/api/shipments/{shipment.id}/').json()['tracking_history']
+    
+    def test_seq_follows_arrival_order_per_shipment(self):
+        first, second = create_shipments(self.customer, 2, events=0)
+        append_events([self.event(first, 'Booked', 1), self.event(second, 'Booked', 1), self.event(first, 'picked_up', 2)])
+        append_events([self.event(second, 'picked_up', 3), self.event(first, 'in_transit', 3)])
+        self.assertEqual(list(first.tracking_history.order_by('seq').values_list('seq', 'status')), [
+            (1, 'Booked'), (2, 'picked_up'), (3, 'in_transit'),
+        ])
+        self.assertEqual(list(second.tracking_history.order_by('seq').values_list('seq', 'status')), [
+            (1, 'Booked'), (2, 'picked_up'),
+        ])
+        self.assertEqual(Shipment.objects.get(id=first.id).last_seq, 3)
+    
+    def test_backdated_event_is_logged_without_rolling_back(self):
+        shipment, = create_shipments(self.customer, 1, events=0)
+        append_events([self.event(shipment, 'in_transit', 5, location='Transit Hub')])
+        append_events([self.event(shipment, 'picked_up', 2, location='Depot')])
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.status, shipment.last_location, shipment.last_seq), ('in_transit', 'Transit Hub', 2))
+        self.assertEqual(shipment.last_event_at, datetime(2024, 1, 5, tzinfo=dt_timezone.utc))
+        
+        append_events([self.event(shipment, 'out_for_delivery', 6, location='Van')])
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.status, shipment.last_location, shipment.last_seq), ('out_for_delivery', 'Van', 3))
+        # Newest first by time, whatever order the events arrived in
+        self.assertEqual([event['status'] for event in self.client_history(shipment)], [
+            'out_for_delivery', 'in_transit', 'picked_up',
+        ])
+    
+    def test_events_are_append_only(self):
+        shipment, = create_shipments(self.customer, 1, events=1)
+        event = shipment.tracking_history.get()
+        event.location = 'Elsewhere'
+        with self.assertRaises(ValueError):
+            event.save()
+
+class ScanIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+        cls.courier = User.objects.create_user('courier', password='x', role='courier')
+        cls.first, cls.second = create_shipments(cls.customer, 2, events=1)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+    
+    def scan(self, shipment, status='in_transit', **extra):
+        return {'tracking_id': shipment.tracking_id if shipment else 'TRKMISSING', 'status': status, **extra}
+    
+    def test_bad_scans_are_reported_and_the_rest_appended(self):
+        response = self.client.post('/api/shipments/scans/', [
+            self.scan(self.first, location='Hub A'),
+            self.scan(None),
+            self.scan(self.second, status='lost'),
+            self.scan(self.second, latitude='north', longitude='0'),
+            self.scan(self.second, status='picked_up', scanned_at='2024-01-01T00:00:00Z'),
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['accepted'], body['rejected']), (2, 3))
+        self.assertEqual([error['index'] for error in body['errors']], [1, 2, 3])
+        self.assertEqual(set(body['errors'][0]['errors']), {'tracking_id'})
+        self.assertEqual(set(body['errors'][1]['errors']), {'status'})
+        self.assertEqual(set(body['errors'][2]['errors']), {'latitude'})
+        
+        first = Shipment.objects.get(id=self.first.id)
+        self.assertEqual((first.status, first.last_seq, first.last_location), ('in_transit', 2, 'Hub A'))
+        # The backdated scan is logged but the status keeps the newer Booked event
+        second = Shipment.objects.get(id=self.second.id)
+        self.assertEqual((second.status, second.last_seq), ('booked', 2))
+    
+    def test_batch_with_no_good_scans_appends_nothing(self):
+        response = self.client.post('/api/shipments/scans/', [self.scan(None), self.scan(self.first, status='')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['accepted'], 0)
+        self.assertEqual(ShipmentTracking.objects.count(), 2)
+    
+    def test_customers_cannot_scan(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.post('/api/shipments/scans/', [self.scan(self.first)], format='json').status_code, 403)
+
+class RebuildProjectionTests(TestCase):
+    def test_corrects_drifted_projections_and_their_cached_payloads(self):
+        customer = User.objects.create_user('customer', password='x', role='customer')
+        drifted, intact = create_shipments(customer, 2)
+        cache.clear()
+        Shipment.objects.filter(id=drifted.id).update(status='delivered', last_location='Nowhere')
+        path = f'/api/tracking/{drifted.tracking_id}/'
+        stale = APIClient().get(path)
+        self.assertEqual(stale.json()['status'], 'delivered')
+        intact_before = Shipment.objects.values('updated_at').get(id=intact.id)
+        
+        out = io.StringIO()
+        call_command('rebuild_shipment_projections', stdout=out)
+        self.assertIn('2 shipments checked, 1 projections corrected', out.getvalue())
+        
+        fresh = APIClient().get(path, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()['status'], 'in_transit')
+        self.assertEqual(Shipment.objects.get(id=drifted.id).last_location, 'Hub')
+        self.assertEqual(Shipment.objects.values('updated_at').get(id=intact.id), intact_before)
+
+@override_settings(AUTO_ASSIGN_MAX_ACTIVE=20, AUTO_ASSIGN_LOAD_PENALTY_KM=5.0)
+class AssignmentPlanTests(SimpleTestCase):
+    def plan(self, shipments, couriers, load):
+        shipment_lat, shipment_lon = (np.array(values, dtype=float) for values in zip(*shipments))
+        courier_lat, courier_lon = (np.array(values, dtype=float) for values in zip(*couriers))
+        return plan_assignments(shipment_lat, shipment_lon, np.array(load, dtype=float), courier_lat, courier_lon).tolist()
+    
+    def test_unlocated_courier_shares_the_work_by_load(self):
+        # A new courier has no parcels and so no position; the busy courier is right
+        # next to every shipment but has 10 more parcels, worth 50 km of detour
+        choice = self.plan([(40.71, -74.0)] * 20, [(40.71, -74.0), (np.nan, np.nan)], [10, 0])
+        self.assertEqual(choice[:10], [1] * 10)
+        # then they alternate, leaving both with 15
+        self.assertEqual(10 + choice.count(0), choice.count(1))
+    
+    def test_nearest_courier_wins_at_equal_load(self):
+        # New York, Boston (300 km away) and one courier with no position
+        choice = self.plan([(40.71, -74.0)], [(40.71, -74.0), (42.36, -71.06), (np.nan, np.nan)], [3, 3, 3])
+        self.assertEqual(choice, [0])
+    
+    def test_unlocated_courier_ranks_at_the_median_distance(self):
+        # From New York: Boston (306 km) is full, Washington is 328 km, and the
+        # courier with no position counts as the 317 km median
+        choice = self.plan([(40.71, -74.0)], [(42.36, -71.06), (38.90, -77.04), (np.nan, np.nan)], [20, 0, 0])
+        self.assertEqual(choice, [2])
+    
+    def test_unlocated_shipments_go_to_the_least_loaded(self):
+        choice = self.plan([(np.nan, np.nan)] * 3, [(40.71, -74.0), (42.36, -71.06), (np.nan, np.nan)], [2, 0, 1])
+        self.assertEqual(choice, [1, 1, 2])
+    
+    def test_full_couriers_are_skipped_until_everyone_is_full(self):
+        choice = self.plan([(40.71, -74.0)] * 3, [(40.71, -74.0), (np.nan, np.nan)], [20, 19])
+        self.assertEqual(choice, [1, -1, -1])
+
+class NearbyShipmentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.shipments = create_shipments(cls.admin, 3, events=0)
+        for offset, shipment in enumerate(cls.shipments):
+            lat, lon = Decimal('40.7128') + offset * Decimal('0.001'), Decimal('-74.006')
+            Shipment.objects.filter(id=shipment.id).update(
+                delivery_latitude=lat, delivery_longitude=lon, delivery_geohash=encode_geohash(float(lat), float(lon)),
+            )
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def test_limit_caps_both_query_forms(self):
+        for params in [{'bbox': '40.7,-74.1,40.8,-73.9'}, {'lat': 40.7128, 'lon': -74.006, 'radius_km': 5}]:
+            with self.subTest(params):
+                response = self.client.get('/api/shipments/nearby/', params)
+                self.assertEqual(len(response.json()['results']), 3)
+                response = self.client.get('/api/shipments/nearby/', {**params, 'limit': 2})
+                self.assertEqual(len(response.json()['results']), 2)
+    
+    def test_bad_limit_is_rejected(self):
+        for params in [{'bbox': '40.7,-74.1,40.8,-73.9'}, {'lat': 40.7128, 'lon': -74.006, 'radius_km': 5}]:
+            for limit in ['-1', '0', 'ten', '2.5', '']:
+                with self.subTest(params=params, limit=limit):
+                    response = self.client.get('/api/shipments/nearby/', {**params, 'limit': limit})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('limit', response.json()['error'])
+
+class ImportShipmentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = User.objects.create_user('merchant', password='x', role='customer')
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'legacy.ndjson')
+        self.errors_path = self.path + '.errors.ndjson'
+    
+    def write_rows(self, weights):
+        with open(self.path, 'w') as handle:
+            for index, weight in enumerate(weights, start=1):
+                handle.write(json.dumps({
+                    'tracking_id': f'LEGACY{index}', 'sender': 'merchant', 'receiver_name': 'Receiver',
+                    'receiver_phone': '555-0100', 'receiver_address': '1 Main St', 'package_description': 'Parcel',
+                    'weight': weight, 'cost': '12.50', 'pickup_address': 'Depot', 'delivery_address': '1 Main St',
+                    'created_at': f'2019-03-0{index}T10:00:00Z',
+                    'tracking_history': [
+                        {'status': 'Booked', 'location': 'Origin', 'timestamp': f'2019-03-0{index}T10:00:00Z'},
+                        {'status': 'Delivered', 'location': 'Door', 'timestamp': f'2019-03-0{index}T18:00:00Z'},
+                    ],
+                }) + '\n')
+    
+    def run_import(self):
+        call_command('import_shipments', self.path, '--batch-size', '2', stdout=io.StringIO())
+    
+    def error_rows(self):
+        with open(self.errors_path) as handle:
+            return [json.loads(line)['row'] for line in handle]
+    
+    def test_resume_after_a_crash_loads_every_row_once(self):
+        # Rows 3 and 5 are rejected; the third batch dies after writing its
+        # errors but before its checkpoint commits
+        self.write_rows(['1.5', '2', '-1', '3', '-2', '4'])
+        calls = []
+        
+        def crash_third_batch(valid, checkpoint, before_commit):
+            calls.append(len(valid))
+            if len(calls) < 3:
+                return import_batch(valid, checkpoint, before_commit)
+            
+            def write_then_crash():
+                before_commit()
+                raise RuntimeError('killed')
+            return import_batch(valid, checkpoint, write_then_crash)
+        
+        with mock.patch('shipments.management.commands.import_shipments.import_batch', side_effect=crash_third_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        checkpoint = ShipmentImport.objects.get(source=self.path)
+        self.assertEqual((checkpoint.rows, checkpoint.imported, checkpoint.rejected), (4, 3, 1))
+        self.assertIsNone(checkpoint.finished_at)
+        self.assertEqual(Shipment.objects.count(), 3)
+        self.assertEqual(self.error_rows(), [3, 5])
+        
+        self.run_import()
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.rows, checkpoint.imported, checkpoint.rejected), (6, 4, 2))
+        self.assertIsNotNone(checkpoint.finished_at)
+        self.assertEqual(
+            sorted(Shipment.objects.values_list('tracking_id', flat=True)), ['LEGACY1', 'LEGACY2', 'LEGACY4', 'LEGACY6']
+        )
+        self.assertEqual(ShipmentTracking.objects.count(), 8)
+        self.assertEqual(self.error_rows(), [3, 5])
+    
+    def test_legacy_dates_are_kept_without_touching_the_model(self):
+        self.write_rows(['1.5'])
+        self.run_import()
+        shipment = Shipment.objects.get(tracking_id='LEGACY1')
+        self.assertEqual(shipment.created_at, datetime(2019, 3, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(shipment.updated_at, datetime(2019, 3, 1, 18, tzinfo=dt_timezone.utc))
+        self.assertEqual(shipment.status, 'delivered')
+        
+        self.assertTrue(Shipment._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(Shipment._meta.get_field('updated_at').auto_now)
+        fresh, = create_shipments(self.merchant, 1, events=0)
+        fresh.refresh_from_db()
+        self.assertGreater(fresh.created_at, shipment.updated_at)
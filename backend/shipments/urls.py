@@ -3,7 +3,13 @@ from . import views
 
 urlpatterns = [
     path('create/', views.create_shipment, name='create_shipment'),
+    path('bulk-create/', views.bulk_create_shipments, name='bulk_create_shipments'),
+    path('scans/', views.ingest_scans, name='ingest_scans'),
+    path('auto-assign/', views.auto_assign_couriers, name='auto_assign_couriers'),
+    path('nearby/', views.nearby_shipments, name='nearby_shipments'),
+    path('route/', views.courier_route, name='courier_route'),
     path('list/', views.list_shipments, name='list_shipments'),
+    path('stats/', views.shipment_stats, name='shipment_stats'),
     path('<int:shipment_id>/', views.shipment_detail, name='shipment_detail'),
     path('<int:shipment_id>/update-status/', views.update_shipment_status, name='update_shipment_status'),
     path('<int:shipment_id>/assign-courier/', views.assign_courier, name='assign_courier'),
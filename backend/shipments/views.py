@@ -2,55 +2,182 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import Shipment, ShipmentTracking
-from .serializers import ShipmentSerializer, CreateShipmentSerializer, ShipmentTrackingSerializer
+from courier_backend.fastjson import json_response
+from courier_backend.pagination import paginate_keyset, stream_ndjson
+from courier_backend.replicas import replica_reads
+from tracking.broker import publish_tracking_events
+from tracking.cache import invalidate_tracking
+from notifications.dispatcher import publish_status_change
+from .models import Shipment, ShipmentTracking, generate_tracking_ids
+from .events import append_events, normalize_status, project
+from .assignment import auto_assign
+from .routing import plan_route
+from .geo import within_bbox, within_radius
+from .geocoding import locate_deliveries
+from .fast_serializers import shipment_values, serialize_shipments
+from .conditional import shipment_etag, shipment_validators, not_modified, set_validators
+from .serializers import ShipmentSerializer, CreateShipmentSerializer, ShipmentTrackingSerializer, ScanSerializer
+from pricing.engine import price_shipments
+from analytics.rollups import record_tracking_events
+
+def visible_shipments(user):
+    if user.role == 'customer':
+        shipments = Shipment.objects.filter(sender=user)
+    elif user.role == 'courier':
+        shipments = Shipment.objects.filter(assigned_courier=user)
+    else:  # admin
+        shipments = Shipment.objects.all()
+    
+    return shipments.with_tracking(history_limit=settings.SHIPMENT_LIST_HISTORY_LIMIT)
+
+def can_view_shipment(user, sender_id, assigned_courier_id):
+    if user.role == 'customer':
+        return sender_id == user.id
+    elif user.role == 'courier':
+        return assigned_courier_id == user.id
+    return True
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_shipment(request):
     serializer = CreateShipmentSerializer(data=request.data)
     if serializer.is_valid():
-        shipment = serializer.save(sender=request.user)
-        
-        # Create initial tracking entry
-        ShipmentTracking.objects.create(
-            shipment=shipment,
-            status='Booked',
-            location='Origin',
-            description='Shipment has been booked'
-        )
+        address = serializer.validated_data['delivery_address']
+        with transaction.atomic():
+            shipment = serializer.save(sender=request.user, **locate_deliveries([address])[address])
+            
+            # Create initial tracking entry
+            event = ShipmentTracking(
+                shipment=shipment,
+                status='Booked',
+                location='Origin',
+                description='Shipment has been booked'
+            )
+            append_events([event])
+            record_tracking_events([event])
         
         return Response(ShipmentSerializer(shipment).data, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_shipments(request):
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'A non-empty list of shipments is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.BULK_CREATE_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.BULK_CREATE_MAX_ITEMS} shipments per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Validate item by item so one bad row does not reject the whole batch
+    child = CreateShipmentSerializer(many=True).child
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, child.run_validation(item)))
+        except ValidationError as exc:
+            results[index] = {'index': index, 'errors': exc.detail}
+    
+    # Items the pricing engine rejects are reported like validation errors
+    if valid:
+        quotes = price_shipments([data for _, data in valid])
+        for (index, _), quote in zip(valid, quotes):
+            if 'errors' in quote:
+                results[index] = {'index': index, 'errors': quote['errors']}
+        priced = [(row, quote) for row, quote in zip(valid, quotes) if 'errors' not in quote]
+        valid, quotes = [row for row, _ in priced], [quote for _, quote in priced]
+    
+    if valid:
+        tracking_ids = generate_tracking_ids(len(valid))
+        locations = locate_deliveries([data['delivery_address'] for _, data in valid])
+        shipments = [
+            Shipment(
+                tracking_id=tracking_id,
+                sender=request.user,
+                cost=quote['cost'],
+                **locations[data['delivery_address']],
+                **data
+            )
+            for tracking_id, (_, data), quote in zip(tracking_ids, valid, quotes)
+        ]
+        # New shipments start their log here, so the projection is filled in before the insert
+        events = [
+            ShipmentTracking(status='Booked', location='Origin', description='Shipment has been booked')
+            for _ in shipments
+        ]
+        for shipment, event in zip(shipments, events):
+            project(shipment, [event])
+        with transaction.atomic():
+            shipments = Shipment.objects.bulk_create(shipments)
+            for shipment, event in zip(shipments, events):
+                event.shipment = shipment
+            ShipmentTracking.objects.bulk_create(events)
+            record_tracking_events(events)
+        
+        for (index, _), shipment in zip(valid, shipments):
+            results[index] = {'index': index, 'id': shipment.id, 'tracking_id': shipment.tracking_id}
+    
+    return Response({
+        'created': len(valid),
+        'failed': len(items) - len(valid),
+        'results': results,
+    }, status=status.HTTP_201_CREATED if valid else status.HTTP_400_BAD_REQUEST)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_shipments(request):
-    if request.user.role == 'customer':
-        shipments = Shipment.objects.filter(sender=request.user)
-    elif request.user.role == 'courier':
-        shipments = Shipment.objects.filter(assigned_courier=request.user)
-    else:  # admin
-        shipments = Shipment.objects.all()
+    shipments = visible_shipments(request.user)
+    
+    if request.query_params.get('export') == 'ndjson':
+        return stream_ndjson(shipments, ShipmentSerializer, 'shipments.ndjson')
     
-    serializer = ShipmentSerializer(shipments, many=True)
-    return Response(serializer.data)
+    page, next_cursor = paginate_keyset(request.query_params, shipment_values(shipments))
+    results = serialize_shipments(page, settings.SHIPMENT_LIST_HISTORY_LIMIT)
+    return json_response({'results': results, 'next_cursor': next_cursor})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
+def shipment_stats(request):
+    # Counts over every shipment the list would show, not just its first page
+    counts = dict(visible_shipments(request.user).order_by().values_list('status').annotate(count=Count('id')))
+    return Response({
+        'total': sum(counts.values()),
+        'by_status': {code: counts.get(code, 0) for code, _ in Shipment.STATUS_CHOICES},
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
 def shipment_detail(request, shipment_id):
-    shipment = get_object_or_404(Shipment, id=shipment_id)
+    validators = shipment_validators(id=shipment_id)
+    if validators is None:
+        raise Http404
     
     # Check permissions
-    if request.user.role == 'customer' and shipment.sender != request.user:
-        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-    elif request.user.role == 'courier' and shipment.assigned_courier != request.user:
+    if not can_view_shipment(request.user, validators['sender_id'], validators['assigned_courier_id']):
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    serializer = ShipmentSerializer(shipment)
-    return Response(serializer.data)
+    etag = shipment_etag(validators['id'], validators['updated_at'], validators['last_seq'])
+    response = not_modified(request, etag, validators['updated_at'])
+    if response is not None:
+        return response
+    
+    row = shipment_values(Shipment.objects.filter(id=shipment_id)).first()
+    if row is None:
+        raise Http404
+    return set_validators(json_response(serialize_shipments([row])[0]), etag, validators['updated_at'])
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
@@ -66,21 +193,168 @@ def update_shipment_status(request, shipment_id):
     description = request.data.get('description', '')
     
     if new_status:
-        shipment.status = new_status
-        shipment.save()
+        if normalize_status(new_status) is None:
+            return Response({'error': 'Unknown status'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create tracking entry
-        ShipmentTracking.objects.create(
+        # Append the tracking entry; the shipment's status follows from it
+        event = ShipmentTracking(
             shipment=shipment,
             status=new_status,
             location=location,
             description=description
         )
+        with transaction.atomic():
+            append_events([event])
+            record_tracking_events([event])
+        invalidate_tracking(shipment.tracking_id)
+        publish_tracking_events(shipment.tracking_id, [event])
+        publish_status_change(event.id)
         
         return Response({'message': 'Status updated successfully'})
     
     return Response({'error': 'Status is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest_scans(request):
+    # Only courier or admin can record scans
+    if request.user.role not in ['courier', 'admin']:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'A non-empty list of scans is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.SCAN_BATCH_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.SCAN_BATCH_MAX_ITEMS} scans per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    child = ScanSerializer(many=True).child
+    errors = []
+    scans = []
+    for index, item in enumerate(items):
+        try:
+            scans.append((index, child.run_validation(item)))
+        except ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    
+    shipments = Shipment.objects.only('id', 'tracking_id').in_bulk(
+        {scan['tracking_id'] for _, scan in scans}, field_name='tracking_id'
+    )
+    
+    events = []
+    for index, scan in scans:
+        shipment = shipments.get(scan['tracking_id'])
+        if shipment is None:
+            errors.append({'index': index, 'errors': {'tracking_id': ['Shipment not found']}})
+            continue
+        events.append(ShipmentTracking(
+            shipment=shipment,
+            status=scan['status'],
+            location=scan['location'],
+            description=scan['description'],
+            latitude=scan.get('latitude'),
+            longitude=scan.get('longitude'),
+            timestamp=scan['scanned_at']
+        ))
+    
+    # One transaction appends the whole batch and moves every touched shipment's projection
+    with transaction.atomic():
+        updated = append_events(events)
+        record_tracking_events(events)
+    
+    for shipment in updated.values():
+        invalidate_tracking(shipment.tracking_id)
+    for event in events:
+        publish_tracking_events(event.shipment.tracking_id, [event])
+    if events:
+        publish_status_change(min(event.id for event in events))
+    
+    errors.sort(key=lambda error: error['index'])
+    return Response({
+        'accepted': len(events),
+        'rejected': len(errors),
+        'errors': errors,
+    }, status=status.HTTP_200_OK if events else status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def auto_assign_couriers(request):
+    if request.user.role != 'admin':
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(auto_assign())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def courier_route(request):
+    from accounts.models import User
+    if request.user.role == 'courier':
+        courier = request.user
+    elif request.user.role == 'admin':
+        try:
+            courier_id = int(request.query_params['courier_id'])
+        except (KeyError, ValueError):
+            courier_id = 0
+        if not 0 < courier_id < 2 ** 63:
+            return Response({'error': 'courier_id must be a courier user id'}, status=status.HTTP_400_BAD_REQUEST)
+        courier = get_object_or_404(User, id=courier_id, role='courier')
+    else:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    start = None
+    if 'lat' in request.query_params or 'lon' in request.query_params:
+        try:
+            start = (float(request.query_params['lat']), float(request.query_params['lon']))
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lon must both be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(plan_route(courier, start))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearby_shipments(request):
+    params = request.query_params
+    try:
+        limit = int(params.get('limit', settings.LIST_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(limit, settings.LIST_MAX_PAGE_SIZE)
+    
+    try:
+        if 'bbox' in params:
+            min_lat, min_lon, max_lat, max_lon = (float(value) for value in params['bbox'].split(','))
+        else:
+            lat, lon, radius_km = float(params['lat']), float(params['lon']), float(params['radius_km'])
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'Pass lat, lon and radius_km, or bbox=min_lat,min_lon,max_lat,max_lon'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    shipments = visible_shipments(request.user).prefetch_related(None)
+    fields = ('id', 'tracking_id', 'status', 'receiver_name', 'delivery_address')
+    if 'bbox' in params:
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+            return Response({'error': 'bbox must be min_lat,min_lon,max_lat,max_lon'}, status=status.HTTP_400_BAD_REQUEST)
+        results = list(
+            within_bbox(shipments, min_lat, min_lon, max_lat, max_lon)
+            .order_by('-created_at', '-id')
+            .values(*fields, 'delivery_latitude', 'delivery_longitude')[:limit]
+        )
+    else:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and radius_km > 0):
+            return Response({'error': 'lat, lon or radius_km out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        results = within_radius(shipments, lat, lon, radius_km, fields)[:limit]
+    
+    for row in results:
+        row['delivery_latitude'] = float(row['delivery_latitude'])
+        row['delivery_longitude'] = float(row['delivery_longitude'])
+    return Response({'results': results})
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def assign_courier(request, shipment_id):
@@ -94,7 +368,8 @@ def assign_courier(request, shipment_id):
         from accounts.models import User
         courier = get_object_or_404(User, id=courier_id, role='courier')
         shipment.assigned_courier = courier
-        shipment.save()
+        shipment.save(update_fields=['assigned_courier', 'updated_at'])
+        invalidate_tracking(shipment.tracking_id)
         
         return Response({'message': 'Courier assigned successfully'})
     
@@ -1,13 +1,40 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import argparse
+import http.client
 import json
+import queue
+import socket
 import sqlite3
-import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+# Zero-dependency fallback server: standard library only
+
+DATABASE = 'courier.db'
+POOL_SIZE = 8
+
+# Every query is a constant, so each pooled connection prepares it once and
+# reuses it from its statement cache from then on
+SHIPMENT_BY_TRACKING_ID = '''
+    SELECT id, tracking_id, receiver_name, receiver_address, package_description,
+           weight, pickup_address, delivery_address, cost, status
+    FROM shipments WHERE tracking_id = ?'''
+TRACKING_HISTORY = 'SELECT status, location, timestamp FROM tracking_history WHERE shipment_id = ? ORDER BY timestamp DESC'
+USER_LOGIN = 'SELECT id, username, email, role, first_name, last_name FROM users WHERE username = ? AND password = ?'
 
 # Create database and tables
-def setup_database():
-    conn = sqlite3.connect('courier.db')
+def setup_database(path=DATABASE):
+    conn = sqlite3.connect(path)
     cursor = conn.cursor()
     
+    # WAL lets the pooled connections read while another one writes
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
     # Users table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -39,7 +66,7 @@ def setup_database():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
     
-    # Tracking history table
+    # Tracking history table, read newest first per shipment
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS tracking_history (
         id INTEGER PRIMARY KEY,
@@ -48,6 +75,7 @@ def setup_database():
         location TEXT,
         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS tracking_history_shipment_ts_idx ON tracking_history (shipment_id, timestamp)')
     
     # Insert sample data
     cursor.execute("INSERT OR IGNORE INTO users VALUES (1, 'admin', 'admin@test.com', 'admin123', 'admin', '1234567890', 'Admin', 'User')")
@@ -62,120 +90,246 @@ def setup_database():
     conn.commit()
     conn.close()
 
+class ConnectionPool:
+    # At most `size` connections, opened on first use and kept for the life of
+    # the server; a request that finds them all busy waits for one to come back
+    def __init__(self, path, size):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, cached_statements=64)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        with self.slots:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+            try:
+                yield conn
+            except Exception:
+                # Do not hand a connection in an unknown state to the next request
+                conn.close()
+                raise
+            self.idle.put(conn)
+
 class CourierHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between requests, so every response
+    # carries a Content-Length and every request body is read in full. Headers
+    # and body go out in separate writes; without TCP_NODELAY the second one
+    # waits ~40ms for the client's delayed ACK on a kept-alive connection
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    pool = None
+    quiet = False
+    
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+    
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def read_json(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        return json.loads(body.decode('utf-8')) if body else {}
+    
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
-        if '/api/tracking/' in self.path:
-            tracking_id = self.path.split('/')[-2]
-            self.handle_tracking(tracking_id)
+        path = urlsplit(self.path).path
+        if path.startswith('/api/tracking/'):
+            self.handle_tracking(path[len('/api/tracking/'):].strip('/'))
         else:
             self.send_error(404)
     
     def do_POST(self):
-        if '/api/auth/login/' in self.path:
-            self.handle_login()
-        elif '/api/shipments/create/' in self.path:
-            self.handle_create_shipment()
+        try:
+            data = self.read_json()
+        except ValueError:
+            self.send_json(400, {'error': 'Invalid JSON'})
+            return
+        
+        path = urlsplit(self.path).path
+        if path.startswith('/api/auth/login/'):
+            self.handle_login(data)
+        elif path.startswith('/api/shipments/create/'):
+            self.handle_create_shipment(data)
         else:
             self.send_error(404)
     
     def handle_tracking(self, tracking_id):
         try:
-            conn = sqlite3.connect('courier.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM shipments WHERE tracking_id = ?', (tracking_id,))
-            shipment = cursor.fetchone()
-            
-            if not shipment:
-                self.send_response(404)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Shipment not found'}).encode())
-                return
-            
-            cursor.execute('SELECT status, location, timestamp FROM tracking_history WHERE shipment_id = ? ORDER BY timestamp DESC', (shipment[0],))
-            history = cursor.fetchall()
-            
-            response = {
-                'tracking_number': shipment[1],
-                'receiver_name': shipment[3],
-                'receiver_address': shipment[5],
-                'package_description': shipment[6],
-                'weight': shipment[7],
-                'pickup_address': shipment[8],
-                'delivery_address': shipment[9],
-                'cost': shipment[10],
-                'status': shipment[11],
-                'tracking_history': [{'status': h[0], 'location': h[1], 'timestamp': h[2]} for h in history]
-            }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
-            conn.close()
+            with self.pool.connection() as conn:
+                shipment = conn.execute(SHIPMENT_BY_TRACKING_ID, (tracking_id,)).fetchone()
+                history = conn.execute(TRACKING_HISTORY, (shipment['id'],)).fetchall() if shipment else []
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
-    
-    def handle_login(self):
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        data = json.loads(post_data.decode('utf-8'))
+            self.send_json(500, {'error': str(e)})
+            return
         
-        conn = sqlite3.connect('courier.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE username = ? AND password = ?', (data['username'], data['password']))
-        user = cursor.fetchone()
+        if not shipment:
+            self.send_json(404, {'error': 'Shipment not found'})
+            return
+        
+        self.send_json(200, {
+            'tracking_number': shipment['tracking_id'],
+            'receiver_name': shipment['receiver_name'],
+            'receiver_address': shipment['receiver_address'],
+            'package_description': shipment['package_description'],
+            'weight': shipment['weight'],
+            'pickup_address': shipment['pickup_address'],
+            'delivery_address': shipment['delivery_address'],
+            'cost': shipment['cost'],
+            'status': shipment['status'],
+            'tracking_history': [{'status': h['status'], 'location': h['location'], 'timestamp': h['timestamp']} for h in history]
+        })
+    
+    def handle_login(self, data):
+        with self.pool.connection() as conn:
+            user = conn.execute(USER_LOGIN, (data.get('username'), data.get('password'))).fetchone()
         
         if user:
-            response = {
+            self.send_json(200, {
                 'access': 'fake_token',
                 'refresh': 'fake_refresh',
                 'user': {
-                    'id': user[0],
-                    'username': user[1],
-                    'email': user[2],
-                    'role': user[4],
-                    'first_name': user[6],
-                    'last_name': user[7]
+                    'id': user['id'],
+                    'username': user['username'],
+                    'email': user['email'],
+                    'role': user['role'],
+                    'first_name': user['first_name'],
+                    'last_name': user['last_name']
                 }
-            }
-            self.send_response(200)
+            })
         else:
-            response = {'error': 'Invalid credentials'}
-            self.send_response(401)
-        
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
+            self.send_json(401, {'error': 'Invalid credentials'})
+    
+    def handle_create_shipment(self, data):
+        self.send_json(201, {'tracking_id': 'TRK87654321', 'message': 'Shipment created successfully'})
+
+class CourierServer(ThreadingHTTPServer):
+    # One thread per open connection; the default listen backlog of 5 would
+    # refuse connections as soon as a burst of clients arrives at once
+    request_queue_size = 256
+
+def serve(host, port, path, pool_size, quiet=False):
+    setup_database(path)
+    CourierHandler.pool = ConnectionPool(path, pool_size)
+    CourierHandler.quiet = quiet
+    server = CourierServer((host, port), CourierHandler)
+    print(f'Server running at http://{host}:{port}', flush=True)
+    print('Test accounts: admin/admin123, customer1/customer123')
+    print('Test tracking: TRK12345678', flush=True)
+    server.serve_forever()
+
+def run_clients(url, clients, duration):
+    # `clients` threads, each on its own keep-alive connection, issue GETs back
+    # to back for `duration` seconds; returns (latencies in ms, failed requests)
+    parts = urlsplit(url)
+    results = []
+    start_together = threading.Barrier(clients)
+    
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        latencies, failed = [], 0
+        start_together.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', parts.path)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            if response.status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                failed += 1
         conn.close()
+        results.append((latencies, failed))
     
-    def handle_create_shipment(self):
-        response = {'tracking_id': 'TRK87654321', 'message': 'Shipment created successfully'}
-        self.send_response(201)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [latency for latencies, _ in results for latency in latencies], sum(failed for _, failed in results)
+
+@contextmanager
+def background_server(path, pool_size):
+    # A server in its own process, so client threads do not compete with it for the GIL
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, __file__, '--port', str(port), '--db', path, '--pool-size', str(pool_size), '--quiet'],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield f'http://127.0.0.1:{port}/api/tracking/TRK12345678/'
+    finally:
+        process.terminate()
+        process.wait()
+
+def load_test(url, levels, duration):
+    print(f'GET {url}, {duration:g}s per level')
+    print(f'{"clients":>8} {"req/s":>9} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"failed":>7}')
+    for clients in levels:
+        latencies, failed = run_clients(url, clients, duration)
+        if len(latencies) < 2:
+            print(f'{clients:>8} {len(latencies) / duration:>9.0f} {"-":>8} {"-":>8} {"-":>8} {failed:>7}')
+            continue
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f'{clients:>8} {len(latencies) / duration:>9.0f} {percentiles[49]:>8.2f} '
+            f'{percentiles[89]:>8.2f} {percentiles[98]:>8.2f} {failed:>7}'
+        )
 
 if __name__ == '__main__':
-    setup_database()
-    server = HTTPServer(('127.0.0.1', 8000), CourierHandler)
-    print('Server running at http://127.0.0.1:8000')
-    print('Test accounts: admin/admin123, customer1/customer123')
-    print('Test tracking: TRK12345678')
-    server.serve_forever()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Lightweight courier API server (standard library only)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--db', default=DATABASE)
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE, help='Most SQLite connections open at once')
+    parser.add_argument('--quiet', action='store_true', help='Do not log every request')
+    parser.add_argument('--loadtest', action='store_true', help='Benchmark public tracking instead of serving')
+    parser.add_argument('--url', help='Server to load test (default: start one on a free port)')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 16, 128], help='Concurrency levels')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per concurrency level')
+    args = parser.parse_args()
+    
+    if not args.loadtest:
+        serve(args.host, args.port, args.db, args.pool_size, args.quiet)
+    elif args.url:
+        load_test(args.url, args.clients, args.duration)
+    else:
+        with background_server(args.db, args.pool_size) as url:
+            load_test(url, args.clients, args.duration)
@@ -26,6 +26,12 @@ class Ticket(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='ticket_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='ticket_user_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Ticket #{self.id} - {self.subject}"
 
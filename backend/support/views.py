@@ -2,6 +2,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Prefetch
+from courier_backend.pagination import paginate_keyset, stream_ndjson
+from courier_backend.replicas import replica_reads
+from analytics.rollups import record_feedback
 from .models import Ticket, TicketMessage, Feedback
 from .serializers import TicketSerializer, FeedbackSerializer
 
@@ -16,14 +20,23 @@ def create_ticket(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_tickets(request):
     if request.user.role == 'admin':
         tickets = Ticket.objects.all()
     else:
         tickets = Ticket.objects.filter(user=request.user)
     
-    serializer = TicketSerializer(tickets, many=True)
-    return Response(serializer.data)
+    tickets = tickets.select_related('user').prefetch_related(
+        Prefetch('messages', queryset=TicketMessage.objects.select_related('sender'))
+    )
+    
+    if request.query_params.get('export') == 'ndjson':
+        return stream_ndjson(tickets, TicketSerializer, 'tickets.ndjson')
+    
+    page, next_cursor = paginate_keyset(request.query_params, tickets)
+    serializer = TicketSerializer(page, many=True)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -31,5 +44,6 @@ def submit_feedback(request):
     serializer = FeedbackSerializer(data=request.data)
     if serializer.is_valid():
         feedback = serializer.save(user=request.user)
+        record_feedback(feedback)
         return Response(FeedbackSerializer(feedback).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import asyncio
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from shipments.models import Shipment, ShipmentTracking
+from .broker import get_broker, tracking_message
+
+STREAM_PATH = re.compile(r'^/api/tracking/(?P<tracking_id>[^/]+)/stream/$')
+
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+    (b'access-control-allow-origin', b'*'),
+]
+
+def format_sse(message):
+    return f"id: {message['id']}\nevent: tracking\ndata: {message['data']}\n\n".encode()
+
+def find_shipment_id(tracking_id):
+    return Shipment.objects.filter(tracking_id=tracking_id).values_list('id', flat=True).first()
+
+def missed_messages(shipment_id, after_seq):
+    # One range scan of the (shipment, seq) key
+    events = ShipmentTracking.objects.filter(shipment_id=shipment_id, seq__gt=after_seq).order_by('seq')
+    return [tracking_message(event) for event in events]
+
+async def send_json(send, status, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def stream_tracking(scope, receive, send, tracking_id):
+    # Served outside Django's request handler, which pins a thread to every
+    # open request; an idle stream here costs one coroutine and one queue
+    if scope['method'] != 'GET':
+        await send_json(send, 405, b'{"detail": "Method not allowed."}')
+        return
+    
+    # Not thread sensitive: lookups borrow the shared pool instead of a per-request thread
+    shipment_id = await sync_to_async(find_shipment_id, thread_sensitive=False)(tracking_id)
+    if shipment_id is None:
+        await send_json(send, 404, b'{"error": "Shipment not found"}')
+        return
+    
+    headers = dict(scope['headers'])
+    last_event_id = headers.get(b'last-event-id', b'').decode('latin1')
+    
+    # Subscribe before replaying so nothing written in between is lost
+    subscription = get_broker().subscribe(tracking_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+        
+        sent_id = 0
+        if last_event_id.isdigit():
+            sent_id = int(last_event_id)
+            missed = await sync_to_async(missed_messages, thread_sensitive=False)(shipment_id, sent_id)
+            for message in missed:
+                sent_id = message['id']
+                await send({'type': 'http.response.body', 'body': format_sse(message), 'more_body': True})
+        
+        retry = f"retry: {settings.TRACKING_STREAM_HEARTBEAT * 1000}\n\n".encode()
+        await send({'type': 'http.response.body', 'body': retry, 'more_body': True})
+        
+        deadline = time.monotonic() + settings.TRACKING_STREAM_MAX_SECONDS
+        while not disconnected.done() and time.monotonic() < deadline:
+            getter = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected},
+                timeout=settings.TRACKING_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            
+            message = getter.result()
+            if message['id'] > sent_id:
+                sent_id = message['id']
+                await send({'type': 'http.response.body', 'body': format_sse(message), 'more_body': True})
+        
+        if not disconnected.done():
+            # Past the lifetime: close so the client reconnects with Last-Event-ID
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        subscription.close()
+        disconnected.cancel()
+
+class TrackingStreamRouter:
+    def __init__(self, application):
+        self.application = application
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            match = STREAM_PATH.match(scope['path'])
+            if match:
+                await stream_tracking(scope, receive, send, match['tracking_id'])
+                return
+        await self.application(scope, receive, send)
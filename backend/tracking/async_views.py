@@ -0,0 +1,17 @@
+from asgiref.sync import sync_to_async
+from courier_backend.async_api import json_response, require_get
+from courier_backend import fastjson
+from shipments.conditional import not_modified, set_validators
+from .cache import get_tracking_payload
+from .views import build_tracking_payload
+
+@require_get
+async def track_shipment(request, tracking_id):
+    payload = await sync_to_async(get_tracking_payload)(tracking_id, lambda: build_tracking_payload(tracking_id))
+    if payload is None:
+        return json_response({'error': 'Shipment not found'}, status=404)
+    
+    response = not_modified(request, payload['etag'], payload['last_modified'])
+    if response is not None:
+        return response
+    return set_validators(fastjson.json_response(payload['body']), payload['etag'], payload['last_modified'])
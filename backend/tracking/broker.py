@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from courier_backend.fastjson import dumps
+
+class Subscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.TRACKING_STREAM_QUEUE_SIZE)
+
+    def offer(self, message):
+        # A subscriber that stops reading loses its oldest events, not the publisher's time
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InProcessBroker:
+    # Fans events out to subscribers in this process only; point TRACKING_BROKER
+    # at a networked implementation with the same interface to span workers
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.TRACKING_BROKER)()
+
+def tracking_message(event):
+    from shipments.fast_serializers import tracking_entry
+    data = tracking_entry(
+        event.status, event.location, event.description, event.latitude, event.longitude, event.timestamp
+    )
+    return {'id': event.seq, 'data': dumps(data).decode()}
+
+def publish_tracking_events(tracking_id, events):
+    broker = get_broker()
+    for event in events:
+        broker.publish(tracking_id, tracking_message(event))
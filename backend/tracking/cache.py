@@ -0,0 +1,65 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from courier_backend.replicas import replica_alias
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+def _version_key(tracking_id):
+    return f'tracking:version:{tracking_id}'
+
+def _payload_key(tracking_id, version):
+    return f'tracking:body:{tracking_id}:{version}'
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def get_version(tracking_id):
+    key = _version_key(tracking_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version can never resurrect an old payload
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+def get_tracking_payload(tracking_id, build):
+    # Payloads are keyed by version, so invalidating is a counter bump and a
+    # reader racing an update can only ever fill a slot nobody reads again
+    key = _payload_key(tracking_id, get_version(tracking_id))
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+    
+    _count('misses')
+    # Every reader of this version shares the slot, so it is filled from the
+    # primary: a replica may not have the write that bumped the version yet, and
+    # a stale fill would be served even to the user who made that write
+    token = replica_alias.set(None)
+    try:
+        payload = build()
+    finally:
+        replica_alias.reset(token)
+    if payload is not None:
+        cache.set(key, payload, timeout=settings.TRACKING_CACHE_TIMEOUT)
+    return payload
+
+def invalidate_tracking(tracking_id):
+    key = _version_key(tracking_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
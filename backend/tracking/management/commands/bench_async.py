@@ -0,0 +1,116 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+
+def wsgi_environ(path, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+def asgi_scope(path, headers):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+
+class Command(BaseCommand):
+    help = 'Compare req/s and tail latency of a read endpoint under WSGI threads and the ASGI event loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tracking/TRK12345678/')
+        parser.add_argument('--username', help='Send a JWT for this user')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} not found")
+            headers['Authorization'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+
+        path, total, concurrency = options['path'], options['requests'], options['concurrency']
+        self.report('wsgi', *self.run_wsgi(path, headers, total, concurrency))
+        self.report('asgi', *asyncio.run(self.run_asgi(path, headers, total, concurrency)))
+
+    def run_wsgi(self, path, headers, total, concurrency):
+        from courier_backend.wsgi import application
+
+        def one(_):
+            statuses = []
+            start = time.perf_counter()
+            body = application(wsgi_environ(path, headers), lambda status, response_headers: statuses.append(status))
+            b''.join(body)
+            return time.perf_counter() - start, statuses[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        return time.perf_counter() - start, results
+
+    async def run_asgi(self, path, headers, total, concurrency):
+        from courier_backend.asgi import application
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(str(message['status']))
+
+            async with semaphore:
+                start = time.perf_counter()
+                await application(asgi_scope(path, headers), receive, send)
+                return time.perf_counter() - start, statuses[0]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - start, results
+
+    def report(self, label, elapsed, results):
+        latencies = [latency * 1000 for latency, _ in results]
+        errors = sum(1 for _, status in results if not str(status).startswith('2'))
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{label}: {len(results) / elapsed:.0f} req/s, p50={percentiles[49]:.2f}ms '
+            f'p99={percentiles[98]:.2f}ms, non-2xx={errors}'
+        )
@@ -0,0 +1,44 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from shipments.models import Shipment
+from tracking.cache import invalidate_tracking
+
+class Command(BaseCommand):
+    help = 'Measure public tracking latency with and without the payload cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tracking_id', nargs='?', default='TRK12345678')
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        tracking_id = options['tracking_id']
+        if not Shipment.objects.filter(tracking_id=tracking_id).exists():
+            raise CommandError(f'Shipment {tracking_id} not found')
+
+        client = Client()
+        url = f'/api/tracking/{tracking_id}/'
+
+        def run(bust_cache):
+            timings = []
+            for _ in range(options['requests']):
+                if bust_cache:
+                    invalidate_tracking(tracking_id)
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'Unexpected status {response.status_code}')
+            return timings
+
+        client.get(url)
+        for label, bust_cache in (('uncached', True), ('cached', False)):
+            timings = run(bust_cache)
+            percentiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f'{label:>9}: p50={percentiles[49]:.3f}ms p99={percentiles[98]:.3f}ms '
+                f'req/s={len(timings) / (sum(timings) / 1000):.0f}'
+            )
@@ -0,0 +1,110 @@
+import asyncio
+import resource
+import statistics
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+from shipments.events import PROJECTION_FIELDS, append_events, rebuild_projection
+from shipments.models import Shipment, ShipmentTracking
+from tracking.broker import get_broker, publish_tracking_events
+
+def make_scope(path):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+
+class Command(BaseCommand):
+    help = 'Hold many idle live-tracking streams open on one event loop and time the fan-out of one event'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tracking_id', nargs='?', default='TRK12345678')
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        shipment = Shipment.objects.filter(tracking_id=options['tracking_id']).first()
+        if shipment is None:
+            raise CommandError(f"Shipment {options['tracking_id']} not found")
+        asyncio.run(self.run(shipment, options['subscribers'], options['timeout']))
+
+    async def run(self, shipment, count, timeout):
+        from courier_backend.asgi import application
+
+        broker = get_broker()
+        baseline = broker.subscriber_count()
+        path = f'/api/tracking/{shipment.tracking_id}/stream/'
+        received = []
+        published_at = None
+
+        async def subscriber():
+            request_sent = False
+            done = asyncio.Event()
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and b'event: tracking' in message.get('body', b''):
+                    received.append(time.perf_counter() - published_at)
+                    done.set()
+
+            await application(make_scope(path), receive, send)
+
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(subscriber()) for _ in range(count)]
+        while broker.subscriber_count() - baseline < count:
+            if time.perf_counter() - start > timeout:
+                raise CommandError(f'Only {broker.subscriber_count() - baseline} of {count} subscribers connected')
+            await asyncio.sleep(0.05)
+        connect_time = time.perf_counter() - start
+        threads = threading.active_count()
+
+        def write_event():
+            event = ShipmentTracking(
+                shipment=shipment, status=shipment.status, location='Load test', description='Load test event'
+            )
+            append_events([event])
+            return event
+
+        def remove_event():
+            event.delete()
+            rebuild_projection(shipment)
+            shipment.save(update_fields=PROJECTION_FIELDS)
+
+        event = await sync_to_async(write_event)()
+        published_at = time.perf_counter()
+        publish_tracking_events(shipment.tracking_id, [event])
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        finally:
+            await sync_to_async(remove_event)()
+
+        latencies = sorted(ms * 1000 for ms in received)
+        percentiles = statistics.quantiles(latencies, n=100)
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f'subscribers: {count} connected in {connect_time:.2f}s')
+        self.stdout.write(f'threads while idle: {threads}')
+        self.stdout.write(f'peak RSS: {rss_mb:.1f} MB')
+        self.stdout.write(
+            f'fan-out: delivered to {len(latencies)} in {latencies[-1]:.1f}ms '
+            f'(p50={percentiles[49]:.1f}ms p99={percentiles[98]:.1f}ms)'
+        )
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='TrackingEvent',
+        ),
+    ]
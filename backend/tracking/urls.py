@@ -2,5 +2,7 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('cache-stats/', views.tracking_cache_stats, name='tracking_cache_stats'),
     path('<str:tracking_id>/', views.track_shipment, name='track_shipment'),
-]
\ No newline at end of file
+    path('<str:tracking_id>/events/', views.tracking_events, name='tracking_events'),
+]
@@ -1,16 +1,68 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from shipments.models import Shipment
-from shipments.serializers import ShipmentSerializer
+from django.conf import settings
+from archive.partitions import archived_shipment
+from courier_backend.fastjson import dumps, json_response
+from shipments.models import Shipment, ShipmentTracking
+from shipments.fast_serializers import SHIPMENT_COLUMNS, TRACKING_COLUMNS, serialize_shipments, tracking_entry
+from shipments.conditional import shipment_etag, not_modified, set_validators
+from .cache import get_tracking_payload, cache_stats
+
+def build_tracking_payload(tracking_id):
+    row = Shipment.objects.filter(tracking_id=tracking_id).values(*SHIPMENT_COLUMNS, 'last_seq').first()
+    history = None
+    if row is None:
+        archived = archived_shipment(tracking_id)
+        if archived is None:
+            return None
+        row, history = archived
+    
+    # Validators are cached with the rendered body so a hit can answer 304 without the database
+    return {
+        'etag': shipment_etag(row['id'], row['updated_at'], row['last_seq']),
+        'last_modified': row['updated_at'],
+        'body': dumps(serialize_shipments([row], history=history)[0]),
+    }
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def track_shipment(request, tracking_id):
+    payload = get_tracking_payload(tracking_id, lambda: build_tracking_payload(tracking_id))
+    if payload is None:
+        return Response({'error': 'Shipment not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = not_modified(request, payload['etag'], payload['last_modified'])
+    if response is not None:
+        return response
+    return set_validators(json_response(payload['body']), payload['etag'], payload['last_modified'])
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def tracking_events(request, tracking_id):
+    # Events appended after ?since=<seq>, oldest first; poll again with the last seq returned
     try:
-        shipment = Shipment.objects.get(tracking_id=tracking_id)
-        serializer = ShipmentSerializer(shipment)
-        return Response(serializer.data)
-    except Shipment.DoesNotExist:
-        return Response({'error': 'Shipment not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        since = int(request.query_params.get('since', 0))
+    except ValueError:
+        return Response({'error': 'since must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    shipment = Shipment.objects.filter(tracking_id=tracking_id).values('id', 'last_seq').first()
+    if shipment is None:
+        return Response({'error': 'Shipment not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    events = ShipmentTracking.objects.filter(shipment_id=shipment['id'], seq__gt=since).order_by('seq').values_list(
+        'seq', *TRACKING_COLUMNS[1:]
+    )[:settings.TRACKING_EVENTS_PAGE_SIZE]
+    return json_response({
+        'tracking_id': tracking_id,
+        'last_seq': shipment['last_seq'],
+        'events': [{'seq': seq, **tracking_entry(*event)} for seq, *event in events],
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tracking_cache_stats(request):
+    if request.user.role != 'admin':
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(cache_stats())
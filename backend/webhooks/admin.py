@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import WebhookSubscription, WebhookDelivery
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'url', 'is_active', 'failure_count', 'next_attempt_at', 'created_at']
+    list_filter = ['is_active']
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['key', 'subscription', 'status', 'attempts', 'created_at', 'delivered_at']
+    list_filter = ['status']
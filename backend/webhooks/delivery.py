@@ -0,0 +1,242 @@
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import WebhookDelivery, WebhookSubscription
+
+logger = logging.getLogger(__name__)
+
+def sign(secret, timestamp, body):
+    # Receivers recompute HMAC-SHA256 over "<timestamp>.<body>" with their secret
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+def queue_events(events):
+    # events: (sender_id, key, payload) tuples. Every active subscription of the
+    # sender gets its own delivery row; one query and one insert per call
+    sender_ids = {sender_id for sender_id, _, _ in events}
+    subscriptions = defaultdict(list)
+    for subscription_id, user_id in WebhookSubscription.objects.filter(
+        user_id__in=sender_ids, is_active=True
+    ).values_list('id', 'user_id'):
+        subscriptions[user_id].append(subscription_id)
+    
+    deliveries = [
+        WebhookDelivery(subscription_id=subscription_id, key=f'{key}-{subscription_id}', event=payload)
+        for sender_id, key, payload in events
+        for subscription_id in subscriptions[sender_id]
+    ]
+    WebhookDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+    return len(deliveries)
+
+def is_public(address):
+    return ipaddress.ip_address(address.split('%')[0]).is_global
+
+def connect_public(address, timeout=None, source_address=None):
+    # Stands in for socket.create_connection: the host is resolved once and the
+    # socket goes to an address that was checked, so a name that re-resolves to a
+    # private address after validate_url accepted it (DNS rebinding) is refused.
+    # Host header, SNI and certificate checks still use the name from the URL
+    host, port = address
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if not all(is_public(info[4][0]) for info in infos):
+        raise ConnectionRefusedError(f'{host} does not resolve to a public address')
+    error = None
+    for family, type_, proto, _, sockaddr in infos:
+        sock = socket.socket(family, type_, proto)
+        if timeout is not None:
+            sock.settimeout(timeout)
+        try:
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            sock.close()
+            error = exc
+    raise error
+
+class ConnectionPool:
+    # Idle keep-alive connections per (scheme, host:port), shared by delivery threads
+    def __init__(self, timeout=None, max_idle=None):
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self.max_idle = max_idle or settings.WEBHOOK_POOL_MAX_IDLE
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self.opened = 0
+    
+    def _acquire(self, scheme, netloc):
+        with self._lock:
+            if self._idle[scheme, netloc]:
+                return self._idle[scheme, netloc].pop(), True
+            self.opened += 1
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(netloc, timeout=self.timeout)
+        if not settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+            connection._create_connection = connect_public
+        return connection, False
+    
+    def _release(self, scheme, netloc, connection):
+        with self._lock:
+            if len(self._idle[scheme, netloc]) < self.max_idle:
+                self._idle[scheme, netloc].append(connection)
+                return
+        connection.close()
+    
+    def post(self, url, body, headers):
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        for attempt in range(2):
+            connection, reused = self._acquire(parts.scheme, parts.netloc)
+            try:
+                connection.request('POST', path, body, headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                # The server may have dropped an idle keep-alive connection; retry once fresh
+                if reused and attempt == 0:
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(parts.scheme, parts.netloc, connection)
+            return response.status
+    
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+def retry_delay(failures):
+    return min(settings.WEBHOOK_RETRY_BACKOFF * 2 ** (failures - 1), settings.WEBHOOK_RETRY_BACKOFF_MAX)
+
+def deliver_subscription(subscription, pool, max_batches=None):
+    # Drains one subscriber's queue in order, WEBHOOK_BATCH_SIZE events per POST.
+    # A failed POST charges an attempt to every event in it, dead-letters the ones
+    # out of attempts and backs the whole subscriber off
+    max_batches = max_batches or settings.WEBHOOK_MAX_BATCHES_PER_ROUND
+    delivered = failed = 0
+    for _ in range(max_batches):
+        batch = list(
+            WebhookDelivery.objects.filter(subscription=subscription, status='pending')
+            .order_by('id').values_list('id', 'event')[:settings.WEBHOOK_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        ids = [delivery_id for delivery_id, _ in batch]
+        body = json.dumps({'events': [event for _, event in batch]}, separators=(',', ':')).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'courier-webhooks/1.0',
+            'X-Webhook-Timestamp': timestamp,
+            'X-Webhook-Signature': sign(subscription.secret, timestamp, body),
+        }
+        try:
+            status_code = pool.post(subscription.url, body, headers)
+            error = '' if 200 <= status_code < 300 else f'HTTP {status_code}'
+        except (http.client.HTTPException, OSError) as exc:
+            error = f'{exc.__class__.__name__}: {exc}'
+        
+        now = timezone.now()
+        if not error:
+            with transaction.atomic():
+                WebhookDelivery.objects.filter(id__in=ids).update(
+                    status='delivered', attempts=F('attempts') + 1, last_error='', delivered_at=now
+                )
+                if subscription.failure_count:
+                    subscription.failure_count = 0
+                    WebhookSubscription.objects.filter(id=subscription.id).update(failure_count=0)
+            delivered += len(ids)
+            continue
+        
+        subscription.failure_count += 1
+        with transaction.atomic():
+            WebhookDelivery.objects.filter(id__in=ids).update(attempts=F('attempts') + 1, last_error=error)
+            failed += WebhookDelivery.objects.filter(
+                id__in=ids, attempts__gte=settings.WEBHOOK_MAX_ATTEMPTS
+            ).update(status='dead')
+            WebhookSubscription.objects.filter(id=subscription.id).update(
+                failure_count=subscription.failure_count,
+                next_attempt_at=now + timedelta(seconds=retry_delay(subscription.failure_count)),
+            )
+        break
+    return delivered, failed
+
+def record_crash(subscription_id, error):
+    # deliver_subscription itself failed (not the POST): the error goes on the
+    # subscriber's pending events and the subscriber backs off like after a failed POST
+    subscription = WebhookSubscription.objects.filter(id=subscription_id).first()
+    if subscription is None:
+        return
+    with transaction.atomic():
+        WebhookDelivery.objects.filter(subscription=subscription, status='pending').update(last_error=error)
+        WebhookSubscription.objects.filter(id=subscription.id).update(
+            failure_count=subscription.failure_count + 1,
+            next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(subscription.failure_count + 1)),
+        )
+
+def due_subscriptions(exclude=()):
+    # One index probe per subscriber rather than a scan of everything pending
+    pending = WebhookDelivery.objects.filter(subscription=OuterRef('pk'), status='pending')
+    return list(
+        WebhookSubscription.objects.filter(is_active=True, next_attempt_at__lte=timezone.now())
+        .exclude(id__in=exclude).filter(Exists(pending)).order_by('next_attempt_at', 'id')
+    )
+
+class Dispatcher:
+    # One thread per subscriber at a time keeps each queue in order while slow
+    # receivers only hold up their own deliveries
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or settings.WEBHOOK_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.pool = ConnectionPool()
+        self.delivered = self.dead = 0
+    
+    def run(self, once=False):
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while True:
+                    if len(in_flight) < self.concurrency:
+                        busy = set(in_flight.values())
+                        for subscription in due_subscriptions(busy)[:self.concurrency - len(in_flight)]:
+                            in_flight[executor.submit(deliver_subscription, subscription, self.pool)] = subscription.id
+                    if not in_flight:
+                        if once:
+                            return
+                        time.sleep(self.poll_interval)
+                        continue
+                    done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        subscription_id = in_flight.pop(future)
+                        try:
+                            delivered, dead = future.result()
+                        except Exception as exc:
+                            logger.exception('Webhook delivery for subscription %s failed', subscription_id)
+                            try:
+                                record_crash(subscription_id, f'{exc.__class__.__name__}: {exc}')
+                            except Exception:
+                                logger.exception('Could not record the failure of subscription %s', subscription_id)
+                            continue
+                        self.delivered += delivered
+                        self.dead += dead
+            finally:
+                self.pool.close()
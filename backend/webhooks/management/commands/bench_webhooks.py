@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from accounts.models import User
+from webhooks.delivery import Dispatcher, queue_events
+from webhooks.models import WebhookDelivery, WebhookSubscription
+from webhooks.stub import StubReceiver
+
+class Command(BaseCommand):
+    help = 'Deliver webhook events to a local stub receiver and report deliveries/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='customer1')
+        parser.add_argument('--subscribers', type=int, default=4)
+        parser.add_argument('--events', type=int, default=5000)
+        parser.add_argument('--fail-every', type=int, default=0, help='Stub answers 500 to every Nth POST')
+        parser.add_argument('--backoff', type=float, default=0.05, help='Retry backoff for this run, seconds')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        subscriptions = []
+        secrets = {}
+        with StubReceiver(secrets, fail_every=options['fail_every']) as receiver:
+            try:
+                for _ in range(options['subscribers']):
+                    subscription = WebhookSubscription.objects.create(user=user, url='http://placeholder/')
+                    subscription.url = receiver.url(subscription.id)
+                    subscription.save(update_fields=['url'])
+                    secrets[str(subscription.id)] = subscription.secret
+                    subscriptions.append(subscription)
+
+                run = int(time.time() * 1000)
+                events = [
+                    (user.id, f'bench-{run}-{index}', {'type': 'shipment.status_changed', 'tracking_id': f'BENCH{index}', 'status': 'in_transit'})
+                    for index in range(options['events'])
+                ]
+                start = time.perf_counter()
+                queued = queue_events(events)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'queue: {queued} deliveries in {elapsed * 1000:.1f}ms ({elapsed * 1e6 / queued:.1f}us per delivery)')
+
+                dispatcher = Dispatcher(poll_interval=0.05)
+                pending = WebhookDelivery.objects.filter(subscription__in=subscriptions, status='pending')
+                start = time.perf_counter()
+                # The stub listens on loopback, which real subscriptions may not reach
+                with override_settings(WEBHOOK_RETRY_BACKOFF=options['backoff'], WEBHOOK_ALLOW_PRIVATE_URLS=True):
+                    # A failed POST backs its subscriber off, so keep going until the queues are empty
+                    while pending.exists():
+                        dispatcher.run(once=True)
+                        time.sleep(options['backoff'])
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'deliver: {dispatcher.delivered} events in {receiver.posts} POSTs over '
+                    f'{receiver.connections} connections in {elapsed:.2f}s ({dispatcher.delivered / elapsed:.0f} deliveries/s); '
+                    f'receiver counted {receiver.events}, bad signatures {receiver.bad_signatures}, '
+                    f'{dispatcher.dead} dead-lettered'
+                )
+            finally:
+                WebhookSubscription.objects.filter(id__in=[subscription.id for subscription in subscriptions]).delete()
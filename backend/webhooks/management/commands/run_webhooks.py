@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from webhooks.delivery import Dispatcher
+
+class Command(BaseCommand):
+    help = 'Deliver queued webhook events to subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Subscribers served at once (default WEBHOOK_WORKER_CONCURRENCY)')
+        parser.add_argument('--once', action='store_true', help='Exit once no subscriber has anything due')
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(concurrency=options['concurrency'])
+        try:
+            dispatcher.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'{dispatcher.delivered} events delivered, {dispatcher.dead} dead-lettered')
@@ -0,0 +1,49 @@
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+class WebhookSubscription(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_secret)
+    is_active = models.BooleanField(default=True)
+    # Consecutive failed POSTs; the whole queue of a failing subscriber backs off
+    failure_count = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user.username} -> {self.url}"
+
+class WebhookDelivery(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('dead', 'Dead'),
+    ]
+    
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    # Queueing the same key twice is a no-op, so retried notification batches don't duplicate events
+    key = models.CharField(max_length=200, unique=True)
+    event = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['subscription', 'status', 'id'], name='webhook_delivery_queue_idx'),
+            models.Index(fields=['status'], name='webhook_delivery_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.status})"
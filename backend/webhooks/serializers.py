@@ -0,0 +1,40 @@
+import socket
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from rest_framework import serializers
+from .delivery import is_public
+from .models import WebhookSubscription, WebhookDelivery
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookSubscription
+        fields = ['id', 'url', 'is_active', 'failure_count', 'next_attempt_at', 'created_at']
+        read_only_fields = ['id', 'failure_count', 'next_attempt_at', 'created_at']
+    
+    def validate_url(self, value):
+        # The server POSTs to this URL, so it must not reach loopback, link-local
+        # or private hosts (the database, metadata services, internal APIs)
+        parts = urlsplit(value)
+        if parts.scheme not in ('http', 'https'):
+            raise serializers.ValidationError('Only http and https URLs are supported.')
+        if settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+            return value
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP)}
+        except (socket.gaierror, UnicodeError):
+            raise serializers.ValidationError('The host name does not resolve.')
+        if not all(is_public(address) for address in addresses):
+            raise serializers.ValidationError('The URL must point to a public address.')
+        return value
+
+class NewWebhookSubscriptionSerializer(WebhookSubscriptionSerializer):
+    # The signing secret is only ever shown when the subscription is created
+    class Meta(WebhookSubscriptionSerializer.Meta):
+        fields = WebhookSubscriptionSerializer.Meta.fields + ['secret']
+        read_only_fields = WebhookSubscriptionSerializer.Meta.read_only_fields + ['secret']
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = ['id', 'key', 'event', 'status', 'attempts', 'last_error', 'created_at', 'delivered_at']
@@ -0,0 +1,57 @@
+import hmac
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .delivery import sign
+
+class StubReceiver:
+    # Local webhook receiver for tests and benchmarks: checks signatures, counts
+    # POSTs, events and TCP connections, and can answer 500 to every Nth POST
+    def __init__(self, secrets, fail_every=0):
+        self.secrets = secrets
+        self.fail_every = fail_every
+        self.posts = self.events = self.connections = self.bad_signatures = 0
+        self.lock = threading.Lock()
+        receiver = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                with receiver.lock:
+                    receiver.connections += 1
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                secret = receiver.secrets.get(self.path.rstrip('/').rsplit('/', 1)[-1], '')
+                expected = sign(secret, self.headers['X-Webhook-Timestamp'], body)
+                with receiver.lock:
+                    receiver.posts += 1
+                    failing = receiver.fail_every and receiver.posts % receiver.fail_every == 0
+                    valid = hmac.compare_digest(expected, self.headers['X-Webhook-Signature'])
+                    if not valid:
+                        receiver.bad_signatures += 1
+                    elif not failing:
+                        receiver.events += body.count(b'"type":')
+                code = 500 if failing or not valid else 204
+                self.send_response(code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+    
+    def url(self, name):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/hooks/{name}'
+    
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,141 @@
+import socket
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .delivery import ConnectionPool, deliver_subscription, queue_events, retry_delay, sign
+from .models import WebhookDelivery, WebhookSubscription
+from .stub import StubReceiver
+
+def event(index):
+    return {'type': 'shipment.status_changed', 'tracking_id': f'TRK{index}', 'status': 'in_transit'}
+
+class SignatureTests(SimpleTestCase):
+    def test_signature_covers_timestamp_and_body(self):
+        signature = sign('secret', '1700000000', b'{"events":[]}')
+        self.assertTrue(signature.startswith('sha256='))
+        self.assertNotEqual(signature, sign('secret', '1700000001', b'{"events":[]}'))
+        self.assertNotEqual(signature, sign('other', '1700000000', b'{"events":[]}'))
+    
+    @override_settings(WEBHOOK_RETRY_BACKOFF=5, WEBHOOK_RETRY_BACKOFF_MAX=60)
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([retry_delay(failures) for failures in range(1, 6)], [5, 10, 20, 40, 60])
+
+@override_settings(WEBHOOK_ALLOW_PRIVATE_URLS=True, WEBHOOK_BATCH_SIZE=100, WEBHOOK_MAX_ATTEMPTS=2,
+                   WEBHOOK_RETRY_BACKOFF=5, WEBHOOK_RETRY_BACKOFF_MAX=60)
+class DeliveryTests(TestCase):
+    # Deliveries go over real HTTP to the stub receiver, which checks signatures
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='x', role='customer')
+    
+    def setUp(self):
+        self.secrets = {}
+        self.pool = ConnectionPool()
+        self.addCleanup(self.pool.close)
+    
+    def subscribe(self, receiver, secret=None):
+        subscription = WebhookSubscription.objects.create(user=self.customer, url='http://placeholder/')
+        subscription.url = receiver.url(subscription.id)
+        subscription.save(update_fields=['url'])
+        self.secrets[str(subscription.id)] = secret or subscription.secret
+        return subscription
+    
+    def queue(self, count, prefix='event'):
+        return queue_events([(self.customer.id, f'{prefix}-{index}', event(index)) for index in range(count)])
+    
+    def test_events_are_signed_and_batched_over_one_connection(self):
+        with StubReceiver(self.secrets) as receiver:
+            subscription = self.subscribe(receiver)
+            self.assertEqual(self.queue(250), 250)
+            self.assertEqual(deliver_subscription(subscription, self.pool), (250, 0))
+        
+        self.assertEqual((receiver.posts, receiver.events, receiver.bad_signatures), (3, 250, 0))
+        self.assertEqual(receiver.connections, 1)
+        self.assertEqual(WebhookDelivery.objects.filter(status='delivered', attempts=1).count(), 250)
+    
+    def test_requeued_keys_are_delivered_once(self):
+        with StubReceiver(self.secrets) as receiver:
+            subscription = self.subscribe(receiver)
+            self.queue(3)
+            self.queue(3)
+            deliver_subscription(subscription, self.pool)
+        self.assertEqual(receiver.events, 3)
+    
+    def test_failed_post_backs_off_then_dead_letters(self):
+        with StubReceiver(self.secrets, fail_every=1) as receiver:
+            subscription = self.subscribe(receiver)
+            self.queue(150)
+            before = timezone.now()
+            self.assertEqual(deliver_subscription(subscription, self.pool), (0, 0))
+            
+            # One failed POST stops the round; only its events are charged an attempt
+            self.assertEqual(receiver.posts, 1)
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.failure_count, 1)
+            self.assertGreaterEqual(subscription.next_attempt_at, before + timedelta(seconds=5))
+            self.assertEqual(WebhookDelivery.objects.filter(attempts=1, last_error='HTTP 500').count(), 100)
+            
+            self.assertEqual(deliver_subscription(subscription, self.pool), (0, 100))
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.failure_count, 2)
+            self.assertGreaterEqual(subscription.next_attempt_at, timezone.now() + timedelta(seconds=9))
+            self.assertEqual(WebhookDelivery.objects.filter(status='dead').count(), 100)
+            self.assertEqual(WebhookDelivery.objects.filter(status='pending', attempts=0).count(), 50)
+    
+    def test_bad_signature_is_rejected(self):
+        with StubReceiver(self.secrets) as receiver:
+            subscription = self.subscribe(receiver, secret='not-the-secret')
+            self.queue(1)
+            self.assertEqual(deliver_subscription(subscription, self.pool), (0, 0))
+        self.assertEqual((receiver.bad_signatures, receiver.events), (1, 0))
+    
+    def test_recovery_resets_the_backoff(self):
+        with StubReceiver(self.secrets, fail_every=2) as receiver:
+            subscription = self.subscribe(receiver)
+            self.queue(150)
+            # POST 1 succeeds, POST 2 fails and ends the round
+            self.assertEqual(deliver_subscription(subscription, self.pool), (100, 0))
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.failure_count, 1)
+            self.assertEqual(deliver_subscription(subscription, self.pool), (50, 0))
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.failure_count, 0)
+    
+    @override_settings(WEBHOOK_ALLOW_PRIVATE_URLS=False)
+    def test_host_that_rebinds_to_a_private_address_is_refused(self):
+        # validate_url saw a public address; by delivery time the name points at loopback
+        with StubReceiver(self.secrets) as receiver:
+            port = receiver.server.server_address[1]
+            subscription = WebhookSubscription.objects.create(
+                user=self.customer, url=f'http://hooks.example.com:{port}/hooks/rebind'
+            )
+            self.queue(1)
+            loopback = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('127.0.0.1', port))]
+            with mock.patch('socket.getaddrinfo', return_value=loopback):
+                self.assertEqual(deliver_subscription(subscription, self.pool), (0, 0))
+        self.assertEqual(receiver.connections, 0)
+        self.assertIn('public address', WebhookDelivery.objects.get().last_error)
+
+@override_settings(WEBHOOK_ALLOW_PRIVATE_URLS=False)
+class SubscriptionUrlTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('customer', password='x', role='customer'))
+    
+    def test_private_addresses_are_rejected(self):
+        for url in ['http://127.0.0.1/hook', 'http://10.0.0.5/hook', 'http://169.254.169.254/latest', 'ftp://example.com/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.post('/api/webhooks/', {'url': url}, format='json').status_code, 400)
+    
+    def test_public_address_is_accepted_and_the_secret_shown_once(self):
+        public = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('93.184.216.34', 0))]
+        with mock.patch('socket.getaddrinfo', return_value=public):
+            response = self.client.post('/api/webhooks/', {'url': 'https://hooks.example.com/courier'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['secret']), 64)
+        self.assertNotIn('secret', self.client.get('/api/webhooks/').json()[0])
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.subscriptions, name='webhook_subscriptions'),
+    path('<int:subscription_id>/', views.subscription_detail, name='webhook_subscription_detail'),
+    path('<int:subscription_id>/deliveries/', views.subscription_deliveries, name='webhook_deliveries'),
+    path('<int:subscription_id>/replay/', views.replay_dead_letters, name='webhook_replay'),
+]
@@ -0,0 +1,52 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from .models import WebhookSubscription
+from .serializers import WebhookSubscriptionSerializer, NewWebhookSubscriptionSerializer, WebhookDeliverySerializer
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def subscriptions(request):
+    if request.method == 'GET':
+        queryset = WebhookSubscription.objects.filter(user=request.user).order_by('id')
+        return Response(WebhookSubscriptionSerializer(queryset, many=True).data)
+    
+    serializer = NewWebhookSubscriptionSerializer(data=request.data)
+    if serializer.is_valid():
+        subscription = serializer.save(user=request.user)
+        return Response(NewWebhookSubscriptionSerializer(subscription).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def subscription_detail(request, subscription_id):
+    subscription = get_object_or_404(WebhookSubscription, id=subscription_id, user=request.user)
+    if request.method == 'DELETE':
+        subscription.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    serializer = WebhookSubscriptionSerializer(subscription, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def subscription_deliveries(request, subscription_id):
+    subscription = get_object_or_404(WebhookSubscription, id=subscription_id, user=request.user)
+    deliveries = subscription.deliveries.order_by('-id')
+    if request.query_params.get('status'):
+        deliveries = deliveries.filter(status=request.query_params['status'])
+    return Response(WebhookDeliverySerializer(deliveries[:100], many=True).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def replay_dead_letters(request, subscription_id):
+    subscription = get_object_or_404(WebhookSubscription, id=subscription_id, user=request.user)
+    replayed = subscription.deliveries.filter(status='dead').update(status='pending', attempts=0, last_error='')
+    WebhookSubscription.objects.filter(id=subscription.id).update(failure_count=0, next_attempt_at=timezone.now())
+    return Response({'replayed': replayed})
@@ -15,16 +15,20 @@ const Dashboard = () => {
 
   const fetchShipments = async () => {
     try {
-      const response = await axios.get('http://127.0.0.1:8000/api/shipments/list/');
-      setShipments(response.data);
+      const [response, counts] = await Promise.all([
+        axios.get('http://127.0.0.1:8000/api/shipments/list/'),
+        axios.get('http://127.0.0.1:8000/api/shipments/stats/')
+      ]);
+      setShipments(response.data.results);
       
-      // Calculate stats
-      const totalShipments = response.data.length;
-      const delivered = response.data.filter(s => s.status === 'delivered').length;
-      const inTransit = response.data.filter(s => s.status === 'in_transit').length;
-      const pending = response.data.filter(s => s.status === 'booked').length;
-      
-      setStats({ totalShipments, delivered, inTransit, pending });
+      // Counted on the server: the list response is only the first page
+      const byStatus = counts.data.by_status;
+      setStats({
+        totalShipments: counts.data.total,
+        delivered: byStatus.delivered,
+        inTransit: byStatus.in_transit,
+        pending: byStatus.booked
+      });
     } catch (error) {
       console.error('Error fetching shipments:', error);
     } finally {
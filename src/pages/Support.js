@@ -22,7 +22,7 @@ const Support = () => {
   const fetchTickets = async () => {
     try {
       const response = await axios.get('http://127.0.0.1:8000/api/support/tickets/');
-      setTickets(response.data);
+      setTickets(response.data.results);
     } catch (error) {
       console.error('Error fetching tickets:', error);
     }